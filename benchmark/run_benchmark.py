@@ -0,0 +1,176 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+# Run as `python -m benchmark.run_benchmark` (or as a script) from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.synthetic_corpus import buildSyntheticCorpus
+from processor.checker import checkDocument, clearDocumentCaches, clearPageCache, rule_type_to_func_dict
+from processor.reader import PDFFile, ReaderType
+from processor.statement_info import statement_dict
+from util.console import console
+
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description="Benchmark extraction and rule checking on a synthetic corpus")
+    argument_parser.add_argument("--corpus-dir", default="./benchmark/corpus/")
+    argument_parser.add_argument("--documents", type=int, default=8, help="number of synthetic PDFs, default 8")
+    argument_parser.add_argument("--seed", type=int, default=0, help="same seed builds same corpus, default 0")
+    argument_parser.add_argument("--baseline", default="./benchmark/baseline.json")
+    argument_parser.add_argument("--save-baseline", action="store_true", help="save this run as the baseline")
+    argument_parser.add_argument(
+        "--tolerance", type=float, default=0.2,
+        help="report a regression if a speed is worse than baseline by more than this ratio, default 0.2"
+    )
+    args = argument_parser.parse_args()
+
+    console.info(f"Building synthetic corpus ({args.documents} documents, seed {args.seed})")
+    pdf_paths = buildSyntheticCorpus(args.corpus_dir, args.documents, args.seed)
+
+    report = {"corpus": {"documents": args.documents, "seed": args.seed}}
+    report["pages_per_second"], page_texts_of_documents = benchmarkExtraction(pdf_paths)
+    report["seconds_per_page_by_rule_type"] = benchmarkRuleTypes(page_texts_of_documents)
+    report["documents_per_minute"], report["results"] = benchmarkEndToEnd(pdf_paths)
+    printReport(report)
+
+    is_regressed = False
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            is_regressed = compareWithBaseline(report, json.load(baseline_file), args.tolerance)
+    else:
+        console.warn(f"No baseline at {args.baseline}, nothing to compare.")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(report, baseline_file, indent=2, sort_keys=True)
+        console.ok(f"Saved baseline to {args.baseline}")
+
+    sys.exit(1 if is_regressed else 0)
+
+
+def benchmarkExtraction(pdf_paths: list[str]) -> tuple[dict[str, float], list[list[str]]]:
+    """
+    Extract all pages with each ReaderType.
+    return ({reader_type_name: pages_per_second}, [[page_text] of each document, by PyMuPDF])
+    """
+    pages_per_second = dict()
+    page_texts_of_documents = []
+    for reader_type in ReaderType:
+        console.info(f"Extracting text by {reader_type.name}")
+        page_count = 0
+        start_time = time.perf_counter()
+        for pdf_path in pdf_paths:
+            with PDFFile(pdf_path, reader_type) as pdf_file:
+                page_texts = [current_page_text for (_, _, current_page_text, _) in pdf_file.iterPageAndNearby()]
+            page_count += len(page_texts)
+            if reader_type == ReaderType.type_pymupdf:
+                page_texts_of_documents.append(page_texts)
+        pages_per_second[reader_type.name] = page_count / (time.perf_counter() - start_time)
+
+    return pages_per_second, page_texts_of_documents
+
+
+def benchmarkRuleTypes(page_texts_of_documents: list[list[str]]) -> dict[str, float]:
+    """
+    Check every page by every rule (even if already true), timing each type of rule.
+    return {rule_type_name: seconds_per_page}
+    """
+    console.info("Timing each type of rule")
+    rule_names_of_type: dict[type, list[str]] = dict()
+    for (rule_name, statement_info) in statement_dict.items():
+        rule_names_of_type.setdefault(type(statement_info.check_rule), []).append(rule_name)
+
+    total_seconds = dict.fromkeys(rule_names_of_type.keys(), 0.0)
+    page_count = 0
+    for page_texts in page_texts_of_documents:
+        # Caches are keyed by page index, hits of last document must not be reused
+        clearDocumentCaches()
+        for page_index in range(len(page_texts)):
+            previous_page_text = page_texts[page_index - 1] if page_index > 0 else ""
+            current_page_text = page_texts[page_index]
+            next_page_text = page_texts[page_index + 1] if page_index + 1 < len(page_texts) else ""
+            clearPageCache(page_index)
+            page_count += 1
+
+            for (rule_type, rule_names) in rule_names_of_type.items():
+                start_time = time.perf_counter()
+                for rule_name in rule_names:
+                    rule_type_to_func_dict[rule_type](
+                        statement_dict[rule_name].check_rule, rule_name,
+                        previous_page_text, current_page_text, next_page_text, page_index
+                    )
+                total_seconds[rule_type] += time.perf_counter() - start_time
+
+    return {rule_type.__name__: seconds / max(page_count, 1) for (rule_type, seconds) in total_seconds.items()}
+
+
+def benchmarkEndToEnd(pdf_paths: list[str]) -> tuple[dict[str, float], dict[str, dict[str, bool]]]:
+    """
+    Run checkDocument on each document with each ReaderType.
+    return ({reader_type_name: documents_per_minute}, {"reader_type_name/file_name": result_dict})
+    """
+    documents_per_minute = dict()
+    results = dict()
+    for reader_type in ReaderType:
+        console.info(f"Checking documents by {reader_type.name}")
+        start_time = time.perf_counter()
+        for pdf_path in pdf_paths:
+            # Logs of checking are not part of benchmark
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result_dict = checkDocument(pdf_path, reader_type=reader_type)
+            results[reader_type.name + "/" + os.path.basename(pdf_path)] = result_dict
+        documents_per_minute[reader_type.name] = len(pdf_paths) / (time.perf_counter() - start_time) * 60
+
+    return documents_per_minute, results
+
+
+def printReport(report: dict) -> None:
+    for (reader_type_name, pages_per_second) in report["pages_per_second"].items():
+        console.sublog(f"Extraction by {reader_type_name}: {pages_per_second:.1f} pages/sec")
+    for (rule_type_name, seconds_per_page) in report["seconds_per_page_by_rule_type"].items():
+        console.sublog(f"{rule_type_name}: {seconds_per_page * 1000:.3f} ms/page")
+    for (reader_type_name, documents_per_minute) in report["documents_per_minute"].items():
+        console.sublog(f"End to end by {reader_type_name}: {documents_per_minute:.1f} documents/min")
+
+
+def compareWithBaseline(report: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    return whether this run is regressed (different result, or slower than tolerance)
+    """
+    is_regressed = False
+    if report["corpus"] != baseline["corpus"]:
+        console.warn("Corpus differs from baseline, only speed is compared.")
+    else:
+        for (document_name, result_dict) in report["results"].items():
+            baseline_result_dict = baseline["results"].get(document_name)
+            if baseline_result_dict != None and baseline_result_dict != result_dict:
+                changed_rule_names = [
+                    rule_name for rule_name in result_dict.keys()
+                    if result_dict[rule_name] != baseline_result_dict.get(rule_name)
+                ]
+                console.err(f"Result of {document_name} changed: {', '.join(changed_rule_names)}")
+                is_regressed = True
+
+    # (section, is_higher_better)
+    for (section, is_higher_better) in [("pages_per_second", True), ("seconds_per_page_by_rule_type", False),
+                                        ("documents_per_minute", True)]:
+        for (name, value) in report[section].items():
+            baseline_value = baseline.get(section, dict()).get(name)
+            if baseline_value == None or baseline_value == 0:
+                continue
+            change_ratio = value / baseline_value - 1 if is_higher_better else baseline_value / max(value, 1e-12) - 1
+            if change_ratio < -tolerance:
+                console.err(f"{section} of {name} regressed: {baseline_value:.4g} -> {value:.4g}")
+                is_regressed = True
+
+    if not is_regressed:
+        console.ok("No regression against baseline.")
+    return is_regressed
+
+
+if __name__ == "__main__":
+    main()
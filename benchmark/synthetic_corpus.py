@@ -0,0 +1,82 @@
+import os
+import random
+import fitz
+
+# Phrases that make rules in statement_dict fire
+keyword_phrases = [
+    "conflict of interest", "protect company assets", "safeguard property and equipment", "gift",
+    "disclose to your manager", "nominal value", "company logo", "cash", "more than $100", "entertainment",
+    "travel", "hotline", "anonymous", "retaliation", "waiver", "investigate", "report a concern",
+    "accurate and complete records", "misleading", "timely", "understandable", "fair", "full disclosure",
+    "accounting", "defer expenses", "political contribution", "committee", "organization", "pressure",
+    "respect cultural difference", "race", "religion", "national origin", "sex", "harassment", "prohibit",
+    "antitrust", "price fixing", "foreign government official", "meals and courtesies", "payment",
+    "reasonable", "properly", "legal", "necessary", "rebate", "discount", "insider trading",
+    "personal gain", "stock", "securities", "boycott", "anti-boycott", "legal department",
+    "collect information about competitor", "improper", "corrupt", "bribe", "lobby", "real estate",
+    "natural resources", "honesty", "integrity", "loyalty", "faithful", "confidential", "information",
+    "sarbanes-oxley", "family", "relatives", "friend", "serve as a director", "outside employment",
+    "sign annually", "review every period", "terminate", "disciplinary action",
+]
+
+filler_words = [
+    "revenue", "growth", "market", "segment", "quarter", "fiscal", "operating", "margin", "customer",
+    "product", "service", "global", "region", "strategy", "investment", "capital", "net", "income",
+    "total", "year", "increase", "decrease", "compared", "primarily", "due", "the", "and", "of", "to", "in",
+]
+
+
+def buildSyntheticCorpus(corpus_dir: str, document_count: int = 12, seed: int = 0) -> list[str]:
+    """
+    Build PDFs (same seed, same corpus) with different page counts, column layouts and keyword densities.
+    Existing files with same name are replaced.
+    return [pdf_path]
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    random_generator = random.Random(seed)
+
+    pdf_paths = []
+    for document_index in range(document_count):
+        page_count = random_generator.choice([6, 12, 24, 40, 80])
+        column_count = random_generator.choice([1, 2, 3])
+        keyword_density = random_generator.choice([0.002, 0.01, 0.05])
+        has_content_page = random_generator.random() < 0.7
+
+        pdf_document = fitz.open()
+        for page_index in range(page_count):
+            page = pdf_document.new_page()
+            if has_content_page and page_index == 1:
+                page.insert_text((72, 60), "table of contents", fontsize=14)
+
+            column_width = (page.rect.width - 100) / column_count
+            for column_index in range(column_count):
+                column_rect = fitz.Rect(
+                    50 + column_index * column_width, 80, 50 + (column_index + 1) * column_width - 10,
+                    page.rect.height - 50
+                )
+                page.insert_textbox(
+                    column_rect, getRandomParagraph(random_generator, keyword_density, word_count=900 // column_count),
+                    fontsize=7
+                )
+
+        pdf_path = os.path.join(corpus_dir, f"synthetic_{document_index:03d}.pdf")
+        # No creation date or new file ID, so that same seed gives byte-identical files
+        pdf_document.set_metadata({})
+        pdf_document.save(pdf_path, no_new_id=True)
+        pdf_document.close()
+        pdf_paths.append(pdf_path)
+
+    return pdf_paths
+
+
+def getRandomParagraph(random_generator: random.Random, keyword_density: float, word_count: int) -> str:
+    words = []
+    while len(words) < word_count:
+        if random_generator.random() < keyword_density:
+            words.extend(random_generator.choice(keyword_phrases).split())
+        else:
+            words.append(random_generator.choice(filler_words))
+        # End a sentence sometimes
+        if random_generator.random() < 0.08:
+            words[-1] += "."
+    return " ".join(words)
@@ -1,37 +1,235 @@
+import argparse
 import os
-import shutil
-from processor.checker import checkDocument
-from processor.outputer import writeFinalResultToExcel, writeResultToWord
+from processor.batch import checkDocumentsInBatch
+from processor.checker import getEvaluationKey, getRuleCheckFingerprints, rule_set_fingerprint
+from processor.outputer import (
+    getRecordedTotals, openHitMatrix, openTotalsSink, recordDocumentHits, saveHitMatrix, writeFinalResultToExcel,
+    writeResultToWord
+)
+from processor.profiler import writeBatchProfile
 from processor.reader import ReaderType
-from util.read_file import getPDFFilePathGenerator
+from processor.regex_cost import reportRegexCost
+from processor.run_manifest import RunManifest
+from processor.statement_info import getAllRuleRegexs, getHashOfDefinition, setCaseFoldedMatching, statement_dict
+from util.read_file import getFileContentHash, getPDFFilePathGenerator
 from util.console import console
 
-# Start program
-console.info("Starting program")
 
-# Read each PDF file
-# for pdf_file_path in ["./pdf/yahoo.pdf", ]:
-for pdf_file_path in getPDFFilePathGenerator("./pdf/"):
-    # Name of result word file
-    company_name = " ".join(os.path.split(pdf_file_path)[-1].split(".")[0:-1])
-    result_word_file_name = company_name + ".docx"
-    result_word_file_path = "./result/" + result_word_file_name
-    console.info("Processing on " + company_name + ".pdf")
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description="Check the code of ethics in each PDF under ./pdf/")
+    argument_parser.add_argument(
+        "--reader", choices=["pymupdf", "pdfplumber"], default="pymupdf",
+        help="library extracting text of PDF (only this one is loaded), default pymupdf"
+    )
+    argument_parser.add_argument(
+        "--workers", type=int, default=1,
+        help="number of documents checked at the same time (each in its own process), default 1"
+    )
+    argument_parser.add_argument(
+        "--text-store", default="./cache/page_text.sqlite3",
+        help="file saving extracted text of pages, reused when the same PDF is checked again"
+    )
+    argument_parser.add_argument(
+        "--no-text-store", action="store_true", help="always extract text from PDF, do not use --text-store"
+    )
+    argument_parser.add_argument(
+        "--prefetch-pages", type=int, default=0,
+        help="extract at most this many pages ahead in another thread while checking current page, default 0 (off)"
+    )
+    argument_parser.add_argument(
+        "--page-window", type=int, default=None, metavar="LOOKAHEAD",
+        help="keep text of only current page, its nearby pages, and LOOKAHEAD more pages (read ahead) in memory"
+    )
+    argument_parser.add_argument(
+        "--document-text", action="store_true",
+        help="read all pages of a document into one text first, text around hits near edge of page is sliced from it "
+             "(whole document in memory, --prefetch-pages and --page-window are not used)"
+    )
+    argument_parser.add_argument(
+        "--profile", default=None, metavar="DIR",
+        help="record time of each rule and regex, write it to DIR per document and for the whole batch"
+    )
+    argument_parser.add_argument(
+        "--profile-top", type=int, default=10, metavar="N", help="show N hottest rules after the run, default 10"
+    )
+    argument_parser.add_argument(
+        "--regex-time-budget", type=float, default=None, metavar="SECONDS",
+        help="stop one regex search using more than SECONDS (treated as not found), default no limit"
+    )
+    argument_parser.add_argument(
+        "--case-fold", action="store_true",
+        help="fold text of pages to lower case once, and match rules without IGNORECASE (faster on long text)"
+    )
+    argument_parser.add_argument(
+        "--regex-report", action="store_true", help="report risky and expensive regexs of rules before checking"
+    )
+    argument_parser.add_argument(
+        "--log-level", choices=["detail", "info", "warn", "err"], default="detail",
+        help="print only logs of this level and above, default detail (everything)"
+    )
+    argument_parser.add_argument("--quiet", action="store_true", help="print only warnings and errors")
+    argument_parser.add_argument(
+        "--event-log", default=None, metavar="PATH", help="append logs and found rules as JSON lines to PATH"
+    )
+    argument_parser.add_argument(
+        "--manifest", default="./cache/manifest.sqlite3",
+        help="file recording results and outputs of each PDF, to skip unchanged documents and resume a stopped run"
+    )
+    argument_parser.add_argument(
+        "--no-manifest", action="store_true", help="check and write every document again, do not use --manifest"
+    )
+    args = argument_parser.parse_args()
+    if args.workers < 1:
+        argument_parser.error("--workers must be at least 1")
 
-    # Summon a word file for saving the result
-    shutil.copy("./CoE Template 2.docx", result_word_file_path)
+    console.setPrintLevel(getattr(console, "level_" + args.log_level))
+    if args.quiet:
+        console.setQuiet()
+    if args.event_log != None:
+        console.openEventSink(args.event_log)
+    setCaseFoldedMatching(args.case_fold)
 
-    # Get checking result, and write to word file
-    result_dict = checkDocument(pdf_file_path, ReaderType.type_pymupdf)
+    # Start program
+    console.info("Starting program")
 
-    # Write result to doc
-    writeResultToWord(result_word_file_path, result_dict, company_name)
+    if args.regex_report:
+        reportRegexCost(getAllRuleRegexs())
+
+    # Read each PDF file
+    # pdf_file_paths = ["./pdf/yahoo.pdf", ]
+    pdf_file_paths = list(getPDFFilePathGenerator("./pdf/"))
+    company_names = [getCompanyName(pdf_file_path) for pdf_file_path in pdf_file_paths]
+    template_path = "./CoE Template 2.docx"
+    reader_type = ReaderType["type_" + args.reader]
+
+    manifest = None if args.no_manifest else RunManifest(args.manifest)
+    # Totals of each document are saved once it is finished, not only at the end.
+    # Totals of previous run are kept (one row for each PDF still in ./pdf/), if unchanged documents may be skipped.
+    openTotalsSink("./result/Totals.csv", is_new_run=manifest == None, company_names=company_names)
+
+    content_hashes = [getFileContentHash(pdf_file_path) for pdf_file_path in pdf_file_paths]
+    # Outputs are written again if content, rules or template changed
+    output_fingerprint = getHashOfDefinition([rule_set_fingerprint, getFileContentHash(template_path)])
+
+    # Result of every document is also kept in one matrix, Totals.xlsx is made from it
+    openHitMatrix(company_names, template_path)
+
+    # Results of rules saved by previous run (or by a stopped run) are reused, only changed or new rules are checked
+    rule_fingerprints = getRuleCheckFingerprints()
+    # {evaluation_key: {rule_name: is_fulfilled}}
+    saved_results_of_evaluation_key: dict[str, dict[str, bool | None]] = dict()
+    # {evaluation_key: [document_index]}, same content under different names is checked once
+    documents_of_evaluation_key: dict[str, list[int]] = dict()
+    recorded_company_names = getRecordedTotals().keys()
+    for document_index in range(len(pdf_file_paths)):
+        company_name = company_names[document_index]
+        evaluation_key = getEvaluationKey(content_hashes[document_index], reader_type)
+        if evaluation_key not in saved_results_of_evaluation_key:
+            rule_results = dict() if manifest == None else manifest.getRuleResults(evaluation_key)
+            saved_results_of_evaluation_key[evaluation_key] = {
+                rule_name: is_fulfilled for (rule_name, (rule_fingerprint, is_fulfilled)) in rule_results.items()
+                if rule_fingerprints.get(rule_name) == rule_fingerprint
+            }
+
+        if manifest != None and company_name in recorded_company_names \
+                and os.path.exists(getResultWordFilePath(company_name)) \
+                and len(saved_results_of_evaluation_key[evaluation_key]) == len(statement_dict) \
+                and manifest.isOutputDone(pdf_file_paths[document_index], content_hashes[document_index], output_fingerprint):
+            console.info("Skipped " + company_name + ".pdf, nothing changed since last run")
+            recordDocumentHits(document_index, saved_results_of_evaluation_key[evaluation_key])
+            continue
+        documents_of_evaluation_key.setdefault(evaluation_key, []).append(document_index)
+        # Outputs written by previous run are not valid once this run starts writing them again
+        if manifest != None:
+            manifest.setOutputStatus(
+                pdf_file_paths[document_index], content_hashes[document_index], output_fingerprint, "pending"
+            )
+
+    def finishDocuments(evaluation_key: str, result_dict: dict[str, bool]) -> None:
+        for document_index in documents_of_evaluation_key[evaluation_key]:
+            writeDocumentOutput(company_names[document_index], result_dict, template_path)
+            recordDocumentHits(document_index, result_dict)
+            if manifest != None:
+                manifest.setOutputStatus(
+                    pdf_file_paths[document_index], content_hashes[document_index], output_fingerprint, "done"
+                )
+
+    evaluation_keys_to_check = []
+    # {evaluation_key: [rule_name]}, None for all rules
+    rules_to_check_of_evaluation_key: dict[str, list[str] | None] = dict()
+    for evaluation_key in documents_of_evaluation_key.keys():
+        rule_names_to_check = [
+            rule_name for rule_name in statement_dict.keys() if rule_name not in saved_results_of_evaluation_key[evaluation_key]
+        ]
+        first_company_name = company_names[documents_of_evaluation_key[evaluation_key][0]]
+        if len(rule_names_to_check) == 0:
+            console.info("Reuse result of " + first_company_name + ".pdf")
+            finishDocuments(evaluation_key, saved_results_of_evaluation_key[evaluation_key])
+        else:
+            if 0 < len(saved_results_of_evaluation_key[evaluation_key]):
+                console.info(f"Check {len(rule_names_to_check)} changed or new rules of {first_company_name}.pdf")
+            evaluation_keys_to_check.append(evaluation_key)
+            rules_to_check_of_evaluation_key[evaluation_key] = \
+                None if len(rule_names_to_check) == len(statement_dict) else rule_names_to_check
+
+    # Only documents checked by this run are in the batch profile, not skipped ones or profiles of previous runs
+    checked_pdf_file_paths = []
+    # Result comes in the order of finishing, when using more than one worker
+    for (check_index, pdf_file_path, result_dict, overrun_rule_names) in checkDocumentsInBatch(
+        [pdf_file_paths[documents_of_evaluation_key[evaluation_key][0]] for evaluation_key in evaluation_keys_to_check],
+        reader_type, workers=args.workers,
+        only_rules_of_documents=[rules_to_check_of_evaluation_key[evaluation_key] for evaluation_key in evaluation_keys_to_check],
+        text_store_path=None if args.no_text_store else args.text_store,
+        prefetch_pages=args.prefetch_pages, window_lookahead=args.page_window, profile_dir=args.profile,
+        regex_time_budget=args.regex_time_budget, use_document_text=args.document_text
+    ):
+        evaluation_key = evaluation_keys_to_check[check_index]
+        checked_pdf_file_paths.append(pdf_file_path)
+        if manifest != None:
+            # Result of a rule whose regex was stopped by --regex-time-budget may be wrong, check it again next run
+            if len(overrun_rule_names) > 0:
+                console.warn(f"Result of {len(overrun_rule_names)} rules of {os.path.basename(pdf_file_path)} "
+                             f"not saved, regex time budget was used up: " + ", ".join(overrun_rule_names))
+            manifest.putRuleResults(evaluation_key, {
+                rule_name: (rule_fingerprints[rule_name], is_fulfilled) for (rule_name, is_fulfilled) in result_dict.items()
+                if rule_name not in overrun_rule_names
+            })
+        # Merge with saved results of unchanged rules, in the order of statement_dict
+        merged_result_dict = saved_results_of_evaluation_key[evaluation_key] | result_dict
+        finishDocuments(evaluation_key, {rule_name: merged_result_dict[rule_name] for rule_name in statement_dict.keys()})
+
+    # Use a excel file to save result, in the same order as the PDF files are listed
+    writeFinalResultToExcel(company_order=company_names)
+    saveHitMatrix("./result/Hits.npz")
+
+    if args.profile != None:
+        writeBatchProfile(args.profile, checked_pdf_file_paths, top_n=args.profile_top)
+
+    if manifest != None:
+        manifest.close()
+
+    # Finishing up
+    console.ok("Finished all of the documents, and wrote result to excel file.")
+
+
+def writeDocumentOutput(company_name: str, result_dict: dict[str, bool], template_path: str) -> None:
+    result_word_file_path = getResultWordFilePath(company_name)
+    console.info("Processed on " + company_name + ".pdf")
+
+    # Write result to a copy of the template
+    writeResultToWord(result_word_file_path, result_dict, company_name, template_path=template_path)
 
     # Finishing one PDF file
-    console.ok("Finished " + result_word_file_name)
+    console.ok("Finished " + os.path.basename(result_word_file_path))
+
+
+def getResultWordFilePath(company_name: str) -> str:
+    return "./result/" + company_name + ".docx"
+
+
+def getCompanyName(pdf_file_path: str) -> str:
+    return " ".join(os.path.split(pdf_file_path)[-1].split(".")[0:-1])
 
-# Use a excel file to save result
-writeFinalResultToExcel()
 
-# Finishing up
-console.ok("Finished all of the documents, and wrote result to excel file.")
+if __name__ == "__main__":
+    main()
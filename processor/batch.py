@@ -0,0 +1,68 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, Iterator
+from processor.checker import checkDocumentWithOverruns
+from processor import case_folding
+from processor.reader import ReaderType
+from processor.statement_info import setCaseFoldedMatching
+from util.console import console
+
+
+def checkDocumentsInBatch(pdf_paths: list[str], reader_type: ReaderType = ReaderType.type_pdfplumber,
+                          workers: int = 1, only_rules_of_documents: list[Iterable[str] | None] | None = None,
+                          **check_options) -> Iterator[tuple[int, str, dict[str, bool], list[str]]]:
+    """
+    Check documents, `workers` documents at the same time (in different processes).
+    yield (index_in_pdf_paths, pdf_path, result_dict, overrun_rule_names) as soon as one document is finished,
+    so the order of yielding is the order of finishing, not the order of `pdf_paths`.
+    `overrun_rule_names`: rules having a regex stopped by regex time budget, see checkDocumentWithOverruns
+    `check_options` are passed to checkDocument, example: text_store_path="./cache/page_text.sqlite3"
+    If `only_rules_of_documents` given, document of `pdf_paths[i]` is checked by `only_rules_of_documents[i]` only.
+    """
+    if only_rules_of_documents == None:
+        only_rules_of_documents = [None] * len(pdf_paths)
+
+    # Only one worker, do not summon process (same as before)
+    if workers <= 1:
+        for (document_index, pdf_path) in enumerate(pdf_paths):
+            yield document_index, pdf_path, *checkDocumentWithOverruns(
+                pdf_path, reader_type=reader_type, only_rules=only_rules_of_documents[document_index], **check_options
+            )
+        return
+
+    # Events logged before are not written again by forked workers
+    console.flushEvents()
+    executor = ProcessPoolExecutor(
+        max_workers=workers, initializer=setBatchWorker,
+        initargs=(
+            console.print_level, console.event_sink_path, console.event_sink_level, case_folding.is_case_folded_matching
+        )
+    )
+    try:
+        future_to_document = {
+            executor.submit(
+                checkDocumentWithOverruns, pdf_path, reader_type=reader_type, only_rules=only_rules_of_documents[document_index],
+                **check_options
+            ): (document_index, pdf_path)
+            for (document_index, pdf_path) in enumerate(pdf_paths)
+        }
+        for future in as_completed(future_to_document):
+            document_index, pdf_path = future_to_document[future]
+            yield document_index, pdf_path, *future.result()
+    finally:
+        # If stopped halfway (error, or caller break the loop), do not wait for documents not started
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def setWorkerConsole(print_level: int, event_sink_path: str | None, event_sink_level: int) -> None:
+    """
+    Same console settings as main process, in worker process (not inherited if process is spawned)
+    """
+    console.setPrintLevel(print_level)
+    if event_sink_path != None:
+        console.openEventSink(event_sink_path, event_sink_level)
+
+
+def setBatchWorker(print_level: int, event_sink_path: str | None, event_sink_level: int,
+                   is_case_folded_matching: bool) -> None:
+    setWorkerConsole(print_level, event_sink_path, event_sink_level)
+    setCaseFoldedMatching(is_case_folded_matching)
@@ -0,0 +1,183 @@
+import re
+import unicodedata
+
+
+# If True, page text is folded to lower case once (see `foldPageText`), and rules are compiled in lower case
+#   without IGNORECASE (much slower on long text) and MULTILINE (no new line left after normalizing page text).
+# Off by default, set by `setCaseFoldedMatching` in statement_info (rules compiled before are compiled again).
+is_case_folded_matching = False
+
+
+class FoldedText(str):
+    """
+    Text in lower case, for matching by case folded regexs. It is as long as the text before folding,
+    so a hit at the same position in `original_text` is the same text in original casing (used to show hits).
+    """
+    original_text: str
+
+    def __new__(cls, folded_text: str, original_text: str) -> "FoldedText":
+        text = super().__new__(cls, folded_text)
+        text.original_text = original_text
+        return text
+
+
+def foldPageText(text: str) -> FoldedText:
+    folded_text = text.lower()
+    if len(folded_text) != len(text):
+        # Few chars become longer in lower case (example: "İ"), they are kept as they are
+        folded_text = "".join(char.lower() if len(char.lower()) == 1 else char for char in text)
+    return FoldedText(folded_text, text)
+
+
+def getOriginalText(text: str) -> str:
+    """
+    Text before folding, if `text` is folded
+    """
+    return text.original_text if isinstance(text, FoldedText) else text
+
+
+# Escape giving a char by its code (\x41, \u0041, \U00000041, \N{...}, octal \101), or any other escape (\S, \., ...)
+regex_escape_regex = re.compile(
+    r"\\(?:x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|N\{[^}]*\}|0[0-7]{0,2}|[0-7]{3}|.)", re.DOTALL
+)
+# Names of groups, (?P<name>, (?P=name), (?(name)
+regex_group_name_regex = re.compile(r"\(\?(?:P<\w+>|P=\w+\)|\(\w+\))")
+
+
+def getCaseFoldedRegexSource(regex_str: str) -> str:
+    """
+    Same regex for text in lower case (without IGNORECASE): letters are lowered, escapes (example: \\S \\D \\W \\B)
+    and group names are kept, a char given by its code is given as lower case char.
+    Sets are rewritten by `_getCaseFoldedSetSource`.
+    """
+    pieces = []
+    index = 0
+    while index < len(regex_str):
+        escape_match = regex_escape_regex.match(regex_str, index)
+        if escape_match != None:
+            escaped_char = getCharOfCodeEscape(escape_match.group())
+            if escaped_char != None and len(escaped_char.lower()) == 1 and escaped_char.lower() != escaped_char:
+                pieces.append(re.escape(escaped_char.lower()))
+            else:
+                pieces.append(escape_match.group())
+            index = escape_match.end()
+            continue
+
+        group_name_match = regex_group_name_regex.match(regex_str, index)
+        if group_name_match != None:
+            pieces.append(group_name_match.group())
+            index = group_name_match.end()
+            continue
+
+        if regex_str[index] == "[":
+            set_source, index = _getCaseFoldedSetSource(regex_str, index)
+            pieces.append(set_source)
+            continue
+
+        char = regex_str[index]
+        pieces.append(char.lower() if len(char.lower()) == 1 else char)
+        index += 1
+
+    return "".join(pieces)
+
+
+def _getCaseFoldedSetSource(regex_str: str, index: int) -> tuple[str, int]:
+    """
+    Set starting at regex_str[index] ("["), for text in lower case. return (source, index_after_set)
+    A range of upper case letters only is lowered (example: [A-Z] to [a-z]). Other ranges having upper case letters
+    (example: [A-z], which also has "[" to "`") are kept, and lower case of those letters is added.
+    """
+    pieces = ["["]
+    index += 1
+    if regex_str.startswith("^", index):
+        pieces.append("^")
+        index += 1
+
+    # [(source, char)], char is None for escapes not giving one char (example: \w)
+    items: list[tuple[str, str | None]] = []
+    # "]" first in set is a char
+    while index < len(regex_str) and (regex_str[index] != "]" or len(items) == 0):
+        escape_match = regex_escape_regex.match(regex_str, index)
+        if escape_match != None:
+            escape = escape_match.group()
+            items.append((escape, getCharOfCodeEscape(escape) or (escape[1] if not escape[1].isalnum() else None)))
+            index = escape_match.end()
+        else:
+            items.append((regex_str[index], regex_str[index]))
+            index += 1
+
+    item_index = 0
+    while item_index < len(items):
+        source, char = items[item_index]
+        # A range, "-" at end of set is a char
+        if item_index + 2 < len(items) and items[item_index + 1][0] == "-" \
+                and char != None and items[item_index + 2][1] != None:
+            end_source, end_char = items[item_index + 2]
+            pieces.append(_getCaseFoldedRangeSource(source, char, end_source, end_char))
+            item_index += 3
+            continue
+
+        if char != None and len(char.lower()) == 1 and char.lower() != char:
+            pieces.append(re.escape(char.lower()))
+        else:
+            pieces.append(source)
+        item_index += 1
+
+    # Closing "]" (missing one is left for re.compile to report)
+    pieces.append(regex_str[index:index + 1])
+    return "".join(pieces), index + 1
+
+
+def _getCaseFoldedRangeSource(start_source: str, start_char: str, end_source: str, end_char: str) -> str:
+    chars = [chr(code) for code in range(ord(start_char), ord(end_char) + 1)]
+    lower_chars = [char.lower() for char in chars]
+    # No upper case letter (or an invalid range, left for re.compile to report)
+    if len(chars) == 0 or lower_chars == chars:
+        return start_source + "-" + end_source
+    # Upper case letters only, lowered in the same order (example: A-Z, À-Ö)
+    if all(len(lower_char) == 1 and lower_char != char for (char, lower_char) in zip(chars, lower_chars)) \
+            and all(ord(lower_chars[char_index]) == ord(lower_chars[0]) + char_index for char_index in range(len(chars))):
+        return re.escape(lower_chars[0]) + "-" + re.escape(lower_chars[-1])
+
+    # Crossing edge of upper case letters: chars in range are kept, lower case of its letters is added
+    added_codes = sorted({
+        ord(lower_char) for (char, lower_char) in zip(chars, lower_chars)
+        if len(lower_char) == 1 and lower_char != char and not start_char <= lower_char <= end_char
+    })
+    pieces = [start_source + "-" + end_source]
+    code_index = 0
+    while code_index < len(added_codes):
+        run_end_index = code_index
+        while run_end_index + 1 < len(added_codes) and added_codes[run_end_index + 1] == added_codes[run_end_index] + 1:
+            run_end_index += 1
+        pieces.append(re.escape(chr(added_codes[code_index])))
+        if run_end_index > code_index:
+            pieces.append("-" + re.escape(chr(added_codes[run_end_index])))
+        code_index = run_end_index + 1
+    return "".join(pieces)
+
+
+def getCharOfCodeEscape(escape: str) -> str | None:
+    """
+    Char given by escape like \\x41 or \\N{LATIN CAPITAL LETTER A}, or None for other escapes
+    """
+    match escape[1]:
+        case "x" | "u" | "U":
+            return chr(int(escape[2:], base=16))
+        case "N":
+            return unicodedata.lookup(escape[3:-1])
+        case "0" | "1" | "2" | "3" | "4" | "5" | "6" | "7" if escape[1] == "0" or len(escape) == 4:
+            return chr(int(escape[1:], base=8))
+        case _:
+            return None
+
+
+def getMatchingRegexSource(regex_str: str) -> str:
+    """
+    Regex as compiled for matching, see `is_case_folded_matching`
+    """
+    return getCaseFoldedRegexSource(regex_str) if is_case_folded_matching else regex_str
+
+
+def getMatchingRegexFlags() -> re.RegexFlag:
+    return re.NOFLAG if is_case_folded_matching else re.IGNORECASE | re.MULTILINE
@@ -0,0 +1,318 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+from processor.batch import setWorkerConsole
+from processor import case_folding
+from processor.checker import checkDocumentWithEvidence
+from processor.reader import ReaderType, importBackend
+from processor.statement_info import setCaseFoldedMatching, statement_dict
+from util.console import console
+
+
+class CheckService:
+    """
+    Check documents sent by HTTP (on localhost, or a Unix socket), by worker processes started once for the service,
+    with PDF library imported and rules compiled already, instead of starting a new program for each document.
+
+    POST /check, body is JSON {"pdf_path": "...", "only_rules": ["rule_name", ...]} ("only_rules" is optional),
+        or the PDF itself with "Content-Type: application/pdf" (only_rules given as ?only_rules=rule_a,rule_b).
+        return {"pdf_path": ..., "result": result_dict, "evidence": {rule_name: match_info}, "seconds": ...},
+        evidence is where each fulfilled rule is found, see `MatchResultInfo.toDict`.
+    GET /status, return numbers of workers, running and queued checks.
+
+    At most `workers` documents are checked at the same time, at most `max_queued` more wait for a worker,
+    other requests are answered 503 at once.
+    """
+    workers: int
+    max_queued: int
+    max_body_bytes: int
+    reader_type: ReaderType
+    # Passed to checkDocument, example: text_store_path="./cache/page_text.sqlite3"
+    check_options: dict
+    executor: ProcessPoolExecutor | None
+    worker_semaphore: asyncio.Semaphore | None
+    running_count: int
+    queued_count: int
+
+    def __init__(self, workers: int = 2, max_queued: int = 16, reader_type: ReaderType = ReaderType.type_pymupdf,
+                 max_body_bytes: int = 256 << 20, **check_options) -> None:
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_body_bytes = max_body_bytes
+        self.reader_type = reader_type
+        self.check_options = check_options
+        self.executor = None
+        self.worker_semaphore = None
+        self.running_count = 0
+        self.queued_count = 0
+
+    async def start(self) -> None:
+        """
+        Start worker processes, and wait until all of them are ready
+        """
+        # Compiled here first, so forked workers already have them
+        warmUpChecker(self.reader_type)
+        self.worker_semaphore = asyncio.Semaphore(self.workers)
+        self.executor = self.createExecutor()
+        # Workers are only started when given something to do
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.executor, os.getpid) for _ in range(self.workers)])
+        console.ok(f"{self.workers} workers ready")
+
+    def createExecutor(self) -> ProcessPoolExecutor:
+        # Events logged before are not written again by forked workers
+        console.flushEvents()
+        return ProcessPoolExecutor(
+            max_workers=self.workers, initializer=setServiceWorker,
+            initargs=(
+                console.print_level, console.event_sink_path, console.event_sink_level, self.reader_type,
+                case_folding.is_case_folded_matching
+            )
+        )
+
+    def close(self) -> None:
+        if self.executor != None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, unix_socket_path: str | None = None) -> None:
+        """
+        Serve until stopped, on `unix_socket_path` if given, otherwise on `host`:`port`
+        """
+        await self.start()
+        try:
+            if unix_socket_path != None:
+                # Left by a service stopped before
+                if os.path.exists(unix_socket_path):
+                    os.remove(unix_socket_path)
+                server = await asyncio.start_unix_server(self.handleConnection, path=unix_socket_path)
+                console.info("Listening on " + unix_socket_path)
+            else:
+                server = await asyncio.start_server(self.handleConnection, host=host, port=port)
+                console.info(f"Listening on http://{host}:{port}")
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    async def handleConnection(self, stream_reader: asyncio.StreamReader, stream_writer: asyncio.StreamWriter) -> None:
+        """
+        One HTTP request for each connection
+        """
+        try:
+            try:
+                method, target, headers, body = await self.readRequest(stream_reader)
+                status, response = await self.handleRequest(method, target, headers, body)
+            except (ValueError, UnicodeDecodeError, asyncio.IncompleteReadError) as error:
+                status, response = 400, {"error": "Bad request: " + str(error)}
+            self.writeResponse(stream_writer, status, response)
+            await stream_writer.drain()
+        except ConnectionError:
+            # Client is gone, nothing to answer
+            pass
+        finally:
+            stream_writer.close()
+
+    async def readRequest(self, stream_reader: asyncio.StreamReader) -> tuple[str, str, dict[str, str], bytes]:
+        """
+        return (method, target, {header_name_in_lower_case: value}, body)
+        """
+        request_line = (await stream_reader.readline()).decode("latin-1").rstrip("\r\n")
+        method, target, _ = request_line.split(" ", 2)
+        headers = dict()
+        while True:
+            header_line = (await stream_reader.readline()).decode("latin-1").rstrip("\r\n")
+            if header_line == "":
+                break
+            header_name, header_value = header_line.split(":", 1)
+            headers[header_name.strip().lower()] = header_value.strip()
+
+        body_length = int(headers.get("content-length", "0"))
+        if body_length > self.max_body_bytes:
+            raise ValueError(f"body longer than {self.max_body_bytes} bytes")
+        return method, target, headers, await stream_reader.readexactly(body_length)
+
+    async def handleRequest(self, method: str, target: str, headers: dict[str, str],
+                            body: bytes) -> tuple[int, dict]:
+        """
+        return (status_code, response_json)
+        """
+        url = urlsplit(target)
+        match (method, url.path):
+            case ("GET", "/status"):
+                return 200, {"workers": self.workers, "running": self.running_count, "queued": self.queued_count}
+            case ("POST", "/check"):
+                pass
+            case _:
+                return 404, {"error": f"No {method} {url.path}, use POST /check or GET /status"}
+
+        # Given a PDF file, or a path of it
+        if headers.get("content-type", "").split(";")[0].strip() == "application/pdf":
+            pdf_path = None
+            only_rules = parse_qs(url.query).get("only_rules", [None])[0]
+            only_rules = None if only_rules == None else only_rules.split(",")
+        else:
+            request_dict = json.loads(body)
+            if not isinstance(request_dict, dict) or not isinstance(request_dict.get("pdf_path"), str):
+                return 400, {"error": "Give {\"pdf_path\": \"...\"} as JSON, or the PDF as application/pdf"}
+            pdf_path = request_dict["pdf_path"]
+            only_rules = request_dict.get("only_rules")
+            if only_rules != None and not (isinstance(only_rules, list)
+                                           and all(isinstance(rule_name, str) for rule_name in only_rules)):
+                return 400, {"error": "\"only_rules\" should be a list of rule names"}
+            if not os.path.isfile(pdf_path):
+                return 404, {"error": "No such file: " + pdf_path}
+
+        unknown_rule_names = [rule_name for rule_name in (only_rules or []) if rule_name not in statement_dict]
+        if len(unknown_rule_names) > 0:
+            return 400, {"error": "Unknown rules: " + ", ".join(unknown_rule_names)}
+
+        # All workers busy, and too many waiting
+        if self.worker_semaphore.locked() and self.queued_count >= self.max_queued:
+            return 503, {"error": f"Too many checks waiting ({self.queued_count}), try again later"}
+
+        if pdf_path != None:
+            return await self.checkInWorker(pdf_path, only_rules)
+
+        # Workers read the PDF from a file, written in a thread so that other requests are not blocked
+        temp_pdf_path = await asyncio.to_thread(writeTempPDF, body)
+        try:
+            status, response = await self.checkInWorker(temp_pdf_path, only_rules)
+            if "pdf_path" in response:
+                response["pdf_path"] = None
+            return status, response
+        finally:
+            await asyncio.to_thread(os.remove, temp_pdf_path)
+
+    async def checkInWorker(self, pdf_path: str, only_rules: list[str] | None) -> tuple[int, dict]:
+        self.queued_count += 1
+        try:
+            await self.worker_semaphore.acquire()
+        finally:
+            self.queued_count -= 1
+
+        self.running_count += 1
+        executor = self.executor
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(
+                executor,
+                partial(checkDocumentForService, pdf_path, self.reader_type, only_rules, self.check_options)
+            )
+            return 200, response
+        except BrokenProcessPool as error:
+            # A worker died (example: crashed in PDF library), others are stopped too, start new ones
+            console.err("Worker stopped while checking " + pdf_path + ", restarting workers")
+            # Other requests running at the same time get the same error, only restart once
+            if self.executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self.createExecutor()
+            return 500, {"error": "Worker stopped: " + str(error)}
+        except Exception as error:
+            console.err("Failed to check " + pdf_path + ": " + repr(error))
+            return 500, {"error": repr(error)}
+        finally:
+            self.running_count -= 1
+            self.worker_semaphore.release()
+
+    def writeResponse(self, stream_writer: asyncio.StreamWriter, status: int, response: dict) -> None:
+        response_body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error",
+                  503: "Service Unavailable"}.get(status, "")
+        stream_writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(response_body)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + response_body
+        )
+
+
+def writeTempPDF(body: bytes) -> str:
+    """
+    Write uploaded PDF to a temp file, return its path
+    """
+    temp_file_descriptor, temp_pdf_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(temp_file_descriptor, "wb") as temp_pdf_file:
+            temp_pdf_file.write(body)
+    except BaseException:
+        os.remove(temp_pdf_path)
+        raise
+    return temp_pdf_path
+
+
+def warmUpChecker(reader_type: ReaderType) -> None:
+    """
+    Import the PDF library and compile all rules now, not when first document comes
+    """
+    importBackend(reader_type)
+    for statement_info in statement_dict.values():
+        statement_info.check_rule.compileAll()
+
+
+def setServiceWorker(print_level: int, event_sink_path: str | None, event_sink_level: int,
+                     reader_type: ReaderType, is_case_folded_matching: bool) -> None:
+    setWorkerConsole(print_level, event_sink_path, event_sink_level)
+    setCaseFoldedMatching(is_case_folded_matching)
+    warmUpChecker(reader_type)
+
+
+def checkDocumentForService(pdf_path: str, reader_type: ReaderType, only_rules: list[str] | None,
+                            check_options: dict) -> dict:
+    """
+    Run in worker process, return response of /check
+    """
+    start_time = time.perf_counter()
+    result_dict, evidence_dict = checkDocumentWithEvidence(
+        pdf_path, reader_type=reader_type, only_rules=only_rules, **check_options
+    )
+    return {
+        "pdf_path": pdf_path, "result": result_dict, "evidence": evidence_dict,
+        "seconds": time.perf_counter() - start_time
+    }
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Serve checking of documents to local programs")
+    argument_parser.add_argument("--host", default="127.0.0.1", help="default 127.0.0.1 (only this computer)")
+    argument_parser.add_argument("--port", type=int, default=8765, help="default 8765")
+    argument_parser.add_argument(
+        "--unix-socket", default=None, metavar="PATH", help="listen on a Unix socket at PATH, instead of --host/--port"
+    )
+    argument_parser.add_argument(
+        "--workers", type=int, default=2, help="number of documents checked at the same time, default 2"
+    )
+    argument_parser.add_argument(
+        "--max-queued", type=int, default=16,
+        help="number of requests waiting for a worker, more requests are refused (503), default 16"
+    )
+    argument_parser.add_argument("--reader", choices=["pymupdf", "pdfplumber"], default="pymupdf")
+    argument_parser.add_argument("--text-store", default="./cache/page_text.sqlite3")
+    argument_parser.add_argument("--no-text-store", action="store_true")
+    argument_parser.add_argument("--regex-time-budget", type=float, default=None, metavar="SECONDS")
+    argument_parser.add_argument("--case-fold", action="store_true")
+    argument_parser.add_argument("--log-level", choices=["detail", "info", "warn", "err"], default="info")
+    argument_parser.add_argument("--event-log", default=None, metavar="PATH")
+    args = argument_parser.parse_args()
+    if args.workers < 1:
+        argument_parser.error("--workers must be at least 1")
+
+    console.setPrintLevel(getattr(console, "level_" + args.log_level))
+    if args.event_log != None:
+        console.openEventSink(args.event_log)
+    setCaseFoldedMatching(args.case_fold)
+
+    check_service = CheckService(
+        workers=args.workers, max_queued=args.max_queued, reader_type=ReaderType["type_" + args.reader],
+        text_store_path=None if args.no_text_store else args.text_store, regex_time_budget=args.regex_time_budget
+    )
+    try:
+        asyncio.run(check_service.serve(args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        console.info("Service stopped")
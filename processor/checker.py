@@ -1,192 +1,475 @@
 import re
-from typing import Callable
-from processor.reader import PDFFile, ReaderType, getReadByPagesGenerator
+import time
+from typing import Callable, Iterable
+from processor import case_folding, profiler
+from processor.case_folding import FoldedText, foldPageText, getOriginalText
+from processor.profiler import CheckProfiler, profiledRegexCall
+from processor.proximity import PageProximityIndex
+from processor.regex_cost import setRegexTimeBudget
+from processor.reader import (
+    DocumentText, NormalizedText, PDFFile, ReaderType, getExtractorVersion, getReadByPagesGenerator
+)
+from processor.rule_scheduler import RuleScheduler
 from processor.statement_info import ItemMatchingRule, AnyRegexFulfilled, ReachPercentage, NearbyPageMatching, NearbyCharMatching
 
-from processor.statement_info import statement_dict
-from util.console import console
+from processor.statement_info import getRuleSetFingerprint, statement_dict
+from processor.token_index import PageTokenIndex
+from util.console import LazyText, console
 
 
 class MatchResultInfo:
     trigget_at_page: int
-    trigger_text: str
     nearby_at_page: int | None
-    nearby_text: str | None
-
-    def __init__(self, trigget_at_page: int, trigger_text: str, nearby_at_page: int = None, nearby_text: str = None) -> None:
+    # Text around hit may be given as a function making it, so it is made only when read (often not printed)
+    _trigger_text: str | Callable[[], str]
+    _nearby_text: str | Callable[[], str] | None
+    # (span_in_raw_text_of_page, raw_text_around), hit as extracted from PDF before normalizing, also made when read.
+    # None if raw text is not known.
+    _trigger_raw: tuple[tuple[int, int], str] | Callable[[], tuple[tuple[int, int], str] | None] | None
+    _nearby_raw: tuple[tuple[int, int], str] | Callable[[], tuple[tuple[int, int], str] | None] | None
+
+    def __init__(self, trigget_at_page: int, trigger_text: str | Callable[[], str],
+                 nearby_at_page: int = None, nearby_text: str | Callable[[], str] = None,
+                 trigger_raw: Callable[[], tuple[tuple[int, int], str] | None] = None,
+                 nearby_raw: Callable[[], tuple[tuple[int, int], str] | None] = None) -> None:
         self.trigget_at_page = trigget_at_page
-        self.trigger_text = trigger_text
+        self._trigger_text = trigger_text
         self.nearby_at_page = nearby_at_page
-        self.nearby_text = nearby_text
+        self._nearby_text = nearby_text
+        self._trigger_raw = trigger_raw
+        self._nearby_raw = nearby_raw
+
+    @property
+    def trigger_text(self) -> str:
+        if callable(self._trigger_text):
+            self._trigger_text = self._trigger_text()
+        return self._trigger_text
+
+    @property
+    def nearby_text(self) -> str | None:
+        if callable(self._nearby_text):
+            self._nearby_text = self._nearby_text()
+        return self._nearby_text
+
+    @property
+    def trigger_raw_span(self) -> tuple[int, int] | None:
+        """
+        Position of trigger hit in raw extracted text of its page
+        """
+        if callable(self._trigger_raw):
+            self._trigger_raw = self._trigger_raw()
+        return None if self._trigger_raw == None else self._trigger_raw[0]
+
+    @property
+    def trigger_raw_text(self) -> str | None:
+        """
+        Raw extracted text around trigger hit (new lines, ligatures and broken words as they are)
+        """
+        return None if self.trigger_raw_span == None else self._trigger_raw[1]
+
+    @property
+    def nearby_raw_span(self) -> tuple[int, int] | None:
+        if callable(self._nearby_raw):
+            self._nearby_raw = self._nearby_raw()
+        return None if self._nearby_raw == None else self._nearby_raw[0]
+
+    @property
+    def nearby_raw_text(self) -> str | None:
+        return None if self.nearby_raw_span == None else self._nearby_raw[1]
+
+    def toDict(self) -> dict[str, int | str | list[int] | None]:
+        """
+        Text without colour of highlighting, example: for JSON
+        """
+        return {
+            "trigger_at_page": self.trigget_at_page,
+            "trigger_text": console.ansi_code_regex.sub("", self.trigger_text),
+            "trigger_raw_span": None if self.trigger_raw_span == None else list(self.trigger_raw_span),
+            "trigger_raw_text": None if self.trigger_raw_text == None
+            else console.ansi_code_regex.sub("", self.trigger_raw_text),
+            "nearby_at_page": self.nearby_at_page,
+            "nearby_text": None if self.nearby_text == None else console.ansi_code_regex.sub("", self.nearby_text),
+            "nearby_raw_span": None if self.nearby_raw_span == None else list(self.nearby_raw_span),
+            "nearby_raw_text": None if self.nearby_raw_text == None
+            else console.ansi_code_regex.sub("", self.nearby_raw_text)
+        }
 
 
 def checkDocument(pdf_path: str,
                   skip_content_pages: bool = True,
-                  reader_type: ReaderType = ReaderType.type_pdfplumber) -> dict[str, bool]:
+                  reader_type: ReaderType = ReaderType.type_pdfplumber,
+                  text_store_path: str | None = None,
+                  prefetch_pages: int = 0,
+                  window_lookahead: int | None = None,
+                  profile_dir: str | None = None,
+                  regex_time_budget: float | None = None,
+                  only_rules: Iterable[str] | None = None,
+                  use_document_text: bool = False) -> dict[str, bool]:
     """
     Check the whole document whether it fulfill requirement or not
     return {requirement_name: is_fulfilled} Example: {"statement_by_chairman": true}
+    If `text_store_path` given, extracted text of pages is reused from (or saved to) that file.
+    If `prefetch_pages` > 0, next pages are extracted (at most that many) while checking current page.
+    If `window_lookahead` given, text of pages far from current page is not kept (see PDFFile).
+    If `profile_dir` given, time of each rule and regex is written to that folder (see CheckProfiler).
+    If `regex_time_budget` given, one regex call using more seconds than it is stopped and treated as not found.
+    If `only_rules` given, only those rules are checked (and returned), example: rules changed since last run.
+    If `use_document_text`, all pages are read into one DocumentText first, and text around hits near edge of page
+    is sliced from it (whole document kept in memory, `prefetch_pages` and `window_lookahead` are not used).
+    """
+    # Only profile when asked, timing every regex call is not free
+    profiler.active_profiler = None if profile_dir == None else CheckProfiler(pdf_path)
+    profiler.overrun_regex_patterns = set()
+    setRegexTimeBudget(regex_time_budget)
+    try:
+        result_dict = checkDocumentPages(
+            pdf_path, skip_content_pages, reader_type, text_store_path, prefetch_pages, window_lookahead,
+            statement_dict.keys() if only_rules == None else only_rules, use_document_text
+        )
+        if profiler.active_profiler != None:
+            profiler.active_profiler.writeJSON(profile_dir)
+    finally:
+        global current_document_text
+        profiler.active_profiler = None
+        # Text of whole document is not kept after checking it
+        current_document_text = None
+        setRegexTimeBudget(None)
+        # Worker process may not run exit handlers, write events of this document now
+        console.flushEvents()
+
+    return result_dict
+
+
+def checkDocumentWithEvidence(pdf_path: str, **check_options) -> tuple[dict[str, bool], dict[str, dict]]:
     """
-    result_dict = dict.fromkeys(statement_dict.keys())
+    Same as checkDocument, also return where each fulfilled rule is found.
+    return (result_dict, {rule_name: match_info_dict}), see `MatchResultInfo.toDict`
+    """
+    global found_match_infos
+    found_match_infos = dict()
+    try:
+        result_dict = checkDocument(pdf_path, **check_options)
+        evidence_dict = {rule_name: match_info.toDict() for (rule_name, match_info) in found_match_infos.items()}
+    finally:
+        found_match_infos = None
+    return result_dict, evidence_dict
+
+
+def checkDocumentWithOverruns(pdf_path: str, **check_options) -> tuple[dict[str, bool], list[str]]:
+    """
+    Same as checkDocument, also return names of rules having a regex stopped by regex time budget.
+    Results of those rules may be wrong (stopped search is treated as not found), so they should not be saved.
+    """
+    result_dict = checkDocument(pdf_path, **check_options)
+    overrun_rule_names = [
+        rule_name for rule_name in result_dict.keys()
+        if any(regex.pattern in profiler.overrun_regex_patterns
+               for regex in statement_dict[rule_name].check_rule.compileAll())
+    ]
+    return result_dict, overrun_rule_names
+
+
+def checkDocumentPages(pdf_path: str, skip_content_pages: bool, reader_type: ReaderType,
+                       text_store_path: str | None, prefetch_pages: int,
+                       window_lookahead: int | None, rule_names: Iterable[str],
+                       use_document_text: bool = False) -> dict[str, bool]:
+    # Keep the order of statement_dict
+    rule_names = set(rule_names)
+    result_dict = dict.fromkeys(rule_name for rule_name in statement_dict.keys() if rule_name in rule_names)
 
     # If find near, search may cross the page.
     # Read pages by pages until end
-    with PDFFile(pdf_path, reader_type) as pdf_file:
-        # Clear previous reach_percentage dict
-        global file_check_reach_percentage_result
-        file_check_reach_percentage_result.clear()
+    with PDFFile(pdf_path, reader_type, text_store_path=text_store_path,
+                 prefetch_pages=prefetch_pages, window_lookahead=window_lookahead) as pdf_file:
+        # Hits and reach_percentage memorized for last document are not for this document
+        clearDocumentCaches()
+
+        # Pages are sliced from text of whole document, or read one by one
+        global current_document_text
+        if use_document_text:
+            current_document_text = pdf_file.readDocumentText()
+            if case_folding.is_case_folded_matching:
+                # Folded once for the whole document, pages sliced from it are folded too
+                current_document_text.text = foldPageText(current_document_text.text)
+            page_stream = current_document_text.iterPageAndNearby()
+        else:
+            page_stream = pdf_file.iterPageAndNearby()
 
         # If less than 20 pages, do not do skip content job
         if len(pdf_file) <= 20:
             console.warn(f"Too few pages ({len(pdf_file)} pages in this document) , cannot skip content!")
             skip_content_pages = False
 
-        skip_n_page = 2  # Contains first page
-        have_found_content_page = False
-        skip_content_page_finished = False
-        content_checker = re.compile(r"(?:table\s+of\s+)contents?")
+        content_page_skipper = ContentPageSkipper()
+
+        # If not asked to check, no need to find it
+        has_statement_by_chairman = "statement_by_chairman" not in result_dict
 
-        has_statement_by_chairman = False
+        # {page_index: case_folded_text}, only previous, current and next page
+        folded_text_window: dict[int, FoldedText] = dict()
 
-        for page_index in range(len(pdf_file)):
-            # Always read next page, shuffle previous
-            previous_page_text, current_page_text, next_page_text = pdf_file.getPageAndNearby(page_index)
-            previous_page_text = previous_page_text.replace("\n", " ")
-            current_page_text = current_page_text.replace("\n", " ")
-            next_page_text = next_page_text.replace("\n", " ")
+        # Always read next page, shuffle previous
+        # Text is already normalized once by PDFFile (one line, ligatures replaced)
+        for (page_index, previous_page_text, current_page_text, next_page_text) in page_stream:
+            # Each page is folded once, then reused when it becomes previous/current page
+            if case_folding.is_case_folded_matching and current_document_text == None:
+                for (index, page_text) in [(page_index - 1, previous_page_text),
+                                           (page_index, current_page_text), (page_index + 1, next_page_text)]:
+                    if index not in folded_text_window:
+                        folded_text_window[index] = foldPageText(page_text)
+                folded_text_window.pop(page_index - 2, None)
+                previous_page_text = folded_text_window[page_index - 1]
+                current_page_text = folded_text_window[page_index]
+                next_page_text = folded_text_window[page_index + 1]
 
             # Always search statement by chairman first, it might before content. Check until find it.
             # If over 10 pages, ignore this job (consider not have that statement)
             if not has_statement_by_chairman and page_index <= 10:
                 console.sublog(f"Try to find statement by chairman at page {page_index}.", colour_rgb="124dae")
+                if profiler.active_profiler != None:
+                    profiler.active_profiler.current_rule_name = "statement_by_chairman"
+                rule_start_time = time.perf_counter()
                 is_found, match_info = checkAnyRegexFulFilled(
                     statement_dict["statement_by_chairman"].check_rule, "statement_by_chairman",
                     previous_page_text, current_page_text, next_page_text, page_index
                 )
+                if profiler.active_profiler != None:
+                    profiler.active_profiler.recordRule(
+                        "statement_by_chairman", time.perf_counter() - rule_start_time, page_index
+                    )
                 # Update result
                 result_dict["statement_by_chairman"] = has_statement_by_chairman = is_found
                 if is_found:
                     processMatchInfo(match_info, "statement_by_chairman")
 
             # Skip for "table of content" pages
-            # crude: only skip first page matches "(?:table\sof\s)contents?", and its next page
-            # If this function should skip potential content pages
-            if skip_content_pages and (not skip_content_page_finished):
-                should_skip_result, skip_content_page_finished, skip_n_page = shouldSkipThisPage(
-                    skip_content_page_finished, have_found_content_page, skip_n_page, content_checker,
-                    current_page_text, page_index, pdf_path
+            # crude: only skip first page matches "(?:table\sof\s)contents?", and its next pages
+            # If this function should skip potential content pages.
+            # Pages before content page found are held by skipper, and given back if no content page.
+            pages_to_check = [(page_index, previous_page_text, current_page_text, next_page_text)]
+            if skip_content_pages and (not content_page_skipper.is_finished):
+                pages_to_check = content_page_skipper.feed(*pages_to_check[0])
+
+            for page_to_check in pages_to_check:
+                checkPageByAllRules(result_dict, *page_to_check)
+
+            # If all rules are true, and no need to find statement by chairman, stop reading the rest pages
+            if isAllRuleFulfilled(result_dict) and (has_statement_by_chairman or page_index >= 10):
+                console.sublog(
+                    f"All rules fulfilled at page {page_index}, skip the rest {len(pdf_file) - page_index - 1} pages.",
+                    colour_rgb="124dae"
                 )
-                if type(should_skip_result) == bool and should_skip_result == True:
-                    have_found_content_page = True
-                    continue
-                elif type(should_skip_result) == dict:  # Skip failed, re-do scanning finished
-                    return should_skip_result
-
-            # Check each page by all rules
-            for rule_name in statement_dict.keys():
-                # If already true, skip it
-                if result_dict[rule_name] == True:
-                    continue
-
-                # If not already true yet
-                check_rule = statement_dict[rule_name].check_rule
-                is_placeholder = statement_dict[rule_name].placeholder
-                if (type(check_rule) in rule_type_to_func_dict.keys()):
-                    # If it is just placeholder, do not check
-                    if is_placeholder:
-                        continue
-
-                    is_found, match_info = rule_type_to_func_dict[type(check_rule)](
-                        check_rule, rule_name, previous_page_text, current_page_text, next_page_text, page_index
-                    )
-                    result_dict[rule_name] = is_found
-                    if is_found:
-                        processMatchInfo(match_info, rule_name)
-                else:  # Unknow check_rule type
-                    console.err("Check rule type \"", type(check_rule), "\" not in rule_type_to_func_dict", sep="")
-                    raise NotImplementedError(type(check_rule))
+                break
 
     return result_dict
 
 
+def checkPageByAllRules(result_dict: dict[str, bool], page_index: int,
+                        previous_page_text: str, current_page_text: str, next_page_text: str) -> None:
+    """
+    Check one page by all rules not true yet, and update result_dict
+    """
+    clearPageCache(page_index)
+
+    # Check each page by all rules, cheap rules (measured time per page) first
+    for rule_name in rule_scheduler.getOrderedRuleNames(result_dict.keys()):
+        # If already true, skip it
+        if result_dict[rule_name] == True:
+            continue
+
+        # If not already true yet
+        check_rule = statement_dict[rule_name].check_rule
+        is_placeholder = statement_dict[rule_name].placeholder
+        if (type(check_rule) in rule_type_to_func_dict.keys()):
+            # If it is just placeholder, do not check
+            if is_placeholder:
+                continue
+
+            if profiler.active_profiler != None:
+                profiler.active_profiler.current_rule_name = rule_name
+            rule_start_time = time.perf_counter()
+            is_found, match_info = rule_type_to_func_dict[type(check_rule)](
+                check_rule, rule_name, previous_page_text, current_page_text, next_page_text, page_index
+            )
+            rule_cost = time.perf_counter() - rule_start_time
+            rule_scheduler.recordCost(rule_name, rule_cost)
+            if profiler.active_profiler != None:
+                profiler.active_profiler.recordRule(rule_name, rule_cost, page_index)
+            result_dict[rule_name] = is_found
+            if is_found:
+                processMatchInfo(match_info, rule_name)
+        else:  # Unknow check_rule type
+            console.err("Check rule type \"", type(check_rule), "\" not in rule_type_to_func_dict", sep="")
+            raise NotImplementedError(type(check_rule))
+
+
+def clearDocumentCaches() -> None:
+    """
+    Before checking a document, drop everything memorized for the last one (caches are keyed by page index)
+    """
+    global page_proximity_index, current_document_text
+    page_search_hit_cache.clear()
+    page_token_index_cache.clear()
+    page_finditer_hit_cache.clear()
+    page_proximity_index = None
+    current_document_text = None
+    file_check_reach_percentage_result.clear()
+
+
+def clearPageCache(page_index: int) -> None:
+    """
+    Before checking page of `page_index`, drop hits that cannot be reused for it
+    """
+    global page_proximity_index
+    page_finditer_hit_cache.clear()
+    page_proximity_index = None
+    # Search results of pages before previous page will not be used again
+    for index in [index for index in page_search_hit_cache.keys() if index < page_index - 1]:
+        del page_search_hit_cache[index]
+    for index in [index for index in page_token_index_cache.keys() if index < page_index - 1]:
+        del page_token_index_cache[index]
+
+
+def isAllRuleFulfilled(result_dict: dict[str, bool]) -> bool:
+    """
+    Whether all rules (except placeholder) being checked are already true
+    """
+    return all(
+        result_dict[rule_name] == True
+        for rule_name in result_dict.keys() if not statement_dict[rule_name].placeholder
+    )
+
+
 def processMatchInfo(match_info: MatchResultInfo, rule_name: str) -> None:
     console.sublog("Found " + rule_name, colour_rgb="b19a00")
     if match_info != None:
         match_info: MatchResultInfo = match_info
+        if found_match_infos != None:
+            found_match_infos[rule_name] = match_info
+        console.event(
+            "rule_found", rule_name=rule_name, trigger_at_page=match_info.trigget_at_page,
+            trigger_text=LazyText(lambda: match_info.trigger_text), nearby_at_page=match_info.nearby_at_page,
+            # No nearby text is written as null, not as "None"
+            nearby_text=None if match_info._nearby_text == None else LazyText(lambda: match_info.nearby_text)
+        )
+        # Text around hits is only made if it will be printed
+        if not console.isEnabled(console.level_detail):
+            return
+
         console.sublog(
             f"- trigger text at page {match_info.trigget_at_page} (in document {match_info.trigget_at_page + 1}):",
             colour_rgb="f7b977", sep=""
         )
-        console.sublog("    " + match_info.trigger_text.replace("\n", " "))
+        console.sublog("    " + match_info.trigger_text)
         # If has nearby
         if match_info.nearby_text != None and match_info.nearby_at_page != None:
             console.sublog(
                 f"- nearby text at page {match_info.nearby_at_page} (in document {match_info.nearby_at_page + 1}):",
                 colour_rgb="f7b977", sep=""
             )
-            console.sublog("    " + match_info.nearby_text.replace("\n", " "))
+            console.sublog("    " + match_info.nearby_text)
 
-        print()  # Give a blank line to next "Found"
+        console.plain()  # Give a blank line to next "Found"
     else:  # match_info unfortunately wrong.
         console.err("Unexpected none match_info")
         raise NotImplementedError("match_info: ", match_info)
 
 
-def shouldSkipThisPage(skip_content_page_finished, have_found_content_page, skip_n_page,
-                       content_checker, current_page_text: str,
-                       page_index: int, pdf_path) -> tuple[bool, bool, int] | tuple[dict[str, bool], None, None]:
-    # Check if already found first content page
-    if have_found_content_page:
-        # Skip required pages
-        if skip_n_page > 0:
+class ContentPageSkipper:
+    """
+    Find "table of contents" page in first few pages, then skip it and few pages after it.
+    Pages before the content page is found are held (not checked), and given back to be checked
+    if no content page found in first few pages, so each page is still checked only once.
+    """
+    is_finished: bool
+    content_page_index: int | None
+    held_pages: list[tuple[int, str, str, str]]
+    content_checker: re.Pattern
+
+    # Find content page in page 0 to this page
+    max_content_page_index = 5
+    # Pages after content page also skipped
+    skip_n_page = 3
+
+    def __init__(self) -> None:
+        self.is_finished = False
+        self.content_page_index = None
+        self.held_pages = []
+        self.content_checker = re.compile(r"(?:table\s+of\s+)contents?")
+
+    def feed(self, page_index: int, previous_page_text: str, current_page_text: str,
+             next_page_text: str) -> list[tuple[int, str, str, str]]:
+        """
+        Give the next page (in order) to skipper.
+        return pages should be checked now: [(page_index, previous_page_text, current_page_text, next_page_text)]
+        """
+        this_page = (page_index, previous_page_text, current_page_text, next_page_text)
+
+        # Have not found content page
+        if self.content_page_index == None:
+            # If content not found after 5 pages, check all pages held, and pages after
+            if page_index > self.max_content_page_index:
+                console.sublog(
+                    f"Maybe no table of content in first {page_index} pages. Check them without skipping...",
+                    colour_rgb="ec6d51"
+                )
+                console.plain()
+                self.is_finished = True
+                pages_to_check = self.held_pages + [this_page]
+                self.held_pages = []
+                return pages_to_check
+
+            # Check if this page is content page (in original casing, as before case folding)
+            if self.content_checker.search(getOriginalText(current_page_text)) != None:
+                console.sublog(f"Found content at page {page_index}:", colour_rgb="ec6d51")
+                self.content_page_index = page_index
+                # Pages before content page are not checked
+                self.held_pages = []
+            else:  # If not, check next page
+                console.sublog(
+                    f"Page {page_index} seems not a content page, continue find it.", colour_rgb="ec6d51"
+                )
+                self.held_pages.append(this_page)
+            console.sublog(LazyText(lambda: getOriginalText(current_page_text)[0:60]))
+            console.plain()
+            return []
+
+        # Already found first content page, skip required pages
+        if page_index <= self.content_page_index + self.skip_n_page:
             console.sublog(f"Skipping page {page_index}:", colour_rgb="ec6d51")
-            console.sublog(current_page_text.replace("\n", "  ")[0:60])
-            print()
-            skip_n_page -= 1
-            return (True, skip_content_page_finished, skip_n_page)
-        if skip_n_page == 0:  # Skip page finished
-            console.sublog(
-                f"No longer need to skip at page {page_index} and after:", colour_rgb="ec6d51"
-            )
-            console.sublog(current_page_text.replace("\n", "  ")[0:60])
-            print()
-            skip_content_page_finished = True
-            return (True, skip_content_page_finished, skip_n_page)
-    else:  # Have not found content page
-        # If content not found after 5 pages, redo it now
-        if page_index > 5:
-            console.sublog(
-                f"Maybe no table of content for file {pdf_path}. Redo without skipping...", colour_rgb="ec6d51"
-            )
-            return (checkDocument(pdf_path, skip_content_pages=False), None)
-
-        # Check if this page is content page
-        have_found_content_page = (content_checker.search(current_page_text) != None)
-        if have_found_content_page:  # this page is content
-            console.sublog(f"Found content at page {page_index}:", colour_rgb="ec6d51")
-            console.sublog(current_page_text.replace("\n", "  ")[0:60])
-        else:  # If not, check next page
-            console.sublog(
-                f"Page {page_index} seems not a content page, continue find it.", colour_rgb="ec6d51"
-            )
-            console.sublog(current_page_text.replace("\n", "  ")[0:60])
-        print()
-        return (True, skip_content_page_finished, skip_n_page)  # Whether is or not, this page should not be scanned
+            console.sublog(LazyText(lambda: getOriginalText(current_page_text)[0:60]))
+            console.plain()
+            return []
+
+        # Skip page finished
+        console.sublog(f"No longer need to skip at page {page_index} and after:", colour_rgb="ec6d51")
+        console.sublog(LazyText(lambda: getOriginalText(current_page_text)[0:60]))
+        console.plain()
+        self.is_finished = True
+        return [this_page]
 
 
 def checkAnyRegexFulFilled(check_rule: AnyRegexFulfilled,
                            rule_name: str, toss_1, current_page_text: str, toss_2,
                            page_num: int) -> tuple[bool, MatchResultInfo | None]:
     """
-    If any regex is matched, considered true
+    If any regex is matched, considered true.
+    Words of the page are indexed in one pass (shared by all rules), and a regex is only run if the literals it
+    needs are in that index (see `mayMatchInPage`), so most regexs never scan the page.
     """
     for regex in check_rule.regexs:
-        result = regex.search(current_page_text)
+        if not mayMatchInPage(regex, current_page_text, page_num):
+            continue
+        result = profiledRegexCall(regex, page_num, regex.search, current_page_text)
         if result != None:
             # Return with match info to help check where it matches
+            document_text = current_document_text
             match_info: MatchResultInfo = MatchResultInfo(
-                trigger_text=getTextAroundInPage(current_page_text, result.span()[0], result.span()[1]),
-                trigget_at_page=page_num
+                trigger_text=lambda: getTextAroundInPage(current_page_text, result.span()[0], result.span()[1]),
+                trigget_at_page=page_num,
+                trigger_raw=lambda: getRawTextAroundHit(
+                    document_text, page_num, current_page_text, result.span()[0], result.span()[1]
+                )
             )
             return (True, match_info)
 
@@ -208,7 +491,9 @@ def checkReachPercentage(check_rule: ReachPercentage, rule_name: str,
             continue
 
         # If found, append index
-        if len(regex.findall(current_page_text)) > 0:
+        if not mayMatchInPage(regex, current_page_text, page_num):
+            continue
+        if len(profiledRegexCall(regex, page_num, regex.findall, current_page_text, overrun_result=[])) > 0:
             file_check_reach_percentage_result[rule_name].append(i)
 
     # Return if that reached the percentage: passed / total
@@ -224,44 +509,57 @@ def checkNearbyPagesMatching(check_rule: NearbyPageMatching, rule_name: str,
                              page_num: int) -> tuple[bool, MatchResultInfo | None]:
     for trigger_regex in check_rule.trigger_regexs:
         # If found, check if words around
-        trigger_result = trigger_regex.search(current_page_text)
-        if trigger_result != None:
+        trigger_range = searchWithPageCache(trigger_regex, current_page_text, page_num)
+        if trigger_range != None:
             # Search nearby pages
             for nearby_regex in check_rule.search_nearby_regexs:
                 # Search nearby in two nearby pages
                 previous_result, next_result = None, None  # If no need to search before/after
-                current_result = nearby_regex.search(current_page_text)
+                current_result = searchWithPageCache(nearby_regex, current_page_text, page_num)
 
                 # If need to search previous or next page
                 if check_rule.search_page_before:
-                    previous_result = nearby_regex.search(previous_page_text)
+                    previous_result = searchWithPageCache(nearby_regex, previous_page_text, page_num - 1)
                 if check_rule.search_page_after:
-                    next_result = nearby_regex.search(next_page_text)
+                    next_result = searchWithPageCache(nearby_regex, next_page_text, page_num + 1)
 
                 # If found corresponding nearby
                 if previous_result != None or current_result != None or next_result != None:
-                    trigger_range = trigger_result.span()
                     final_result_span = None
                     final_text = None
+                    final_page_num = None
                     if previous_result != None:
-                        final_result_span = previous_result.span()
+                        final_result_span = previous_result
                         final_text = previous_page_text
+                        final_page_num = page_num - 1
                     elif current_result != None:
-                        final_result_span = current_result.span()
+                        final_result_span = current_result
                         final_text = current_page_text
+                        final_page_num = page_num
                     elif next_result != None:
-                        final_result_span = next_result.span()
+                        final_result_span = next_result
                         final_text = next_page_text
+                        final_page_num = page_num + 1
+                    # Text around is made later, from text of this document
+                    document_text = current_document_text
                     match_info = MatchResultInfo(
                         trigget_at_page=page_num,
-                        trigger_text=getTextAroundCrossPage(
-                            current_page_text, previous_page_text, next_page_text,
+                        trigger_text=lambda: getTextAroundHit(
+                            document_text, page_num, current_page_text, previous_page_text, next_page_text,
                             trigger_range[0], trigger_range[1]
                         ),
-                        nearby_at_page=(page_num - 1) if previous_result != None else page_num + 1,
-                        nearby_text=getTextAroundInPage(
+                        nearby_at_page=final_page_num,
+                        nearby_text=lambda: getTextAroundInPage(
                             final_text,
                             final_result_span[0], final_result_span[1]
+                        ) if document_text == None else document_text.getTextAroundAtPage(
+                            final_page_num, final_result_span[0], final_result_span[1]
+                        ),
+                        trigger_raw=lambda: getRawTextAroundHit(
+                            document_text, page_num, current_page_text, trigger_range[0], trigger_range[1]
+                        ),
+                        nearby_raw=lambda: getRawTextAroundHit(
+                            document_text, final_page_num, final_text, final_result_span[0], final_result_span[1]
                         )
                     )
 
@@ -274,35 +572,46 @@ def checkNearbyPagesMatching(check_rule: NearbyPageMatching, rule_name: str,
 def checkNearbyCharMatching(check_rule: NearbyCharMatching, rule_name: str,
                             previous_page_text: str, current_page_text: str, next_page_text: str,
                             page_num: int) -> tuple[bool, MatchResultInfo | None]:
+    # Nearby regexs are searched once for this page, and shared by all triggers (and rules)
+    proximity_index = getPageProximityIndex(previous_page_text, current_page_text, next_page_text, page_num)
+
     for trigger_regex in check_rule.trigger_regexs:
         # Possible for having multiple match result in same page
-        trigger_results = re.finditer(trigger_regex, current_page_text)
+        trigger_results = finditerWithPageCache(trigger_regex, current_page_text, page_num)
 
         # If found, check each result, if words around
         # If not found, this for-loop will be ignored
         for trigger_result in trigger_results:
             # Get nearby n char
             trigger_range = trigger_result.span()
-            text_nearby = getTextAroundCrossPage(
-                current_page_text, previous_page_text, next_page_text,
-                trigger_range[0], trigger_range[1],
-                around_n_char=check_rule.near_n_char, use_colour=False
+            window_left, window_right = proximity_index.getWindow(
+                trigger_range[0], trigger_range[1], around_n_char=check_rule.near_n_char
             )
 
             # Check whether some regex can found result in it
             for nearby_regex in check_rule.search_nearby_regexs:
-                nearby_result = nearby_regex.search(text_nearby.replace("ﬃ", "ffi"))  # Special fix for one document
+                nearby_range = proximity_index.findHitInWindow(nearby_regex, window_left, window_right)
                 # If found result
-                if nearby_result != None:
-                    nearby_range = nearby_result.span()
+                if nearby_range != None:
+                    document_text = current_document_text
                     match_info = MatchResultInfo(
                         trigget_at_page=page_num,
-                        trigger_text=getTextAroundCrossPage(
-                            current_page_text, previous_page_text, next_page_text,
+                        trigger_text=lambda: getTextAroundHit(
+                            document_text, page_num, current_page_text, previous_page_text, next_page_text,
                             trigger_range[0], trigger_range[1]
                         ),
                         nearby_at_page=page_num,
-                        nearby_text=getTextAroundInPage(text_nearby, nearby_range[0], nearby_range[1])
+                        nearby_text=lambda: getTextAroundInPage(
+                            getOriginalText(proximity_index.text)[window_left:window_right],
+                            nearby_range[0] - window_left, nearby_range[1] - window_left
+                        ),
+                        trigger_raw=lambda: getRawTextAroundHit(
+                            document_text, page_num, current_page_text, trigger_range[0], trigger_range[1]
+                        ),
+                        nearby_raw=lambda: getRawTextAroundProximityHit(
+                            document_text, page_num, previous_page_text, current_page_text, next_page_text,
+                            proximity_index.current_page_offset, nearby_range
+                        )
                     )
 
                     return (True, match_info)
@@ -311,8 +620,66 @@ def checkNearbyCharMatching(check_rule: NearbyCharMatching, rule_name: str,
     return (False, None)
 
 
+def getPageProximityIndex(previous_page_text: str, current_page_text: str, next_page_text: str,
+                          page_num: int) -> PageProximityIndex:
+    """
+    PageProximityIndex of current page, created once for one page
+    """
+    global page_proximity_index
+    if page_proximity_index == None:
+        page_proximity_index = PageProximityIndex(
+            previous_page_text, current_page_text, next_page_text, around_n_char=max_near_n_char, page_index=page_num
+        )
+    return page_proximity_index
+
+
+def searchWithPageCache(regex: re.Pattern, page_text: str, page_num: int) -> tuple[int, int] | None:
+    """
+    Span of `regex.search(page_text)`, but search only once for same regex in one page (text of `page_num`)
+    in one document. Rules with same regex (same object, see `compileRegexCanonical`) share the result,
+    and result of a page is reused when that page becomes previous/current page of the next pages.
+    """
+    if page_num not in page_search_hit_cache:
+        page_search_hit_cache[page_num] = dict()
+    page_hits = page_search_hit_cache[page_num]
+    if regex not in page_hits:
+        if not mayMatchInPage(regex, page_text, page_num):
+            page_hits[regex] = None
+        else:
+            search_result = profiledRegexCall(regex, page_num, regex.search, page_text)
+            page_hits[regex] = None if search_result == None else search_result.span()
+    return page_hits[regex]
+
+
+def finditerWithPageCache(regex: re.Pattern, current_page_text: str, page_num: int) -> list[re.Match]:
+    """
+    `regex.finditer(current_page_text)`, but only search once for same regex in current page.
+    """
+    if regex not in page_finditer_hit_cache:
+        if not mayMatchInPage(regex, current_page_text, page_num):
+            page_finditer_hit_cache[regex] = []
+        else:
+            # findall-like list, so that time of searching is all counted here
+            page_finditer_hit_cache[regex] = profiledRegexCall(
+                regex, page_num, lambda: list(regex.finditer(current_page_text)), overrun_result=[]
+            )
+    return page_finditer_hit_cache[regex]
+
+
+def mayMatchInPage(regex: re.Pattern, page_text: str, page_num: int) -> bool:
+    """
+    False if a literal required by `regex` is not in the page (text of `page_num`), so it has no hit there.
+    Words of each page are indexed once, and kept like page_search_hit_cache.
+    """
+    if page_num not in page_token_index_cache:
+        page_token_index_cache[page_num] = PageTokenIndex(page_text)
+    return page_token_index_cache[page_num].mayMatch(regex)
+
+
 def getTextAroundInPage(text: str, target_left_index: int, target_right_index: int,
                         around_n_char: int = 50, use_colour: bool = True) -> str:
+    # Shown in original casing, if text is case folded
+    text = getOriginalText(text)
     text_around_start = (target_left_index - around_n_char) if target_left_index >= around_n_char else 0
     str_max_len = len(text)
     text_around_end = (target_right_index + around_n_char) \
@@ -329,11 +696,15 @@ def getTextAroundInPage(text: str, target_left_index: int, target_right_index: i
 def getTextAroundCrossPage(current_text: str, previous_text: str, next_text: str,
                            target_left_index: int, target_right_index: int,
                            around_n_char: int = 50, use_colour: bool = True) -> str:
+    current_text, previous_text, next_text = \
+        getOriginalText(current_text), getOriginalText(previous_text), getOriginalText(next_text)
+    # Only the chars needed are taken from nearby pages (see DocumentText for text of whole document)
     # If need to exceed left edge of current text
     left_around_text: str = None
     if target_left_index < around_n_char:
         # Include text from previous page
-        left_around_text = previous_text[-1 - (around_n_char - target_left_index):-1] + current_text[0:target_left_index]
+        left_around_text = previous_text[max(0, len(previous_text) - (around_n_char - target_left_index)):] \
+            + current_text[0:target_left_index]
     else:
         left_around_text = current_text[target_left_index - around_n_char:target_left_index]
 
@@ -341,10 +712,10 @@ def getTextAroundCrossPage(current_text: str, previous_text: str, next_text: str
     right_around_text: str = None
     if len(current_text) - around_n_char < target_right_index:
         # Include text from next page
-        right_around_text = current_text[target_right_index:-1] \
+        right_around_text = current_text[target_right_index:] \
             + next_text[0:around_n_char - (len(current_text) - target_right_index)]
     else:
-        right_around_text = current_text[target_right_index:target_right_index + around_n_char + 1]
+        right_around_text = current_text[target_right_index:target_right_index + around_n_char]
 
     return ""                                                 \
         + left_around_text                                    \
@@ -354,6 +725,61 @@ def getTextAroundCrossPage(current_text: str, previous_text: str, next_text: str
         + right_around_text
 
 
+def getTextAroundHit(document_text: DocumentText | None, page_num: int,
+                     current_text: str, previous_text: str, next_text: str,
+                     target_left_index: int, target_right_index: int) -> str:
+    """
+    Text around current_text[target_left_index:target_right_index], also in nearby pages if near edge of page.
+    One slice of `document_text` if document is checked with it, otherwise joined from pieces of the pages.
+    """
+    if document_text != None:
+        return document_text.getTextAroundAtPage(page_num, target_left_index, target_right_index)
+    return getTextAroundCrossPage(current_text, previous_text, next_text, target_left_index, target_right_index)
+
+
+def getRawTextAroundHit(document_text: DocumentText | None, page_num: int, page_text: str,
+                        target_left_index: int, target_right_index: int) -> tuple[tuple[int, int], str] | None:
+    """
+    page_text[target_left_index:target_right_index] (text of page `page_num`) in raw extracted text of that page:
+    return (span_in_raw_text, raw_text_around), None if raw text of the page is not known
+    """
+    if document_text != None:
+        raw_page = document_text.getRawPage(page_num)
+    else:
+        page_text = getOriginalText(page_text)
+        raw_page = (page_text.raw_text, page_text.offset_map) if isinstance(page_text, NormalizedText) else None
+    if raw_page == None:
+        return None
+
+    raw_text, offset_map = raw_page
+    raw_span = offset_map.toRawSpan(target_left_index, target_right_index)
+    return (raw_span, getTextAroundInPage(raw_text, raw_span[0], raw_span[1]))
+
+
+def getRawTextAroundProximityHit(document_text: DocumentText | None, page_num: int,
+                                 previous_page_text: str, current_page_text: str, next_page_text: str,
+                                 current_page_offset: int, hit_range: tuple[int, int]
+                                 ) -> tuple[tuple[int, int], str] | None:
+    """
+    Same as `getRawTextAroundHit`, for a hit in text of PageProximityIndex (end of previous page + current page +
+    start of next page). None if the hit crosses edge of page.
+    """
+    hit_left, hit_right = hit_range[0] - current_page_offset, hit_range[1] - current_page_offset
+    if hit_right <= 0:
+        return getRawTextAroundHit(
+            document_text, page_num - 1, previous_page_text,
+            len(previous_page_text) + hit_left, len(previous_page_text) + hit_right
+        )
+    if hit_left >= len(current_page_text):
+        return getRawTextAroundHit(
+            document_text, page_num + 1, next_page_text,
+            hit_left - len(current_page_text), hit_right - len(current_page_text)
+        )
+    if hit_left >= 0 and hit_right <= len(current_page_text):
+        return getRawTextAroundHit(document_text, page_num, current_page_text, hit_left, hit_right)
+    return None
+
+
 def highlightText(text: str, range_left: int, range_right: int) -> str:
     return "" \
         + text[0:range_left] \
@@ -363,26 +789,65 @@ def highlightText(text: str, range_left: int, range_right: int) -> str:
         + text[range_right:len(text)]
 
 
+# Kept for previous, current, and next page of the page being checked
+# {page_index: {regex: span_of_search_result}}
+page_search_hit_cache: dict[int, dict[re.Pattern, tuple[int, int] | None]] = dict()
+# Words of previous, current and next page, see `mayMatchInPage`
+# {page_index: page_token_index}
+page_token_index_cache: dict[int, PageTokenIndex] = dict()
+# Cleared when checking next page
+# {regex: all_match_results_in_current_page}
+page_finditer_hit_cache: dict[re.Pattern, list[re.Match]] = dict()
+# Text around current page, and hits of nearby regexs in it, for NearbyCharMatching
+page_proximity_index: PageProximityIndex | None = None
+# Text around current page should be long enough for all NearbyCharMatching rules
+max_near_n_char: int = max([
+    statement_info.check_rule.near_n_char for statement_info in statement_dict.values()
+    if type(statement_info.check_rule) == NearbyCharMatching
+], default=0)
+
+# Text of the whole document being checked, only if asked by checkDocument (`use_document_text`)
+current_document_text: DocumentText | None = None
+
+# Match info of each found rule, only kept when asked by checkDocumentWithEvidence
+# {rule_name: match_info}
+found_match_infos: dict[str, "MatchResultInfo"] | None = None
+
 # {"rule_name": num_of_fulfilled}, example: {"rule_a": 3}, rule_a has 4 members, 3 fulfilled.
 file_check_reach_percentage_result: dict[str, list[int]] = dict()
 
 
+# Increase it when the way of checking changes, so that results saved by RunManifest are not reused
+checker_revision = 1
+rule_set_fingerprint = getRuleSetFingerprint()
+
+
+def getEvaluationKey(content_hash: str, reader_type: ReaderType, skip_content_pages: bool = True) -> str:
+    """
+    Same key, same result of checkDocument for rules with same fingerprint (see `getRuleCheckFingerprints`):
+    same PDF content, text extractor and checker
+    """
+    return ":".join([
+        content_hash, getExtractorVersion(reader_type), f"c{checker_revision}",
+        "fold" if case_folding.is_case_folded_matching else "nofold",
+        "skip" if skip_content_pages else "noskip"
+    ])
+
+
+def getRuleCheckFingerprints() -> dict[str, str]:
+    """
+    {rule_name: fingerprint}, result of a rule only changes if its fingerprint changes (position in Word does not count)
+    """
+    return {rule_name: statement_info.getCheckFingerprint() for (rule_name, statement_info) in statement_dict.items()}
+
+
+# Measure time of rules in the whole run (in this process)
+rule_scheduler = RuleScheduler()
+
+
 rule_type_to_func_dict: dict[type, Callable[[ItemMatchingRule, str, str, str, str, int], tuple[bool, MatchResultInfo]]] = {
     AnyRegexFulfilled: checkAnyRegexFulFilled,
     ReachPercentage: checkReachPercentage,
     NearbyPageMatching: checkNearbyPagesMatching,
     NearbyCharMatching: checkNearbyCharMatching
 }
-
-
-class MatchResultInfo:
-    trigget_at_page: int
-    trigger_text: str
-    nearby_at_page: int | None
-    nearby_text: str | None
-
-    def __init__(self, trigget_at_page: int, trigger_text: str, nearby_at_page: int = None, nearby_text: str = None) -> None:
-        self.trigget_at_page = trigget_at_page
-        self.trigger_text = trigger_text
-        self.nearby_at_page = nearby_at_page
-        self.nearby_text = nearby_text
@@ -0,0 +1,120 @@
+import os
+import numpy
+
+
+class HitMatrix:
+    """
+    Results of the whole corpus in one boolean matrix: hits[document_index, rule_index] is True when that rule is
+    fulfilled in that document. Rule and document indexes are fixed by `rule_names` and `document_names`.
+    Category totals (mandatory, strongly suggested, desirable) are made from it by one matrix product,
+    using weights of each rule given by the report template (see `WordReportTemplate.getCategoryWeights`).
+    """
+    rule_names: numpy.ndarray
+    document_names: numpy.ndarray
+    # bool, (documents, rules)
+    hits: numpy.ndarray
+    # bool, (documents,), False for documents without result yet
+    has_result: numpy.ndarray
+    category_names: numpy.ndarray
+    # int, (rules, categories), how much a fulfilled rule adds to each category
+    category_weights: numpy.ndarray
+    # int, (categories,), added to every document (cells being "1" in the template)
+    category_offsets: numpy.ndarray
+    # {rule_name: rule_index}
+    rule_index_dict: dict[str, int]
+
+    def __init__(self, rule_names: list[str], document_names: list[str], category_names: list[str],
+                 category_weights: numpy.ndarray, category_offsets: numpy.ndarray) -> None:
+        self.rule_names = numpy.array(rule_names, dtype=str)
+        self.document_names = numpy.array(document_names, dtype=str)
+        self.hits = numpy.zeros((len(document_names), len(rule_names)), dtype=bool)
+        self.has_result = numpy.zeros(len(document_names), dtype=bool)
+        self.category_names = numpy.array(category_names, dtype=str)
+        self.category_weights = numpy.asarray(category_weights, dtype=numpy.int32)
+        self.category_offsets = numpy.asarray(category_offsets, dtype=numpy.int32)
+        self.rule_index_dict = {rule_name: rule_index for (rule_index, rule_name) in enumerate(rule_names)}
+
+    def setResult(self, document_index: int, result_dict: dict[str, bool | None]) -> None:
+        """
+        Record result of one document, rules not in `result_dict` are not fulfilled
+        """
+        self.hits[document_index] = False
+        for (rule_name, is_fulfilled) in result_dict.items():
+            if is_fulfilled == True:
+                self.hits[document_index, self.rule_index_dict[rule_name]] = True
+        self.has_result[document_index] = True
+
+    def getCategoryTotals(self) -> numpy.ndarray:
+        """
+        return int matrix (documents, categories), rows of documents without result are 0
+        """
+        totals = self.hits.astype(numpy.int32) @ self.category_weights + self.category_offsets
+        totals[~self.has_result] = 0
+        return totals
+
+    def getPassRates(self) -> numpy.ndarray:
+        """
+        return float array (rules,), part of documents (with result) fulfilling each rule
+        """
+        if not self.has_result.any():
+            return numpy.zeros(len(self.rule_names))
+        return self.hits[self.has_result].mean(axis=0)
+
+    def getTotalsInformation(self) -> dict[str, dict[str, int]]:
+        """
+        Category totals of documents with result, in the form used by outputer.
+        return {document_name: {"mandatory": 3, "strongly_suggested": 1, "desirable": 0}}
+        """
+        totals = self.getCategoryTotals()
+        category_names = self.category_names.tolist()
+        return {
+            document_name: dict(zip(category_names, document_totals))
+            for (document_name, document_totals) in zip(
+                self.document_names[self.has_result].tolist(), totals[self.has_result].tolist()
+            )
+        }
+
+    def save(self, npz_path: str) -> None:
+        """
+        Save as compressed .npz, hits are packed to bits (one byte for 8 rules)
+        """
+        if os.path.dirname(npz_path) != "":
+            os.makedirs(os.path.dirname(npz_path), exist_ok=True)
+        # Name ends with .npz, or numpy adds it
+        temp_npz_path = npz_path[0:-len(".npz")] + ".tmp.npz" if npz_path.endswith(".npz") else npz_path + ".tmp.npz"
+        numpy.savez_compressed(
+            temp_npz_path,
+            rule_names=self.rule_names, document_names=self.document_names,
+            packed_hits=numpy.packbits(self.hits, axis=1), has_result=self.has_result,
+            category_names=self.category_names, category_weights=self.category_weights,
+            category_offsets=self.category_offsets
+        )
+        os.replace(temp_npz_path, npz_path)
+
+    @staticmethod
+    def load(npz_path: str) -> "HitMatrix":
+        with numpy.load(npz_path) as npz_file:
+            hit_matrix = HitMatrix(
+                npz_file["rule_names"].tolist(), npz_file["document_names"].tolist(), npz_file["category_names"].tolist(),
+                npz_file["category_weights"], npz_file["category_offsets"]
+            )
+            hit_matrix.hits = numpy.unpackbits(
+                npz_file["packed_hits"], axis=1, count=len(hit_matrix.rule_names)
+            ).astype(bool)
+            hit_matrix.has_result = npz_file["has_result"]
+        return hit_matrix
+
+
+if __name__ == "__main__":
+    # Show pass rate of each rule, and average totals, of a saved matrix
+    import sys
+    from util.console import console
+    hit_matrix = HitMatrix.load(sys.argv[1] if len(sys.argv) > 1 else "./result/Hits.npz")
+    console.info(f"{int(hit_matrix.has_result.sum())} documents with result, {len(hit_matrix.rule_names)} rules")
+    for (rule_name, pass_rate) in sorted(zip(hit_matrix.rule_names.tolist(), hit_matrix.getPassRates().tolist()),
+                                         key=lambda item: item[1]):
+        console.sublog(f"{pass_rate:7.1%}  {rule_name}")
+    if hit_matrix.has_result.any():
+        average_totals = hit_matrix.getCategoryTotals()[hit_matrix.has_result].mean(axis=0)
+        for (category_name, average_total) in zip(hit_matrix.category_names.tolist(), average_totals.tolist()):
+            console.info(f"Average {category_name}: {average_total:.2f}")
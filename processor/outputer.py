@@ -1,154 +1,155 @@
-import docx
-import re
-import pandas
+from typing import TYPE_CHECKING
+from processor.report_template import WordReportTemplate
 from processor.statement_info import statement_dict
+from processor.totals_sink import TotalsSink, writeTotalsToExcel
 from util.console import console
 
+if TYPE_CHECKING:
+    from processor.hit_matrix import HitMatrix
 
-def getSumTableRowPosition(doc) -> list[tuple[int, int]]: ...
 
+# Parsed once, and reused for all documents
+word_report_template: WordReportTemplate | None = None
 
-sum_table_row_position = None
+# Categories of "total" rows in the template, in the order of columns in Totals.xlsx
+category_names = ["mandatory", "strongly_suggested", "desirable"]
 
 each_file_totals_information: dict[str, dict[str, int]] = None
+# If opened, totals are written to it for each document, instead of kept in each_file_totals_information
+totals_sink: TotalsSink | None = None
+# If opened, result of each document is recorded to it, and Totals.xlsx is made from it
+hit_matrix: "HitMatrix | None" = None
 
 
-def getSumTableRowPosition(doc) -> dict[int, tuple[int, int]]:
+def openTotalsSink(csv_path: str = "./result/Totals.csv", is_new_run: bool = True,
+                   company_names: list[str] | None = None) -> None:
     """
-    Pass the document, and return position of the row with "total score".
-    return: (int table_index, int row_in_that_table_index)[]
+    Write totals of each document to `csv_path` once it is recorded, see TotalsSink
     """
-    positions = dict()
-    for table_index in range(len(doc.tables)):
-        for row_index in range(len(doc.tables[table_index].rows)):
-            # If the first cell matches /^\d+\.?$/ after strip
-            match_result = re.compile(
-                "^(\\d+)\\.?$"
-            ).match(doc.tables[table_index].rows[row_index].cells[0].text.strip())
+    global totals_sink
+    totals_sink = TotalsSink(csv_path, is_new_run=is_new_run, company_names=company_names)
 
-            if match_result != None:
-                positions[int(match_result.groups()[0])] = (table_index, row_index)
 
-    return positions
+def openHitMatrix(document_names: list[str], template_path: str = "./CoE Template 2.docx") -> None:
+    """
+    Record result of each document (by its index in `document_names`) to a HitMatrix, see `recordDocumentHits`
+    """
+    global hit_matrix
+    # numpy is only imported when it is used
+    from processor.hit_matrix import HitMatrix
+    rule_names = list(statement_dict.keys())
+    category_weights, category_offsets = getWordReportTemplate(template_path).getCategoryWeights(
+        [statement_dict[rule_name].position for rule_name in rule_names],
+        {total_index: getCategoryIndexOfTotal(total_index)
+         for total_index in getWordReportTemplate(template_path).sum_groups.keys()},
+        len(category_names)
+    )
+    hit_matrix = HitMatrix(rule_names, document_names, category_names, category_weights, category_offsets)
+
+
+def recordDocumentHits(document_index: int, result_dict: dict[str, bool | None]) -> None:
+    if hit_matrix != None:
+        hit_matrix.setResult(document_index, result_dict)
+
+
+def saveHitMatrix(npz_path: str = "./result/Hits.npz") -> None:
+    if hit_matrix != None:
+        hit_matrix.save(npz_path)
 
 
-def calculateSumedNumber(doc) -> dict[int, int]:
+def getWordReportTemplate(template_path: str) -> WordReportTemplate:
+    global word_report_template
+    if word_report_template == None or word_report_template.template_path != template_path:
+        word_report_template = WordReportTemplate(template_path)
+    return word_report_template
+
+
+def getCategoryIndexOfTotal(total_index: int) -> int:
+    """
+    Index in `category_names` of the "total" row numbered `total_index` in the template
     """
-    return { index_of_total: total_value }
+    if 1 <= total_index <= 12:
+        return 0
+    elif 13 <= total_index <= 16:
+        return 1
+    elif 17 <= total_index <= 20:
+        return 2
+    else:
+        raise IndexError(f"Must not have total row {total_index} in the template")
+
+
+def writeResultToWord(word_file_path: str, result_dict: dict[str, bool], company_name: str,
+                      template_path: str = "./CoE Template 2.docx") -> None:
     """
-    total_sum = 0
-    totals = dict()
-
-    def isReachingNextTotalRow(table_index, row_index) -> bool:
-        next_row_table_index, next_row_row_index = table_index, 0
-        # If last row in one table
-        if row_index == len(doc.tables[table_index].rows) - 1:
-            # If reaching all tables end
-            if table_index == len(doc.tables) - 1:
-                return True
-            next_row_table_index += 1
-        else:
-            next_row_row_index = row_index + 1
-
-        return \
-            re.compile(
-                "^\\d+\\.?$"
-            ).match(doc.tables[next_row_table_index].rows[next_row_row_index].cells[0].text.strip()) != None
-
-    # Until touch the next "total" row, make sum
-    current_total_index = 0
-    table_len = len(doc.tables)
-    for table_index in range(table_len):
-        column_len = len(doc.tables[table_index].rows)
-        for row_index in range(column_len):
-            # Check if the second cell is empty, or number
-            # If not, continue
-            current_text = doc.tables[table_index].rows[row_index].cells[2].text.strip()
-            if current_text == "1":
-                total_sum += 1
-
-            # Check if reach next "total" row
-            if isReachingNextTotalRow(table_index, row_index):
-                totals[current_total_index] = total_sum
-                current_total_index += 1
-                total_sum = 0
-    del totals[0]
-    return totals
-
-
-def writeResultToWord(word_file_path: str, result_dict: dict[str, bool], company_name: str) -> None:
-    result_word_file = docx.Document(word_file_path)
+    Write result of one document to `word_file_path`, as a filled copy of the template
+    """
+    word_report_template = getWordReportTemplate(template_path)
 
     # Fill cell with result
     console.sublog("Filling cells", colour_rgb="b19a00", end="")
+    cell_texts: dict[tuple[int, int, int], str] = dict()
+    passed_positions: set[tuple[int, int]] = set()
     for rule_name in result_dict.keys():
         table_index, row_index = statement_dict[rule_name].position
         is_rule_passed = result_dict[rule_name] == True
         cell_index = 2 if is_rule_passed else 3
         text_to_fill = "1" if is_rule_passed else "0"
         # Write 1 correspond to whether it has or not
-        result_word_file.tables[table_index].rows[row_index].cells[cell_index].text = text_to_fill
-    print(" ... done")
+        cell_texts[(table_index, row_index, cell_index)] = text_to_fill
+        if is_rule_passed:
+            passed_positions.add((table_index, row_index))
+    console.plain(" ... done")
 
     # Fill the "sum" cell
     console.sublog("Filling sum cells", colour_rgb="b19a00", end="")
-    fillSumValToCell(result_word_file, company_name)
-    print(" ... done")
-
-    # Save result
-    result_word_file.save(word_file_path)
-
-
-def fillSumValToCell(doc, company_name: str) -> None:
-    # First calculate the sum-ed value
-    sumed_value_dict = calculateSumedNumber(doc)
-
+    sumed_value_dict = word_report_template.getSumValues(passed_positions)
     # Also add it to record
     addDocumentFinalResultToRecord(company_name, sumed_value_dict)
-
-    # Fill it into corresponding cell
-    global sum_table_row_position
-    if sum_table_row_position == None:
-        sum_table_row_position = getSumTableRowPosition(doc)
     for (sum_cell_index, sum_value) in sumed_value_dict.items():
-        table_index, row_index = sum_table_row_position[sum_cell_index]
-        doc.tables[table_index].rows[row_index].cells[5].text = str(sum_value)
+        table_index, row_index = word_report_template.sum_row_positions[sum_cell_index]
+        cell_texts[(table_index, row_index, 5)] = str(sum_value)
+    console.plain(" ... done")
+
+    # Save result
+    word_report_template.writeReport(word_file_path, cell_texts)
 
 
 def addDocumentFinalResultToRecord(company_name: str, value_dict: dict[int, int]) -> None:
     global each_file_totals_information
-    if each_file_totals_information == None:
+    if each_file_totals_information == None and totals_sink == None:
         each_file_totals_information = dict()
 
-    mandatory: int = 0
-    strongly_suggested: int = 0
-    desirable: int = 0
+    totals = {category_name: 0 for category_name in category_names}
+    for (total_index, score) in value_dict.items():
+        totals[category_names[getCategoryIndexOfTotal(total_index)]] += score
 
-    for (rule_index, score) in value_dict.items():
-        if 1 <= rule_index <= 12:
-            mandatory += score
-        elif 13 <= rule_index <= 16:
-            strongly_suggested += score
-        elif 17 <= rule_index <= 20:
-            desirable += score
-        else:
-            raise IndexError(f"Must not have key {rule_index} with value {score} in the dict")
+    if totals_sink != None:
+        totals_sink.append(company_name, totals)
+    else:
+        each_file_totals_information[company_name] = totals
 
-    each_file_totals_information[company_name] = {
-        "mandatory": mandatory, "strongly_suggested": strongly_suggested, "desirable": desirable
-    }
 
+def getRecordedTotals() -> dict[str, dict[str, int]]:
+    """
+    Totals recorded so far (including those kept in totals sink by previous run)
+    return {company_name: {"mandatory": 3, "strongly_suggested": 1, "desirable": 0}}
+    """
+    if totals_sink != None:
+        return totals_sink.readTotals()
+    return dict() if each_file_totals_information == None else each_file_totals_information
 
-def writeFinalResultToExcel() -> None:
-    global each_file_totals_information
-    if each_file_totals_information == None:
-        raise ModuleNotFoundError("The variable each_file_totals_information is not created.")
 
-    console.info("Filling total.xlsx")
+def writeFinalResultToExcel(company_order: list[str] | None = None) -> None:
+    """
+    Write totals of each company to Totals.xlsx, made from the hit matrix (see `openHitMatrix`),
+    totals sink only keeps totals of finished documents if the run is stopped.
+    If `company_order` given, rows follow that order (results may be recorded in the order of finishing).
+    """
+    if hit_matrix == None:
+        raise ModuleNotFoundError("The hit matrix is not opened.")
 
-    pandas.DataFrame(each_file_totals_information).transpose().rename(
-        columns={"mandatory": "Mandatory", "strongly_suggested": "Strongly Suggested", "desirable": "Desirable"}
-    ).to_excel("./result/Totals.xlsx")
+    console.info("Filling total.xlsx from hit matrix")
+    writeTotalsToExcel("./result/Totals.xlsx", hit_matrix.getTotalsInformation(), company_order)
 
 
 def calculateAccuracy(standard_file_path: str, summoned_file_path: str):
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Callable
+from processor import regex_cost
+from processor.regex_cost import RegexTimeout, callWithTimeBudget
+from util.console import console
+
+
+class ProfileStat:
+    calls: int
+    total_seconds: float
+    max_seconds: float
+    page_indexes: set[int]
+    # Calls stopped by regex time budget
+    overruns: int
+    # Rules the calls are made for (only for regexs)
+    rule_names: set[str]
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.page_indexes = set()
+        self.overruns = 0
+        self.rule_names = set()
+
+    def record(self, seconds: float, page_index: int, is_overrun: bool = False, rule_name: str | None = None) -> None:
+        self.calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.page_indexes.add(page_index)
+        self.overruns += is_overrun
+        if rule_name != None:
+            self.rule_names.add(rule_name)
+
+    def toDict(self) -> dict[str, int | float | list[str]]:
+        stat_dict = {
+            "calls": self.calls, "total_seconds": self.total_seconds, "max_seconds": self.max_seconds,
+            "pages": len(self.page_indexes), "overruns": self.overruns
+        }
+        if len(self.rule_names) > 0:
+            stat_dict["rules"] = sorted(self.rule_names)
+        return stat_dict
+
+
+class CheckProfiler:
+    """
+    Time used by each rule (including dispatching it) and each regex, while checking one document.
+    Time of a regex is also charged to the rule being checked (see `current_rule_name`),
+    a regex shared by rules is only run (and charged) for the first one, others reuse its hits.
+    """
+    pdf_path: str
+    rule_stats: dict[str, ProfileStat]
+    regex_stats: dict[str, ProfileStat]
+    # Set by checker before checking a rule
+    current_rule_name: str | None
+
+    def __init__(self, pdf_path: str) -> None:
+        self.pdf_path = pdf_path
+        self.rule_stats = dict()
+        self.regex_stats = dict()
+        self.current_rule_name = None
+
+    def recordRule(self, rule_name: str, seconds: float, page_index: int) -> None:
+        self.rule_stats.setdefault(rule_name, ProfileStat()).record(seconds, page_index)
+
+    def recordRegex(self, regex_key: str, seconds: float, page_index: int, is_overrun: bool = False) -> None:
+        self.regex_stats.setdefault(regex_key, ProfileStat()).record(
+            seconds, page_index, is_overrun, self.current_rule_name
+        )
+
+    def toDict(self) -> dict[str, Any]:
+        return {
+            "documents": [self.pdf_path],
+            "rules": {rule_name: stat.toDict() for (rule_name, stat) in self.rule_stats.items()},
+            "regexs": {regex_key: stat.toDict() for (regex_key, stat) in self.regex_stats.items()}
+        }
+
+    def writeJSON(self, profile_dir: str) -> str:
+        """
+        Write profile of this document to `profile_dir`, return path of the file
+        """
+        os.makedirs(profile_dir, exist_ok=True)
+        profile_path = getDocumentProfilePath(profile_dir, self.pdf_path)
+        with open(profile_path, "w", encoding="utf-8") as profile_file:
+            json.dump(self.toDict(), profile_file, indent=2)
+        return profile_path
+
+
+# Profiler of the document being checked in this process, None if profiling is off
+active_profiler: CheckProfiler | None = None
+# Patterns of regexs stopped by regex time budget, since checker started checking current document
+overrun_regex_patterns: set[str] = set()
+
+
+def profiledRegexCall(regex: re.Pattern, page_index: int, regex_method: Callable, *args,
+                      overrun_result: Any = None, profile_key: str | None = None) -> Any:
+    """
+    `regex_method(*args)`, timed for `regex` (or `profile_key`) if profiling is on. Example:
+    profiledRegexCall(regex, 3, regex.search, text) is regex.search(text)
+    If it uses more than regex time budget (see `setRegexTimeBudget`), it is stopped and `overrun_result` is returned.
+    """
+    if active_profiler == None and regex_cost.regex_time_budget == None:
+        return regex_method(*args)
+
+    start_time = time.perf_counter()
+    is_overrun = False
+    if regex_cost.regex_time_budget == None:
+        result = regex_method(*args)
+    else:
+        try:
+            result = callWithTimeBudget(regex_method, *args)
+        except RegexTimeout:
+            console.warn(
+                f"Regex used more than {regex_cost.regex_time_budget}s at page {page_index}, stopped: "
+                + (regex.pattern if profile_key == None else profile_key)
+            )
+            result = overrun_result
+            is_overrun = True
+            overrun_regex_patterns.add(regex.pattern)
+
+    if active_profiler != None:
+        active_profiler.recordRegex(
+            regex.pattern if profile_key == None else profile_key, time.perf_counter() - start_time,
+            page_index, is_overrun
+        )
+    return result
+
+
+def getDocumentProfilePath(profile_dir: str, pdf_path: str) -> str:
+    """
+    Keyed on the full path, documents of the same name in different folders do not share a profile
+    """
+    path_hash = hashlib.sha256(os.path.abspath(pdf_path).encode("utf-8")).hexdigest()[0:12]
+    return os.path.join(profile_dir, os.path.basename(pdf_path) + "." + path_hash + ".profile.json")
+
+
+def mergeProfiles(profile_dicts: list[dict[str, Any]]) -> dict[str, Any]:
+    merged_profile = {"documents": [], "rules": dict(), "regexs": dict()}
+    for profile_dict in profile_dicts:
+        merged_profile["documents"].extend(profile_dict["documents"])
+        for section in ["rules", "regexs"]:
+            for (key, stat) in profile_dict[section].items():
+                merged_stat = merged_profile[section].setdefault(
+                    key, {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0, "pages": 0, "overruns": 0}
+                )
+                merged_stat["calls"] += stat["calls"]
+                merged_stat["total_seconds"] += stat["total_seconds"]
+                merged_stat["max_seconds"] = max(merged_stat["max_seconds"], stat["max_seconds"])
+                merged_stat["pages"] += stat["pages"]
+                merged_stat["overruns"] += stat["overruns"]
+                if "rules" in stat:
+                    merged_stat["rules"] = sorted(set(merged_stat.get("rules", [])).union(stat["rules"]))
+    return merged_profile
+
+
+def writeBatchProfile(profile_dir: str, pdf_paths: list[str], top_n: int = 10) -> dict[str, Any]:
+    """
+    Merge profiles of documents in `pdf_paths` (written to `profile_dir` by checkDocument, maybe in other processes)
+    into batch_profile.json, and print the top-N hot rules and regexs.
+    """
+    profile_dicts = []
+    for pdf_path in pdf_paths:
+        profile_path = getDocumentProfilePath(profile_dir, pdf_path)
+        # Document not finished (error, or stopped halfway) has no profile
+        if os.path.exists(profile_path):
+            with open(profile_path, "r", encoding="utf-8") as profile_file:
+                profile_dicts.append(json.load(profile_file))
+
+    batch_profile = mergeProfiles(profile_dicts)
+    for section in ["rules", "regexs"]:
+        batch_profile["top_" + section] = sorted(
+            batch_profile[section].keys(), key=lambda key: batch_profile[section][key]["total_seconds"], reverse=True
+        )[0:top_n]
+    os.makedirs(profile_dir, exist_ok=True)
+    with open(os.path.join(profile_dir, "batch_profile.json"), "w", encoding="utf-8") as profile_file:
+        json.dump(batch_profile, profile_file, indent=2)
+
+    console.info(f"Top {top_n} hot rules in {len(batch_profile['documents'])} documents:")
+    for rule_name in batch_profile["top_rules"]:
+        stat = batch_profile["rules"][rule_name]
+        console.sublog(
+            f"{rule_name}: {stat['total_seconds']:.3f}s total, {stat['max_seconds'] * 1000:.2f}ms max, "
+            f"{stat['calls']} calls, {stat['pages']} pages"
+        )
+    console.info(f"Top {top_n} hot regexs:")
+    for regex_key in batch_profile["top_regexs"]:
+        stat = batch_profile["regexs"][regex_key]
+        console.sublog(
+            f"{regex_key[0:80]}: {stat['total_seconds']:.3f}s total, {stat['calls']} calls, "
+            f"for {', '.join(stat.get('rules', [])) or '-'}"
+        )
+
+    return batch_profile
@@ -0,0 +1,162 @@
+import re
+from bisect import bisect_left
+from processor.case_folding import FoldedText, getOriginalText
+from processor.profiler import profiledRegexCall
+from processor.token_index import PageTokenIndex, sre_parse
+
+
+# {regex: is_context_free}, see `isContextFree`
+context_free_cache: dict[re.Pattern, bool] = dict()
+
+
+def isContextFree(regex: re.Pattern) -> bool:
+    """
+    Whether a hit of regex depends only on the chars it matches: no \\b, ^, $ or lookaround.
+    Such regex searched in text[pos:endpos] by regex.search(text, pos, endpos) gives the same hits as searching
+    the slice, others may see chars outside the window (example: \\b at edge of window in the middle of a word).
+    """
+    if regex not in context_free_cache:
+        context_free_cache[regex] = not _hasAssertion(sre_parse.parse(regex.pattern, regex.flags))
+    return context_free_cache[regex]
+
+
+def _hasAssertion(parsed) -> bool:
+    for (op, av) in parsed:
+        if op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            return True
+        if any(_hasAssertion(subpattern) for subpattern in _getSubpatterns(av)):
+            return True
+    return False
+
+
+def _getSubpatterns(av):
+    if isinstance(av, sre_parse.SubPattern):
+        yield av
+    elif isinstance(av, (tuple, list)):
+        for item in av:
+            yield from _getSubpatterns(item)
+
+
+class PageProximityIndex:
+    """
+    Text around one page (end of previous page + current page + start of next page),
+    and positions of regexs found in it once, so that "is there a hit within n chars of this trigger"
+    is answered by bisect on sorted positions, instead of searching the text around each trigger again.
+    Result is always the same as searching the slice of text around the trigger (as getTextAroundCrossPage did):
+    regexs having \\b, ^, $ or lookaround are still searched in the slice (see `isContextFree`).
+    """
+    text: str
+    current_page_offset: int
+    page_index: int
+    # {regex: (sorted_start_positions, end_positions)}
+    hit_positions_cache: dict[re.Pattern, tuple[list[int], list[int]]]
+    # {regex: total_length_of_windows_searched_directly}
+    windowed_searched_len: dict[re.Pattern, int]
+    # Regexs with too many hits in text to find all of them, always searched in the window
+    dense_regexs: set[re.Pattern]
+    # {(regex, window_left, window_right): span_of_hit}, same trigger (and window) is often checked by several rules
+    window_hit_cache: dict[tuple[re.Pattern, int, int], tuple[int, int] | None]
+    # Words of `text`, made when first needed
+    token_index: PageTokenIndex | None
+
+    # Finding every hit searches once for each hit, stop it on dense pages
+    max_hit_positions = 256
+
+    def __init__(self, previous_page_text: str, current_page_text: str, next_page_text: str,
+                 around_n_char: int, page_index: int = -1) -> None:
+        previous_page_tail = previous_page_text[max(0, len(previous_page_text) - around_n_char):]
+        # Ligatures are already replaced when page text is normalized
+        self.text = previous_page_tail + current_page_text + next_page_text[0:around_n_char]
+        if isinstance(current_page_text, FoldedText):
+            # Text before folding is kept, to show text around hits
+            self.text = FoldedText(self.text, "".join([
+                getOriginalText(previous_page_text)[len(previous_page_text) - len(previous_page_tail):],
+                getOriginalText(current_page_text), getOriginalText(next_page_text)[0:around_n_char]
+            ]))
+        self.current_page_offset = len(previous_page_tail)
+        self.page_index = page_index
+        self.hit_positions_cache = dict()
+        self.windowed_searched_len = dict()
+        self.dense_regexs = set()
+        self.window_hit_cache = dict()
+        self.token_index = None
+
+    def getWindow(self, left_index: int, right_index: int, around_n_char: int) -> tuple[int, int]:
+        """
+        Range of `around_n_char` chars around current_page_text[left_index:right_index], as positions in `text`
+        """
+        window_left = max(0, self.current_page_offset + left_index - around_n_char)
+        window_right = min(len(self.text), self.current_page_offset + right_index + around_n_char)
+        return (window_left, window_right)
+
+    def findHitInWindow(self, regex: re.Pattern, window_left: int, window_right: int) -> tuple[int, int] | None:
+        """
+        Span (in `text`) of the first hit of regex in text[window_left:window_right] (searched as a slice), or None
+        """
+        window_key = (regex, window_left, window_right)
+        if window_key not in self.window_hit_cache:
+            self.window_hit_cache[window_key] = self._findHitInWindow(regex, window_left, window_right)
+        return self.window_hit_cache[window_key]
+
+    def _findHitInWindow(self, regex: re.Pattern, window_left: int, window_right: int) -> tuple[int, int] | None:
+        # Literal needed by regex is not in text, no hit in any slice of it
+        if regex not in self.hit_positions_cache and regex not in self.windowed_searched_len:
+            if self.token_index == None:
+                self.token_index = PageTokenIndex(self.text)
+            if not self.token_index.mayMatch(regex):
+                self.hit_positions_cache[regex] = ([], [])
+
+        # Chars outside the window would change the hit, search the slice itself
+        if regex not in self.hit_positions_cache and not isContextFree(regex):
+            search_result = profiledRegexCall(regex, self.page_index, regex.search, self.text[window_left:window_right])
+            return None if search_result == None \
+                else (window_left + search_result.start(), window_left + search_result.end())
+
+        # With few triggers, searching only their windows is cheaper than finding all hits in text.
+        # Once windows searched are longer than text, find all hits once and use them instead.
+        if regex not in self.hit_positions_cache:
+            windowed_searched_len = self.windowed_searched_len.get(regex, 0) + (window_right - window_left)
+            if windowed_searched_len <= len(self.text) or regex in self.dense_regexs:
+                self.windowed_searched_len[regex] = windowed_searched_len
+                search_result = profiledRegexCall(regex, self.page_index, regex.search, self.text, window_left, window_right)
+                return None if search_result == None else search_result.span()
+
+        hit_positions = self._getHitPositions(regex)
+        if hit_positions == None:  # Too many hits, search the window
+            search_result = profiledRegexCall(regex, self.page_index, regex.search, self.text, window_left, window_right)
+            return None if search_result == None else search_result.span()
+
+        start_positions, end_positions = hit_positions
+        hit_index = bisect_left(start_positions, window_left)
+        while hit_index < len(start_positions) and start_positions[hit_index] < window_right:
+            if end_positions[hit_index] <= window_right:
+                return (start_positions[hit_index], end_positions[hit_index])
+            # Hit goes out of window, a shorter hit at same start may still fit in it
+            shorter_result = profiledRegexCall(
+                regex, self.page_index, regex.match, self.text, start_positions[hit_index], window_right
+            )
+            if shorter_result != None:
+                return shorter_result.span()
+            hit_index += 1
+
+        return None
+
+    def _getHitPositions(self, regex: re.Pattern) -> tuple[list[int], list[int]] | None:
+        """
+        Every start position having a hit (including overlapping hits), None if more than `max_hit_positions`
+        """
+        if regex in self.dense_regexs:
+            return None
+        if regex not in self.hit_positions_cache:
+            start_positions, end_positions = [], []
+            search_result = profiledRegexCall(regex, self.page_index, regex.search, self.text)
+            while search_result != None:
+                if len(start_positions) >= self.max_hit_positions:
+                    self.dense_regexs.add(regex)
+                    return None
+                start_positions.append(search_result.start())
+                end_positions.append(search_result.end())
+                search_result = profiledRegexCall(regex, self.page_index, regex.search, self.text, search_result.start() + 1)
+            self.hit_positions_cache[regex] = (start_positions, end_positions)
+
+        return self.hit_positions_cache[regex]
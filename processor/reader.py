@@ -1,8 +1,21 @@
 import enum
+import queue
+import re
+import threading
+from array import array
+from bisect import bisect_right
 from types import TracebackType
-from typing import Optional, Type
-import pdfplumber
-import fitz
+from importlib import import_module
+from importlib.metadata import version
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Type
+from processor.case_folding import FoldedText, getOriginalText
+from processor.text_store import PageTextStore
+from util.read_file import getFileContentHash
+
+
+if TYPE_CHECKING:
+    import fitz
+    import pdfplumber
 
 
 class ReaderType(enum.Enum):
@@ -10,51 +23,441 @@ class ReaderType(enum.Enum):
     type_pymupdf = 1
 
 
+# Backend is imported only when a PDF is really opened by it (importing one takes longer than checking a small PDF)
+# {reader_type: (module_name, distribution_name)}
+reader_backend_dict: dict[ReaderType, tuple[str, str]] = {
+    ReaderType.type_pdfplumber: ("pdfplumber", "pdfplumber"),
+    ReaderType.type_pymupdf: ("fitz", "pymupdf"),
+}
+
+
+def importBackend(reader_type: ReaderType):
+    return import_module(reader_backend_dict[reader_type][0])
+
+
+# Increase it when the way of extracting (or normalizing) text changes, so that old text in PageTextStore is not used,
+# and results saved by RunManifest are not reused
+extractor_revision = 2
+
+
+def getExtractorVersion(reader_type: ReaderType) -> str:
+    # From installed package info, same as pdfplumber.__version__ and fitz.VersionBind, without importing them
+    backend_version = version(reader_backend_dict[reader_type][1])
+    return f"{reader_type.name}-{backend_version}-r{extractor_revision}"
+
+
+class TextOffsetMap:
+    """
+    Positions in normalized text of a page (see `normalizePageText`) back to positions in raw extracted text.
+    Only positions where text is changed are kept, text between two of them is the same in both.
+    """
+    normalized_positions: array
+    raw_positions: array
+
+    def __init__(self) -> None:
+        self.normalized_positions = array("q", [0])
+        self.raw_positions = array("q", [0])
+
+    def addEdit(self, normalized_start: int, raw_start: int, normalized_end: int, raw_end: int) -> None:
+        """
+        raw_text[raw_start:raw_end] became normalized_text[normalized_start:normalized_end], added in order
+        """
+        self.normalized_positions.extend((normalized_start, normalized_end))
+        self.raw_positions.extend((raw_start, raw_end))
+
+    def toRawPosition(self, normalized_position: int) -> int:
+        """
+        Position in replaced text (example: any of "ffi" from "ﬃ") is mapped into the raw text replaced
+        """
+        index = bisect_right(self.normalized_positions, normalized_position) - 1
+        raw_position = self.raw_positions[index] + (normalized_position - self.normalized_positions[index])
+        if index + 1 < len(self.raw_positions):
+            raw_position = min(raw_position, self.raw_positions[index + 1] - 1)
+        return raw_position
+
+    def toRawSpan(self, normalized_start: int, normalized_end: int) -> tuple[int, int]:
+        """
+        Range of raw text that became normalized_text[normalized_start:normalized_end]
+        """
+        raw_start = self.toRawPosition(normalized_start)
+        if normalized_end <= normalized_start:
+            return (raw_start, raw_start)
+        return (raw_start, self.toRawPosition(normalized_end - 1) + 1)
+
+
+class NormalizedText(str):
+    """
+    Normalized text of a page, with the raw extracted text it is made from, to show hits as they are in the PDF.
+    """
+    raw_text: str
+    offset_map: TextOffsetMap
+
+    def __new__(cls, normalized_text: str, raw_text: str, offset_map: TextOffsetMap) -> "NormalizedText":
+        text = super().__new__(cls, normalized_text)
+        text.raw_text = raw_text
+        text.offset_map = offset_map
+        return text
+
+
+# {ligature: letters}
+ligature_dict = {"ﬀ": "ff", "ﬁ": "fi", "ﬂ": "fl", "ﬃ": "ffi", "ﬄ": "ffl", "ﬅ": "st", "ﬆ": "st"}
+# Text changed by normalizing:
+# a word broken by hyphen at end of line ("compli-\nance"), whitespace other than one space, or a ligature
+normalization_regex = re.compile(r"(?<=[A-Za-z])-[ \t]*\n\s*(?=[a-z])|\s{2,}|[^\S ]|[\ufb00-\ufb06]")
+
+
+def normalizePageText(raw_text: str) -> NormalizedText:
+    """
+    Text of page as seen by rules, made once for each page: ligatures become letters, words broken at end of line
+    are joined, and any whitespace (including new line) becomes one space.
+    Raw text and the offset map back to it are kept in the result (see NormalizedText).
+    """
+    offset_map = TextOffsetMap()
+    text_pieces = []
+    raw_copied_end = 0
+    normalized_len = 0
+    for match_result in normalization_regex.finditer(raw_text):
+        text_pieces.append(raw_text[raw_copied_end:match_result.start()])
+        normalized_len += match_result.start() - raw_copied_end
+
+        matched_text = match_result.group()
+        if matched_text[0] == "-":
+            replacement = ""
+        elif matched_text[0] in ligature_dict:
+            replacement = ligature_dict[matched_text[0]]
+        else:
+            replacement = " "
+        offset_map.addEdit(normalized_len, match_result.start(), normalized_len + len(replacement), match_result.end())
+        text_pieces.append(replacement)
+        normalized_len += len(replacement)
+        raw_copied_end = match_result.end()
+
+    # Nothing to change
+    if raw_copied_end == 0 and len(text_pieces) == 0:
+        return NormalizedText(raw_text, raw_text, offset_map)
+    text_pieces.append(raw_text[raw_copied_end:])
+    return NormalizedText("".join(text_pieces), raw_text, offset_map)
+
+
+class DocumentText:
+    """
+    Normalized text of all pages of a document in one string, and start position of each page in an array.
+    Text around a position (also across pages) is one slice, page of a position is one bisect,
+    and a regex can scan the whole document at once (see `finditerInPages`).
+    Pages are separated by "\\n". Rules may match it (example: \\s), so searches are bounded to one page
+    by pos/endpos (see `searchInPage`), a hit never spans two pages. The separator is not a word char,
+    so \\b and (?<!\\w) at edge of page are the same as in the page alone (^ only matches at start of the first page).
+    """
+    # Folded by caller if needed (see `foldPageText`), it is as long as text before folding
+    text: str
+    # page_starts[i] is position of page i in `text`, last one is len(text) + 1 (as if a separator after last page)
+    page_starts: array
+    # (raw_text, offset_map) of each page, if pages are given as NormalizedText (see `getRawPage`)
+    raw_pages: list[tuple[str, TextOffsetMap] | None]
+
+    page_separator = "\n"
+
+    def __init__(self, page_texts: Iterable[str]) -> None:
+        page_texts = list(page_texts)
+        self.text = self.page_separator.join(page_texts)
+        self.page_starts = array("q", [0])
+        for page_text in page_texts:
+            self.page_starts.append(self.page_starts[-1] + len(page_text) + len(self.page_separator))
+        self.raw_pages = [
+            (page_text.raw_text, page_text.offset_map) if isinstance(page_text, NormalizedText) else None
+            for page_text in page_texts
+        ]
+
+    def __len__(self) -> int:
+        return len(self.page_starts) - 1
+
+    def getPageSpan(self, page_index: int) -> tuple[int, int]:
+        """
+        (start, end) of page in `text`, example: for regex.search(document_text.text, start, end)
+        """
+        return (self.page_starts[page_index], self.page_starts[page_index + 1] - len(self.page_separator))
+
+    def getPageText(self, page_index: int) -> str:
+        """
+        Text of one page, "" for page -1 and len(self) (same as PDFFile), folded if `text` is folded
+        """
+        if not 0 <= page_index < len(self):
+            return ""
+        page_start, page_end = self.getPageSpan(page_index)
+        if isinstance(self.text, FoldedText):
+            return FoldedText(self.text[page_start:page_end], self.text.original_text[page_start:page_end])
+        return self.text[page_start:page_end]
+
+    def getRawPage(self, page_index: int) -> tuple[str, TextOffsetMap] | None:
+        """
+        (raw_text, offset_map) of one page, None if not known
+        """
+        return self.raw_pages[page_index] if 0 <= page_index < len(self) else None
+
+    def getPageIndex(self, position: int) -> int:
+        """
+        Page having the char at `position` of `text` (separator after a page belongs to that page)
+        """
+        return bisect_right(self.page_starts, position) - 1
+
+    def iterPageAndNearby(self) -> Iterator[tuple[int, str, str, str]]:
+        """
+        Same as PDFFile.iterPageAndNearby, each page is sliced once from `text`
+        """
+        previous_page_text, current_page_text = "", self.getPageText(0)
+        for page_index in range(len(self)):
+            next_page_text = self.getPageText(page_index + 1)
+            yield (page_index, previous_page_text, current_page_text, next_page_text)
+            previous_page_text, current_page_text = current_page_text, next_page_text
+
+    def searchInPage(self, regex: re.Pattern, page_index: int) -> re.Match | None:
+        """
+        regex.search of one page, positions of match are in `text`
+        """
+        return regex.search(self.text, *self.getPageSpan(page_index))
+
+    def finditerInPages(self, regex: re.Pattern) -> Iterator[tuple[int, re.Match]]:
+        """
+        Scan the whole document, page by page (no copy of page text), positions of matches are in `text`.
+        yield (page_index, match_result)
+        """
+        for page_index in range(len(self)):
+            for match_result in regex.finditer(self.text, *self.getPageSpan(page_index)):
+                yield page_index, match_result
+
+    def getWindow(self, start: int, end: int, around_n_char: int) -> tuple[int, int]:
+        """
+        Range of `around_n_char` chars around text[start:end], in nearby pages too
+        """
+        return (max(0, start - around_n_char), min(len(self.text), end + around_n_char))
+
+    def getTextAround(self, start: int, end: int, around_n_char: int = 50, use_colour: bool = True) -> str:
+        """
+        text[start:end] highlighted, with `around_n_char` chars around it (in original casing, if folded),
+        separators of pages are shown as space.
+        """
+        window_start, window_end = self.getWindow(start, end, around_n_char)
+        text = getOriginalText(self.text)
+        return (
+            text[window_start:start] + ("\033[38;2;62;179;112m" if use_colour else "") + text[start:end]
+            + ("\033[39m" if use_colour else "") + text[end:window_end]
+        ).replace(self.page_separator, " ")
+
+    def getTextAroundAtPage(self, page_index: int, left_index: int, right_index: int,
+                           around_n_char: int = 50, use_colour: bool = True) -> str:
+        """
+        Same as `getTextAround`, for page_text[left_index:right_index] of page `page_index`
+        """
+        page_start = self.page_starts[page_index]
+        return self.getTextAround(page_start + left_index, page_start + right_index, around_n_char, use_colour)
+
+
 class PDFFile:
-    pdf_file: pdfplumber.PDF | fitz.Document
+    pdf_path: str
+    reader_type: ReaderType
+    pdf_file: "pdfplumber.PDF | fitz.Document | None"
+    # Normalized text of pages (see `normalizePageText`), with raw text
     text_cache: dict[int, str]
+    text_store: PageTextStore | None
+    document_key: str | None
+    page_count: int
+    prefetch_pages: int
+    prefetch_thread: threading.Thread | None
+    prefetch_stop_event: threading.Event
+    window_lookahead: int | None
 
-    def __init__(self, pdf_path: str, reader_type: ReaderType = ReaderType.type_pdfplumber) -> None:
-        match reader_type:
-            case ReaderType.type_pdfplumber:
-                self.pdf_file = pdfplumber.open(pdf_path)
-            case ReaderType.type_pymupdf:
-                self.pdf_file = fitz.Document(pdf_path)
+    def __init__(self, pdf_path: str, reader_type: ReaderType = ReaderType.type_pdfplumber,
+                 text_store_path: str | None = None, prefetch_pages: int = 0,
+                 window_lookahead: int | None = None) -> None:
+        """
+        If `text_store_path` given, text of pages is read from (and saved to) that PageTextStore,
+        and the PDF is not opened at all if all pages needed are already there.
+        If `prefetch_pages` > 0, `iterPageAndNearby` extracts at most that many pages ahead in another thread.
+        If `window_lookahead` given, `getPageAndNearby(index)` reads pages (index - 1) to (index + 1 + window_lookahead)
+        and keeps only those, so memory does not grow with the number of pages.
+        """
+        self.pdf_path = pdf_path
+        self.reader_type = reader_type
+        self.window_lookahead = window_lookahead
+        self.pdf_file = None
+        self.text_store = None
+        self.document_key = None
+        self.prefetch_pages = prefetch_pages
+        self.prefetch_thread = None
+        self.prefetch_stop_event = threading.Event()
+
+        page_count = None
+        if text_store_path != None:
+            self.text_store = PageTextStore(text_store_path)
+            self.document_key = self.getDocumentKey(pdf_path, reader_type)
+            page_count = self.text_store.getPageCount(self.document_key)
+        if page_count == None:
+            page_count = self._getPageCountFromBackend()
+            if self.text_store != None:
+                self.text_store.putPageCount(self.document_key, page_count)
+        self.page_count = page_count
 
         self.text_cache = dict()
         # Set -1, and max_page_index, to empty string
         self.text_cache[-1] = ""
-        self.text_cache[len(self.pdf_file.pages)] = ""
+        self.text_cache[len(self)] = ""
 
     def getPageAndNearby(self, at_index: int) -> tuple[str, str, str]:
         self._cacheTextIfNeedAtIndex(at_index - 1)
         self._cacheTextIfNeedAtIndex(at_index)
         self._cacheTextIfNeedAtIndex(at_index + 1)
+        if self.window_lookahead != None:
+            # Lookahead pages are read now, so the window is full when caller goes on to them
+            for index in range(at_index + 2, min(at_index + 2 + self.window_lookahead, len(self))):
+                self._cacheTextIfNeedAtIndex(index)
+            self._dropTextOutsideWindow(at_index)
 
         return (self.text_cache[at_index - 1], self.text_cache[at_index], self.text_cache[at_index + 1])
 
+    def _dropTextOutsideWindow(self, at_index: int) -> None:
+        # -1, and max_page_index, are always kept
+        for index in [
+            index for index in self.text_cache.keys()
+            if 0 <= index < len(self) and not (at_index - 1 <= index <= at_index + 1 + self.window_lookahead)
+        ]:
+            del self.text_cache[index]
+
+    def readDocumentText(self) -> DocumentText:
+        """
+        Normalized text of all pages, as one DocumentText (whole document kept in memory).
+        Do not use while `iterPageAndNearby` with prefetching is not finished.
+        """
+        return DocumentText(
+            self.text_cache[index] if index in self.text_cache else normalizePageText(self._extractTextAtIndex(index))
+            for index in range(len(self))
+        )
+
+    def iterPageAndNearby(self) -> Iterator[tuple[int, str, str, str]]:
+        """
+        Read all pages from the first one.
+        yield (page_index, previous_page_text, current_page_text, next_page_text)
+        If prefetch_pages > 0, pages are extracted in another thread while the caller works on the current page.
+        Do not use getPageAndNearby before this stream is finished (backend is used by that thread).
+        """
+        if self.prefetch_pages <= 0:
+            for page_index in range(len(self)):
+                yield (page_index, *self.getPageAndNearby(page_index))
+            return
+
+        # Bounded, so that the thread waits when too many pages are read ahead
+        page_text_queue: queue.Queue[tuple[int, str] | BaseException] = queue.Queue(maxsize=self.prefetch_pages)
+        self.prefetch_stop_event.clear()
+        self.prefetch_thread = threading.Thread(
+            target=self._prefetchPagesToQueue, args=(page_text_queue,), daemon=True
+        )
+        self.prefetch_thread.start()
+
+        def getNextPageText() -> str:
+            queue_item = page_text_queue.get()
+            if isinstance(queue_item, BaseException):
+                raise queue_item
+            return queue_item[1]
+
+        try:
+            previous_page_text = self.text_cache[-1]
+            current_page_text = getNextPageText() if len(self) > 0 else ""
+            for page_index in range(len(self)):
+                next_page_text = getNextPageText() if page_index + 1 < len(self) else self.text_cache[len(self)]
+                yield (page_index, previous_page_text, current_page_text, next_page_text)
+                previous_page_text, current_page_text = current_page_text, next_page_text
+        finally:
+            self._stopPrefetch(page_text_queue)
+
+    def _prefetchPagesToQueue(self, page_text_queue: queue.Queue) -> None:
+        try:
+            for page_index in range(len(self)):
+                page_text = normalizePageText(self._extractTextAtIndex(page_index))
+                if not self._putToPrefetchQueue(page_text_queue, (page_index, page_text)):
+                    return
+        except BaseException as e:  # Give it to the reader of queue
+            self._putToPrefetchQueue(page_text_queue, e)
+
+    def _putToPrefetchQueue(self, page_text_queue: queue.Queue, queue_item) -> bool:
+        """
+        Wait for space in queue, unless asked to stop (reader may have stopped reading, queue stays full).
+        return whether it is put
+        """
+        while not self.prefetch_stop_event.is_set():
+            try:
+                page_text_queue.put(queue_item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _stopPrefetch(self, page_text_queue: queue.Queue | None = None) -> None:
+        if self.prefetch_thread == None:
+            return
+        self.prefetch_stop_event.set()
+        # Thread stops putting once it sees the event, items left in queue are dropped
+        while page_text_queue != None and not page_text_queue.empty():
+            page_text_queue.get_nowait()
+        self.prefetch_thread.join()
+        self.prefetch_thread = None
+
     def _cacheTextIfNeedAtIndex(self, index: int) -> None:
         # -1, and max_page_index, will always be "", so it is "in keys"
         if index not in self.text_cache.keys():
-            match type(self.pdf_file):
-                case pdfplumber.PDF:
-                    self.text_cache[index] = self.pdf_file.pages[index].extract_text()
-                case fitz.Document:
-                    text_blocks: list[tuple[int, int, int, int, str, int, int]] \
-                        = self.pdf_file.load_page(index).get_text("block")
-                    # Ensure order: left-right, up-down, customized for text in columns
-                    text_blocks = sorted(text_blocks, key=lambda t: t[0])
-                    texts_list = [block[4].replace("\n", " ") for block in text_blocks]
-                    text = " ".join(texts_list)
-                    self.text_cache[index] = text
+            self.text_cache[index] = normalizePageText(self._extractTextAtIndex(index))
 
-    def __len__(self) -> int:
-        match type(self.pdf_file):
-            case pdfplumber.PDF:
+    def _extractTextAtIndex(self, index: int) -> str:
+        """
+        Raw text, as extracted by backend (normalized by caller)
+        """
+        # Try text saved by previous run first
+        if self.text_store != None:
+            text = self.text_store.getPageText(self.document_key, index)
+            if text != None:
+                return text
+
+        text = self._extractTextFromBackendAtIndex(index)
+        if self.text_store != None:
+            self.text_store.putPageText(self.document_key, index, text)
+        return text
+
+    def _extractTextFromBackendAtIndex(self, index: int) -> str:
+        self._openBackendIfNeed()
+        match self.reader_type:
+            case ReaderType.type_pdfplumber:
+                page = self.pdf_file.pages[index]
+                text = page.extract_text()
+                # Text is kept by us, parsed layout objects of page are no longer needed
+                page.close()
+                return text
+            case ReaderType.type_pymupdf:
+                text_blocks: list[tuple[int, int, int, int, str, int, int]] \
+                    = self.pdf_file.load_page(index).get_text("blocks")
+                # Ensure order: left-right, up-down, customized for text in columns
+                text_blocks = sorted(text_blocks, key=lambda t: t[0])
+                # New lines are kept, for joining words broken at end of line when normalizing
+                return " ".join([block[4] for block in text_blocks])
+
+    def _openBackendIfNeed(self) -> None:
+        if self.pdf_file != None:
+            return
+        backend = importBackend(self.reader_type)
+        match self.reader_type:
+            case ReaderType.type_pdfplumber:
+                self.pdf_file = backend.open(self.pdf_path)
+            case ReaderType.type_pymupdf:
+                self.pdf_file = backend.Document(self.pdf_path)
+
+    def _getPageCountFromBackend(self) -> int:
+        self._openBackendIfNeed()
+        match self.reader_type:
+            case ReaderType.type_pdfplumber:
                 return len(self.pdf_file.pages)
-            case fitz.Document:
+            case ReaderType.type_pymupdf:
                 return len(self.pdf_file)
 
+    def __len__(self) -> int:
+        return self.page_count
+
     def __enter__(self) -> "PDFFile":
         return self
 
@@ -62,11 +465,22 @@ class PDFFile:
                  t: Optional[Type[BaseException]],
                  value: Optional[BaseException],
                  traceback: Optional[TracebackType],):
+        self._stopPrefetch()
         self.text_cache.clear()
-        self.pdf_file.__exit__(t, value, traceback)
+        if self.text_store != None:
+            self.text_store.close()
+        if self.pdf_file != None:
+            self.pdf_file.__exit__(t, value, traceback)
+
+    @staticmethod
+    def getDocumentKey(pdf_path: str, reader_type: ReaderType) -> str:
+        """
+        Key of one document in PageTextStore: same content, read in same way, has same key.
+        """
+        return getFileContentHash(pdf_path) + ":" + getExtractorVersion(reader_type)
 
 
 def getReadByPagesGenerator(pdf_file_path: str) -> str:
-    with pdfplumber.open(pdf_file_path) as pdf_file:
+    with importBackend(ReaderType.type_pdfplumber).open(pdf_file_path) as pdf_file:
         for page in pdf_file.pages:
             yield page.extract_text()
@@ -0,0 +1,202 @@
+import random
+import re
+import signal
+import threading
+import time
+from typing import Any, Callable
+from util.console import console
+
+try:
+    from re import _parser as sre_parse  # Python 3.11 and after
+except ImportError:
+    import sre_parse
+
+
+class RegexTimeout(Exception):
+    ...
+
+
+class RegexCostInfo:
+    regex_str: str
+    risky_reasons: list[str]
+    seconds_per_10k_chars: float
+
+    def __init__(self, regex_str: str, risky_reasons: list[str], seconds_per_10k_chars: float) -> None:
+        self.regex_str = regex_str
+        self.risky_reasons = risky_reasons
+        self.seconds_per_10k_chars = seconds_per_10k_chars
+
+
+# `.{m,n}` (or `\S{m,n}`, `[^x]{m,n}`) wider than this is reported
+wide_repeat_threshold = 50
+
+repeat_ops = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+# `\S`, `\D`, `\W` match almost anything, like `.`
+wildcard_categories = (sre_parse.CATEGORY_NOT_SPACE, sre_parse.CATEGORY_NOT_DIGIT, sre_parse.CATEGORY_NOT_WORD)
+
+
+def getRiskyReasons(regex_str: str, flags: int = 0) -> list[str]:
+    """
+    Constructs in regex that may backtrack badly on long text without new line.
+    Example: getRiskyReasons(r"(a+)+b") == ["nested quantifier"]
+    """
+    risky_reasons: list[str] = []
+    _findRiskyConstructs(sre_parse.parse(regex_str, flags), False, risky_reasons)
+    # Same reason found in different places is reported once
+    return list(dict.fromkeys(risky_reasons))
+
+
+def _findRiskyConstructs(parsed: Any, is_inside_repeat: bool, risky_reasons: list[str]) -> None:
+    wildcard_repeat_count = 0
+    for (op, av) in parsed:
+        if op in repeat_ops:
+            (min_count, max_count, sub_parsed) = av
+            if is_inside_repeat and max_count > 1:
+                risky_reasons.append("nested quantifier")
+            if _isWildcard(sub_parsed) and max_count > 1:
+                wildcard_repeat_count += 1
+                if max_count == sre_parse.MAXREPEAT:
+                    risky_reasons.append("unbounded wildcard repeat")
+                elif max_count >= wide_repeat_threshold:
+                    risky_reasons.append(f"wide wildcard repeat {{{min_count},{max_count}}}")
+            _findRiskyConstructs(sub_parsed, is_inside_repeat or max_count > 1, risky_reasons)
+        elif op == sre_parse.SUBPATTERN:
+            _findRiskyConstructs(av[-1], is_inside_repeat, risky_reasons)
+        elif op == sre_parse.BRANCH:
+            for branch_parsed in av[1]:
+                _findRiskyConstructs(branch_parsed, is_inside_repeat, risky_reasons)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            _findRiskyConstructs(av[1], is_inside_repeat, risky_reasons)
+        # Atomic group and possessive repeat do not backtrack, not checked
+
+    # Example: ".{1,10}from.{1,10}.*", each wildcard retries for every choice of the ones before it
+    if wildcard_repeat_count >= 2:
+        risky_reasons.append("several wildcard repeats in sequence")
+
+
+def _isWildcard(sub_parsed: Any) -> bool:
+    """
+    Whether this is one char matching (almost) anything: `.`, `\\S`, `[^x]`
+    """
+    if len(sub_parsed) != 1:
+        return False
+    (op, av) = sub_parsed[0]
+    # `[^x]` is parsed as NOT_LITERAL
+    if op == sre_parse.ANY or op == sre_parse.NOT_LITERAL:
+        return True
+    if op == sre_parse.IN:
+        return any(
+            item_op == sre_parse.NEGATE or (item_op == sre_parse.CATEGORY and item_av in wildcard_categories)
+            for (item_op, item_av) in av
+        )
+    return False
+
+
+def getReferenceText(char_count: int = 20000, seed: int = 0) -> str:
+    """
+    A long page without new line (like a flattened page), full of words that start a match but seldom finish it.
+    """
+    words = [
+        "letter", "from", "message", "note", "our", "the", "of", "to", "company", "employee", "report", "information",
+        "business", "gift", "policy", "conflict", "interest", "code", "conduct", "ethics", "any", "may", "should",
+        "collect", "gather", "get", "value", "director", "and", "in", "with", "record", "ceo", "president",
+    ]
+    random_generator = random.Random(seed)
+    text_parts = []
+    text_len = 0
+    while text_len < char_count:
+        text_parts.append(random_generator.choice(words))
+        text_len += len(text_parts[-1]) + 1
+    return " ".join(text_parts)[0:char_count]
+
+
+def estimateRegexCost(regex: re.Pattern, reference_text: str) -> float:
+    """
+    Seconds used to find all matches of regex in 10k chars of reference_text
+    """
+    start_time = time.perf_counter()
+    for _ in regex.finditer(reference_text):
+        pass
+    return (time.perf_counter() - start_time) / max(len(reference_text), 1) * 10000
+
+
+def analyzeRegexs(regexs: list[re.Pattern], reference_text: str | None = None) -> list[RegexCostInfo]:
+    """
+    Risky constructs and estimated cost of each regex, most expensive first.
+    """
+    if reference_text == None:
+        reference_text = getReferenceText()
+
+    regex_cost_infos = [
+        RegexCostInfo(regex.pattern, getRiskyReasons(regex.pattern, regex.flags), estimateRegexCost(regex, reference_text))
+        for regex in regexs
+    ]
+    regex_cost_infos.sort(key=lambda regex_cost_info: regex_cost_info.seconds_per_10k_chars, reverse=True)
+    return regex_cost_infos
+
+
+def reportRegexCost(regexs: list[re.Pattern], top_n: int = 10) -> list[RegexCostInfo]:
+    """
+    Analyze regexs, print risky ones and the top-N expensive ones.
+    """
+    console.info(f"Analyzing cost of {len(regexs)} regexs")
+    regex_cost_infos = analyzeRegexs(regexs)
+    for regex_cost_info in regex_cost_infos:
+        if len(regex_cost_info.risky_reasons) > 0:
+            console.warn(f"Risky regex {regex_cost_info.regex_str}: {', '.join(regex_cost_info.risky_reasons)}")
+
+    console.info(f"Top {top_n} expensive regexs (on flattened reference text):")
+    for regex_cost_info in regex_cost_infos[0:top_n]:
+        console.sublog(f"{regex_cost_info.seconds_per_10k_chars * 1000:.3f} ms / 10k chars: {regex_cost_info.regex_str}")
+
+    return regex_cost_infos
+
+
+# Seconds one regex call may use, None for no limit. Set by `setRegexTimeBudget`.
+regex_time_budget: float | None = None
+# Timer signal only raises RegexTimeout while a budgeted regex call is running
+is_budgeted_call_running: bool = False
+
+
+def setRegexTimeBudget(seconds: float | None) -> None:
+    """
+    Limit time of each regex call made by `callWithTimeBudget` (in this process). None to remove the limit.
+    Uses timer signal, so only works on main thread of a process on Unix; otherwise there is no limit.
+    """
+    global regex_time_budget
+    if seconds != None and (not hasattr(signal, "setitimer")
+                            or threading.current_thread() is not threading.main_thread()):
+        console.warn("Regex time budget needs timer signal on main thread, no limit on regex time.")
+        seconds = None
+
+    if seconds != None and regex_time_budget == None:
+        signal.signal(signal.SIGALRM, _raiseRegexTimeout)
+    regex_time_budget = seconds
+
+
+def _raiseRegexTimeout(signum, frame) -> None:
+    # `re` checks signals while matching, so this stops even a long backtracking
+    if is_budgeted_call_running:
+        raise RegexTimeout()
+
+
+def callWithTimeBudget(regex_method: Callable, *args) -> Any:
+    """
+    `regex_method(*args)`, raise RegexTimeout if it uses more than `regex_time_budget`
+    """
+    global is_budgeted_call_running
+    signal.setitimer(signal.ITIMER_REAL, regex_time_budget)
+    try:
+        is_budgeted_call_running = True
+        result = regex_method(*args)
+        is_budgeted_call_running = False
+    finally:
+        is_budgeted_call_running = False
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    return result
+
+
+# Run as `python -m processor.regex_cost` from the repository root
+if __name__ == "__main__":
+    from processor.statement_info import getAllRuleRegexs
+    reportRegexCost(getAllRuleRegexs())
@@ -0,0 +1,156 @@
+import copy
+import re
+import zipfile
+
+
+# First cell of a "total" row is its number, example: "3."
+total_row_label_regex = re.compile(r"^(\d+)\.?$")
+
+
+class WordReportTemplate:
+    """
+    Result word template, parsed once for the whole run.
+    A report is made by filling only the result cells and sum cells in a copy of document.xml,
+    other files in the template are written as they are.
+    """
+    template_path: str
+    # [(zip_info, content)], in the order of the template file
+    zip_entries: list[tuple[zipfile.ZipInfo, bytes]]
+    document_xml_name: str
+    document_element: object
+    # Cells are found by child indexes from document element, so that same cell is found in a copy
+    # {(table_index, row_index, cell_index): cell_path}
+    cell_paths: dict[tuple[int, int, int], tuple[int, ...]]
+    # {total_index: (table_index, row_index)} of the "total" rows
+    sum_row_positions: dict[int, tuple[int, int]]
+    # {total_index: [(row_position, is_passed_cell_one_in_template)]}, rows added up into that total
+    sum_groups: dict[int, list[tuple[tuple[int, int], bool]]]
+
+    def __init__(self, template_path: str) -> None:
+        # Only imported when a report is really written
+        import docx
+        self.template_path = template_path
+        with zipfile.ZipFile(template_path, "r") as template_zip:
+            self.zip_entries = [(zip_info, template_zip.read(zip_info)) for zip_info in template_zip.infolist()]
+
+        doc = docx.Document(template_path)
+        self.document_xml_name = doc.part.partname.lstrip("/")
+        self.document_element = doc.element
+        self.cell_paths = dict()
+        for table_index in range(len(doc.tables)):
+            for (row_index, row) in enumerate(doc.tables[table_index].rows):
+                for (cell_index, cell) in enumerate(row.cells):
+                    self.cell_paths[(table_index, row_index, cell_index)] = self._getElementPath(cell._tc)
+
+        self.sum_row_positions = getSumTableRowPosition(doc)
+        self.sum_groups = self._getSumGroups(doc)
+
+    def _getSumGroups(self, doc) -> dict[int, list[tuple[tuple[int, int], bool]]]:
+        """
+        Rows before each "total" row (after the previous one), same as adding up cells[2] until next "total" row
+        """
+        row_positions = [
+            (table_index, row_index)
+            for table_index in range(len(doc.tables)) for row_index in range(len(doc.tables[table_index].rows))
+        ]
+        sum_groups = dict()
+        current_total_index = 0
+        for (position_index, (table_index, row_index)) in enumerate(row_positions):
+            is_one_in_template = doc.tables[table_index].rows[row_index].cells[2].text.strip() == "1"
+            sum_groups.setdefault(current_total_index, []).append(((table_index, row_index), is_one_in_template))
+
+            # Reaching next "total" row (or end of all tables)
+            if position_index == len(row_positions) - 1 or total_row_label_regex.match(
+                doc.tables[row_positions[position_index + 1][0]].rows[row_positions[position_index + 1][1]]
+                .cells[0].text.strip()
+            ) != None:
+                current_total_index += 1
+
+        # Rows before first "total" row do not belong to any total
+        sum_groups.pop(0, None)
+        return sum_groups
+
+    def _getElementPath(self, element) -> tuple[int, ...]:
+        path = []
+        while element is not self.document_element:
+            parent = element.getparent()
+            path.append(parent.index(element))
+            element = parent
+        return tuple(reversed(path))
+
+    def getSumValues(self, passed_positions: set[tuple[int, int]]) -> dict[int, int]:
+        """
+        Value of each "total" cell, when rules at `passed_positions` are passed.
+        return {total_index: total_value}
+        """
+        return {
+            total_index: sum(
+                1 for (row_position, is_one_in_template) in rows if is_one_in_template or row_position in passed_positions
+            )
+            for (total_index, rows) in self.sum_groups.items()
+        }
+
+    def getCategoryWeights(self, rule_positions: list[tuple[int, int]], category_of_total: dict[int, int],
+                           category_count: int):
+        """
+        Same totals as `getSumValues`, added up by category, in the form of a linear function of rule results:
+        category_totals = is_rule_passed (0 or 1 of each rule) @ weights + offsets.
+        `rule_positions`: (table_index, row_index) of each rule. `category_of_total`: {total_index: category_index}.
+        return (int array (rules, categories) weights, int array (categories,) offsets)
+        """
+        import numpy
+        weights = numpy.zeros((len(rule_positions), category_count), dtype=numpy.int32)
+        offsets = numpy.zeros(category_count, dtype=numpy.int32)
+        # {row_position: [rule_index]}
+        rule_indexes_of_position: dict[tuple[int, int], list[int]] = dict()
+        for (rule_index, row_position) in enumerate(rule_positions):
+            rule_indexes_of_position.setdefault(row_position, []).append(rule_index)
+
+        for (total_index, rows) in self.sum_groups.items():
+            category_index = category_of_total[total_index]
+            for (row_position, is_one_in_template) in rows:
+                if is_one_in_template:
+                    offsets[category_index] += 1
+                # A row is counted once, even if more than one rule is written to it
+                elif len(rule_indexes_of_position.get(row_position, [])) == 1:
+                    weights[rule_indexes_of_position[row_position][0], category_index] += 1
+                elif row_position in rule_indexes_of_position:
+                    raise ValueError(f"More than one rule is written to row {row_position}")
+        return (weights, offsets)
+
+    def writeReport(self, word_file_path: str, cell_texts: dict[tuple[int, int, int], str]) -> None:
+        """
+        Write a copy of template, with text of cells replaced.
+        `cell_texts`: {(table_index, row_index, cell_index): text}
+        """
+        from docx.opc.oxml import serialize_part_xml
+        from docx.table import _Cell
+        document_element = copy.deepcopy(self.document_element)
+        for (cell_position, text) in cell_texts.items():
+            cell_element = document_element
+            for child_index in self.cell_paths[cell_position]:
+                cell_element = cell_element[child_index]
+            _Cell(cell_element, None).text = text
+
+        with zipfile.ZipFile(word_file_path, "w") as report_zip:
+            for (zip_info, content) in self.zip_entries:
+                if zip_info.filename == self.document_xml_name:
+                    content = serialize_part_xml(document_element)
+                report_zip.writestr(zip_info, content)
+
+
+def getSumTableRowPosition(doc) -> dict[int, tuple[int, int]]:
+    """
+    Pass the document, and return position of the row with "total score".
+    return: {total_index: (int table_index, int row_in_that_table_index)}
+    """
+    positions = dict()
+    for table_index in range(len(doc.tables)):
+        for row_index in range(len(doc.tables[table_index].rows)):
+            # If the first cell matches /^\d+\.?$/ after strip
+            match_result = total_row_label_regex.match(doc.tables[table_index].rows[row_index].cells[0].text.strip())
+
+            if match_result != None:
+                positions[int(match_result.groups()[0])] = (table_index, row_index)
+
+    return positions
@@ -0,0 +1,30 @@
+from typing import Iterable
+
+
+class RuleScheduler:
+    """
+    Order rules by measured time used per page, cheap rules first.
+    Measurement is kept for the whole run, so later documents are ordered by all pages checked before.
+    """
+    total_seconds: dict[str, float]
+    pages_evaluated: dict[str, int]
+
+    def __init__(self) -> None:
+        self.total_seconds = dict()
+        self.pages_evaluated = dict()
+
+    def getOrderedRuleNames(self, rule_names: Iterable[str]) -> list[str]:
+        """
+        Rules not measured yet come first (cost 0), so that they get measured.
+        Rules with the same cost keep the order of `rule_names`.
+        """
+        return sorted(rule_names, key=self.getCostPerPage)
+
+    def getCostPerPage(self, rule_name: str) -> float:
+        if self.pages_evaluated.get(rule_name, 0) == 0:
+            return 0.0
+        return self.total_seconds[rule_name] / self.pages_evaluated[rule_name]
+
+    def recordCost(self, rule_name: str, seconds: float) -> None:
+        self.total_seconds[rule_name] = self.total_seconds.get(rule_name, 0.0) + seconds
+        self.pages_evaluated[rule_name] = self.pages_evaluated.get(rule_name, 0) + 1
@@ -0,0 +1,81 @@
+import json
+import os
+import sqlite3
+
+
+class RunManifest:
+    """
+    What previous runs did to each PDF, saved on disk in one SQLite file:
+    result of each rule (with fingerprint of the rule) for each PDF content (by evaluation key, see `getEvaluationKey`
+    in checker), and whether outputs of each PDF path were written, with which content and rules (output fingerprint).
+    Documents with same content, rules and template are skipped, only changed rules are checked again,
+    and a stopped run goes on from where it stopped.
+    """
+    connection: sqlite3.Connection
+
+    def __init__(self, manifest_path: str) -> None:
+        manifest_dir = os.path.dirname(manifest_path)
+        if manifest_dir != "":
+            os.makedirs(manifest_dir, exist_ok=True)
+
+        self.connection = sqlite3.connect(manifest_path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS rule_result ("
+            "evaluation_key TEXT NOT NULL, rule_name TEXT NOT NULL, rule_fingerprint TEXT NOT NULL, result_json TEXT NOT NULL, "
+            "PRIMARY KEY (evaluation_key, rule_name))"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS document_output ("
+            "pdf_path TEXT PRIMARY KEY, content_hash TEXT NOT NULL, output_fingerprint TEXT NOT NULL, "
+            "status TEXT NOT NULL)"
+        )
+        self.connection.commit()
+
+    def getRuleResults(self, evaluation_key: str) -> dict[str, tuple[str, bool | None]]:
+        """
+        return {rule_name: (rule_fingerprint, is_fulfilled)} saved for this PDF content
+        """
+        return {
+            rule_name: (rule_fingerprint, json.loads(result_json))
+            for (rule_name, rule_fingerprint, result_json) in self.connection.execute(
+                "SELECT rule_name, rule_fingerprint, result_json FROM rule_result WHERE evaluation_key = ?",
+                (evaluation_key,)
+            )
+        }
+
+    def putRuleResults(self, evaluation_key: str, rule_results: dict[str, tuple[str, bool | None]]) -> None:
+        """
+        `rule_results`: {rule_name: (rule_fingerprint, is_fulfilled)}, other rules saved before are kept
+        """
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO rule_result (evaluation_key, rule_name, rule_fingerprint, result_json) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (evaluation_key, rule_name, rule_fingerprint, json.dumps(is_fulfilled))
+                for (rule_name, (rule_fingerprint, is_fulfilled)) in rule_results.items()
+            ]
+        )
+        # Saved at once, a killed run keeps every finished document
+        self.connection.commit()
+
+    def isOutputDone(self, pdf_path: str, content_hash: str, output_fingerprint: str) -> bool:
+        row = self.connection.execute(
+            "SELECT content_hash, output_fingerprint, status FROM document_output WHERE pdf_path = ?", (pdf_path,)
+        ).fetchone()
+        return row != None and row[0] == content_hash and row[1] == output_fingerprint and row[2] == "done"
+
+    def setOutputStatus(self, pdf_path: str, content_hash: str, output_fingerprint: str, status: str) -> None:
+        """
+        `status`: "pending" before this PDF is checked and its outputs written again,
+        "done" when Word file and totals of this PDF are written
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO document_output (pdf_path, content_hash, output_fingerprint, status) "
+            "VALUES (?, ?, ?, ?)", (pdf_path, content_hash, output_fingerprint, status)
+        )
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()
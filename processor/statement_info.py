@@ -1,8 +1,44 @@
+import hashlib
+import json
 import re
+from processor import case_folding
+from processor.case_folding import getMatchingRegexFlags, getMatchingRegexSource
+from processor.token_index import getRequiredLiterals
 
 
 class ItemMatchingRule:
-    ...
+    # {attribute_name: (regex_strs, naming_capturing)}, compiled to that attribute when first used,
+    #   so that importing rules (example: only to see their fingerprints) does not compile hundreds of regexs
+    regex_sources: dict[str, tuple[tuple[str, ...], str | None]]
+
+    def __getattr__(self, attribute_name: str):
+        # Only called if attribute is not set yet
+        regex_sources = self.__dict__.get("regex_sources", dict())
+        if attribute_name not in regex_sources:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {attribute_name!r}")
+
+        regex_strs, naming_capturing = regex_sources[attribute_name]
+        # Lower case regexs without IGNORECASE, if page text is case folded (see case_folding)
+        regexs = compileListOfRegex(
+            [getMatchingRegexSource(regex_str) for regex_str in regex_strs], flags=getMatchingRegexFlags(),
+            naming_capturing=naming_capturing
+        )
+        setattr(self, attribute_name, regexs)
+        return regexs
+
+    def getFingerprint(self) -> str:
+        """
+        Same type, regexs (with flags) and parameters give the same fingerprint, in any run
+        """
+        # Regexs already compiled or not, the fingerprint is the same
+        definition = {
+            attribute_name: value for (attribute_name, value) in vars(self).items()
+            if attribute_name not in self.regex_sources
+        }
+        return getHashOfDefinition([type(self).__name__, definition])
+
+    def compileAll(self) -> list[re.Pattern]:
+        return [regex for attribute_name in self.regex_sources.keys() for regex in getattr(self, attribute_name)]
 
 
 class StatementInfo:
@@ -15,12 +51,21 @@ class StatementInfo:
         self.check_rule = check_rule
         self.placeholder = placeholder
 
+    def getFingerprint(self) -> str:
+        return getHashOfDefinition([self.position, self.getCheckFingerprint()])
+
+    def getCheckFingerprint(self) -> str:
+        """
+        Fingerprint of things deciding the result of checking (not position in result word file)
+        """
+        return getHashOfDefinition([self.placeholder, self.check_rule.getFingerprint()])
+
 
 class AnyRegexFulfilled(ItemMatchingRule):
     regexs: tuple[re.Pattern]
 
     def __init__(self, *regexs: str) -> None:
-        self.regexs = compileListOfRegex(regexs, flags=re.IGNORECASE | re.MULTILINE, naming_capturing="trigger")
+        self.regex_sources = {"regexs": (regexs, "trigger")}
 
 
 class ReachPercentage(ItemMatchingRule):
@@ -28,7 +73,7 @@ class ReachPercentage(ItemMatchingRule):
     percentage: float  # from 0.0 to 100.0
 
     def __init__(self, regexs: list[str], percentage: float) -> None:
-        self.regexs = compileListOfRegex(regexs, flags=re.IGNORECASE | re.MULTILINE, naming_capturing="trigger")
+        self.regex_sources = {"regexs": (tuple(regexs), "trigger")}
         self.percentage = percentage
 
 
@@ -41,12 +86,10 @@ class NearbyPageMatching(ItemMatchingRule):
 
     def __init__(self, trigger_regexs: list[str], search_nearby_regexs: list[str],
                  *, search_page_before:bool=True,search_page_after:bool=True) -> None:
-        self.trigger_regexs = compileListOfRegex(
-            trigger_regexs, flags=re.IGNORECASE | re.MULTILINE, naming_capturing="trigger"
-        )
-        self.search_nearby_regexs = compileListOfRegex(
-            search_nearby_regexs, flags=re.IGNORECASE | re.MULTILINE, naming_capturing="nearby"
-        )
+        self.regex_sources = {
+            "trigger_regexs": (tuple(trigger_regexs), "trigger"),
+            "search_nearby_regexs": (tuple(search_nearby_regexs), "nearby")
+        }
         self.search_page_before=search_page_before
         self.search_page_after=search_page_after
 
@@ -61,20 +104,79 @@ class NearbyCharMatching(ItemMatchingRule):
     near_n_char: int
 
     def __init__(self, trigger_regexs: list[str], search_nearby_regexs: list[str], near_n_char: int) -> None:
-        self.trigger_regexs = compileListOfRegex(
-            trigger_regexs, flags=re.IGNORECASE | re.MULTILINE, naming_capturing="trigger"
-        )
-        self.search_nearby_regexs = compileListOfRegex(
-            search_nearby_regexs, flags=re.IGNORECASE | re.MULTILINE, naming_capturing="nearby"
-        )
+        self.regex_sources = {
+            "trigger_regexs": (tuple(trigger_regexs), "trigger"),
+            "search_nearby_regexs": (tuple(search_nearby_regexs), "nearby")
+        }
         self.near_n_char = near_n_char
 
 
 def compileListOfRegex(regex_str_list: list[str], flags: re.RegexFlag, naming_capturing: str | None = None) -> list[re.Pattern]:
     if naming_capturing == None:
-        return [re.compile(regex_str, flags=flags) for regex_str in regex_str_list]
+        return [compileRegexCanonical(regex_str, flags=flags) for regex_str in regex_str_list]
     else:
-        return [re.compile("(?P<" + naming_capturing + ">" + regex_str + ")", flags=flags) for regex_str in regex_str_list]
+        return [compileRegexCanonical("(?P<" + naming_capturing + ">" + regex_str + ")", flags=flags) for regex_str in regex_str_list]
+
+
+def compileRegexCanonical(regex_str: str, flags: re.RegexFlag) -> re.Pattern:
+    """
+    Same regex (with same flags) in different rules get the same compiled object,
+    so that the hit of it in one page can be shared by those rules (by object as key).
+    """
+    canonical_key = (regex_str, int(flags))
+    if canonical_key not in compiled_regex_pool:
+        compiled_regex_pool[canonical_key] = re.compile(regex_str, flags=flags)
+        # Literals it needs are found once with it, to skip pages without them (see PageTokenIndex)
+        getRequiredLiterals(compiled_regex_pool[canonical_key])
+    return compiled_regex_pool[canonical_key]
+
+
+def getHashOfDefinition(definition) -> str:
+    """
+    SHA-256 of definition made of lists, dicts, compiled regexs and plain values
+    """
+    def toPlainValue(value):
+        if isinstance(value, re.Pattern):
+            return [value.pattern, int(value.flags)]
+        if isinstance(value, (list, tuple)):
+            return [toPlainValue(item) for item in value]
+        if isinstance(value, dict):
+            return {key: toPlainValue(item) for (key, item) in value.items()}
+        return value
+
+    return hashlib.sha256(json.dumps(toPlainValue(definition), sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def getAllRuleRegexs() -> list[re.Pattern]:
+    """
+    Compile regexs of all rules (if not yet), return all of them (same regex once)
+    """
+    for statement_info in statement_dict.values():
+        statement_info.check_rule.compileAll()
+    return list(compiled_regex_pool.values())
+
+
+def setCaseFoldedMatching(is_case_folded_matching: bool) -> None:
+    """
+    Turn case folded matching (see case_folding) on or off, rules already compiled are compiled again when used
+    """
+    if case_folding.is_case_folded_matching == is_case_folded_matching:
+        return
+    case_folding.is_case_folded_matching = is_case_folded_matching
+    for statement_info in statement_dict.values():
+        for attribute_name in statement_info.check_rule.regex_sources.keys():
+            statement_info.check_rule.__dict__.pop(attribute_name, None)
+
+
+def getRuleSetFingerprint() -> str:
+    """
+    Changes when any rule in statement_dict is added, removed or changed
+    """
+    return getHashOfDefinition({rule_name: statement_info.getFingerprint() for (rule_name, statement_info) in statement_dict.items()})
+
+
+# {(regex_str, flags): compiled_regex}
+compiled_regex_pool: dict[tuple[str, int], re.Pattern] = dict()
 
 
 statement_dict: dict[str, StatementInfo] = {
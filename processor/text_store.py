@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import zlib
+
+
+class PageTextStore:
+    """
+    Extracted text of pages, saved on disk in one SQLite file.
+    Key of document is content hash of PDF, reader type and extractor version (see `PDFFile.getDocumentKey`),
+    each page is compressed alone, so any page can be read without reading the whole document.
+    """
+    connection: sqlite3.Connection
+
+    def __init__(self, store_path: str) -> None:
+        store_dir = os.path.dirname(store_path)
+        if store_dir != "":
+            os.makedirs(store_dir, exist_ok=True)
+
+        # Several worker processes may use the same file
+        # Prefetching thread of PDFFile uses it in another thread (never at the same time)
+        self.connection = sqlite3.connect(store_path, timeout=60, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # Each page is committed alone (see `putPageText`), not waiting for disk on each commit is enough with WAL
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS document (document_key TEXT PRIMARY KEY, page_count INTEGER NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS page_text ("
+            "document_key TEXT NOT NULL, page_index INTEGER NOT NULL, text BLOB NOT NULL, "
+            "PRIMARY KEY (document_key, page_index))"
+        )
+        self.connection.commit()
+
+    def getPageCount(self, document_key: str) -> int | None:
+        row = self.connection.execute(
+            "SELECT page_count FROM document WHERE document_key = ?", (document_key,)
+        ).fetchone()
+        return None if row == None else row[0]
+
+    def putPageCount(self, document_key: str, page_count: int) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO document (document_key, page_count) VALUES (?, ?)", (document_key, page_count)
+        )
+        self.connection.commit()
+
+    def getPageText(self, document_key: str, page_index: int) -> str | None:
+        row = self.connection.execute(
+            "SELECT text FROM page_text WHERE document_key = ? AND page_index = ?", (document_key, page_index)
+        ).fetchone()
+        return None if row == None else zlib.decompress(row[0]).decode("utf-8")
+
+    def putPageText(self, document_key: str, page_index: int, text: str) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO page_text (document_key, page_index, text) VALUES (?, ?, ?)",
+            (document_key, page_index, zlib.compress(text.encode("utf-8")))
+        )
+        # Committed at once: other processes are not locked out while this document is read,
+        # and pages already extracted are kept if the program stops halfway
+        self.connection.commit()
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()
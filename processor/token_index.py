@@ -0,0 +1,103 @@
+import re
+from typing import Any
+from processor.case_folding import FoldedText, foldPageText
+
+try:
+    from re import _parser as sre_parse  # Python 3.11 and after
+except ImportError:
+    import sre_parse
+
+
+word_regex = re.compile(r"\w+")
+word_char_regex = re.compile(r"\w")
+
+# Literals shorter than this are in almost every page, not worth looking up
+min_literal_len = 3
+
+repeat_ops = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+# {regex: required_literals}, see `getRequiredLiterals`
+required_literals_cache: dict[re.Pattern, tuple[frozenset[str], ...]] = dict()
+
+
+def getRequiredLiterals(regex: re.Pattern) -> tuple[frozenset[str], ...]:
+    """
+    Words (or parts of a word) that any hit of `regex` must have, in lower case, as clauses:
+    each hit has at least one literal of every clause.
+    Example: "(?:letter|note).{1,10}from" gives (frozenset({"letter", "note"}), frozenset({"from"}))
+    """
+    if regex not in required_literals_cache:
+        clauses = _getRequiredClauses(sre_parse.parse(regex.pattern, regex.flags))
+        # Same clause found twice is kept once
+        required_literals_cache[regex] = tuple(dict.fromkeys(clauses))
+    return required_literals_cache[regex]
+
+
+def _getRequiredClauses(parsed: Any) -> list[frozenset[str]]:
+    clauses: list[frozenset[str]] = []
+    # Word chars matched one after another, always inside one word of text
+    literal_chars: list[str] = []
+
+    def endLiteral() -> None:
+        if len(literal_chars) >= min_literal_len:
+            clauses.append(frozenset(["".join(literal_chars)]))
+        literal_chars.clear()
+
+    for (op, av) in parsed:
+        if op == sre_parse.LITERAL and word_char_regex.match(chr(av)) != None:
+            # Lowered as page text is folded (chars becoming longer are kept)
+            literal_chars.append(chr(av).lower() if len(chr(av).lower()) == 1 else chr(av))
+            continue
+        # Matches no char (example: \b), literal goes on
+        if op == sre_parse.AT:
+            continue
+
+        endLiteral()
+        if op == sre_parse.SUBPATTERN:
+            clauses.extend(_getRequiredClauses(av[-1]))
+        elif op in repeat_ops and av[0] >= 1:
+            clauses.extend(_getRequiredClauses(av[2]))
+        elif op == sre_parse.BRANCH:
+            branch_clauses = [_getRequiredClauses(branch_parsed) for branch_parsed in av[1]]
+            # Hit is made by one of the branches, so one literal of that branch (best clause of each branch) is there
+            if all(len(clauses_of_branch) > 0 for clauses_of_branch in branch_clauses):
+                clauses.append(frozenset().union(*[
+                    max(clauses_of_branch, key=lambda clause: (-len(clause), min(map(len, clause))))
+                    for clauses_of_branch in branch_clauses
+                ]))
+        # Other things (sets, any char, lookaround, ...) do not give a required literal
+
+    endLiteral()
+    return clauses
+
+
+class PageTokenIndex:
+    """
+    Words of one page, made once for the page, so that a regex whose required literals (see `getRequiredLiterals`)
+    are not in the page is known to have no hit, without running it.
+    """
+    words: frozenset[str]
+    # Words joined by " ", to find a literal inside a word (example: "gift" in "gifts")
+    joined_words: str
+    # {literal: is_in_page}
+    literal_presence: dict[str, bool]
+
+    def __init__(self, text: str) -> None:
+        # Same text as regexs run on, in lower case
+        folded_text = text if isinstance(text, FoldedText) else foldPageText(text)
+        self.words = frozenset(word_regex.findall(folded_text))
+        self.joined_words = " ".join(self.words)
+        self.literal_presence = dict()
+
+    def hasLiteral(self, literal: str) -> bool:
+        if literal not in self.literal_presence:
+            self.literal_presence[literal] = literal in self.words or literal in self.joined_words
+        return self.literal_presence[literal]
+
+    def mayMatch(self, regex: re.Pattern) -> bool:
+        """
+        False if `regex` surely has no hit in this page
+        """
+        return all(
+            any(self.hasLiteral(literal) for literal in clause) for clause in getRequiredLiterals(regex)
+        )
@@ -0,0 +1,93 @@
+import csv
+import os
+
+
+class TotalsSink:
+    """
+    Totals of each company, appended to a CSV file as soon as one document is finished,
+    and made durable (fsync) at once, so a run stopped halfway keeps totals of finished documents.
+    """
+    csv_path: str
+
+    column_names = ["mandatory", "strongly_suggested", "desirable"]
+    column_titles = ["Mandatory", "Strongly Suggested", "Desirable"]
+
+    def __init__(self, csv_path: str, is_new_run: bool = True, company_names: list[str] | None = None) -> None:
+        """
+        If `is_new_run`, totals written by previous run are removed.
+        Otherwise they are kept, compacted to the last row of each company (only companies in `company_names` if given),
+        and totals of this run are appended after them.
+        """
+        self.csv_path = csv_path
+        if os.path.dirname(csv_path) != "":
+            os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        if is_new_run or not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+            self._writeTotals(dict())
+        else:
+            totals_information = self.readTotals()
+            if company_names != None:
+                totals_information = {
+                    company_name: totals_information[company_name]
+                    for company_name in company_names if company_name in totals_information
+                }
+            self._writeTotals(totals_information)
+
+    def append(self, company_name: str, totals: dict[str, int]) -> None:
+        with open(self.csv_path, "a", encoding="utf-8", newline="") as csv_file:
+            csv.writer(csv_file).writerow([company_name] + [totals[column_name] for column_name in self.column_names])
+            self._syncFile(csv_file)
+
+    def readTotals(self) -> dict[str, dict[str, int]]:
+        """
+        return {company_name: {"mandatory": 3, ...}}, if a company is written more than once, the last one is used
+        """
+        totals_information = dict()
+        with open(self.csv_path, "r", encoding="utf-8", newline="") as csv_file:
+            for row in csv.DictReader(csv_file):
+                # Line cut by a crash has empty values
+                if any(row.get(column_name) in (None, "") for column_name in self.column_names):
+                    continue
+                totals_information[row["company"]] = {
+                    column_name: int(row[column_name]) for column_name in self.column_names
+                }
+        return totals_information
+
+    def _writeTotals(self, totals_information: dict[str, dict[str, int]]) -> None:
+        """
+        Replace the CSV file by header and one row of each company
+        """
+        # Write to another file first, so old totals are kept if stopped while writing
+        temp_csv_path = self.csv_path + ".tmp"
+        with open(temp_csv_path, "w", encoding="utf-8", newline="") as csv_file:
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(["company"] + self.column_names)
+            for (company_name, totals) in totals_information.items():
+                csv_writer.writerow([company_name] + [totals[column_name] for column_name in self.column_names])
+            self._syncFile(csv_file)
+        os.replace(temp_csv_path, self.csv_path)
+
+    def _syncFile(self, csv_file) -> None:
+        csv_file.flush()
+        os.fsync(csv_file.fileno())
+
+
+def writeTotalsToExcel(xlsx_path: str, totals_information: dict[str, dict[str, int]],
+                       company_order: list[str] | None = None) -> None:
+    """
+    Write `totals_information` ({company_name: {"mandatory": 3, ...}}) to `xlsx_path`,
+    one row of each company (same layout as pandas writes). If `company_order` given, rows follow that order.
+    """
+    if company_order != None:
+        totals_information = {
+            company_name: totals_information[company_name]
+            for company_name in company_order if company_name in totals_information
+        }
+
+    # Only needed at the end of the run, and slow to import
+    import pandas
+    # Write to another file first, so the old Excel file is kept if stopped while writing
+    temp_xlsx_path = xlsx_path[0:-len(".xlsx")] + ".tmp.xlsx" if xlsx_path.endswith(".xlsx") else xlsx_path + ".tmp.xlsx"
+    pandas.DataFrame(totals_information).transpose().rename(
+        columns=dict(zip(TotalsSink.column_names, TotalsSink.column_titles))
+    ).to_excel(temp_xlsx_path)
+    os.replace(temp_xlsx_path, xlsx_path)
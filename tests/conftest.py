@@ -0,0 +1,44 @@
+import pytest
+from benchmark.synthetic_corpus import buildSyntheticCorpus
+from processor.reader import PDFFile, ReaderType
+
+
+@pytest.fixture(scope="session")
+def synthetic_page_texts(tmp_path_factory) -> list[list[str]]:
+    """
+    Normalized text of pages of a small synthetic corpus (see benchmark/synthetic_corpus.py), by PyMuPDF.
+    return [[page_text] of each document]
+    """
+    pdf_paths = buildSyntheticCorpus(str(tmp_path_factory.mktemp("corpus")), document_count=4, seed=0)
+    page_texts_of_documents = []
+    for pdf_path in pdf_paths:
+        with PDFFile(pdf_path, ReaderType.type_pymupdf) as pdf_file:
+            page_texts_of_documents.append([page_text for (_, _, page_text, _) in pdf_file.iterPageAndNearby()])
+    return page_texts_of_documents
+
+
+@pytest.fixture(scope="session")
+def report_template_path(tmp_path_factory) -> str:
+    """
+    Word template with the tables of "CoE Template 2.docx": a row for each rule, and 20 numbered "total" rows.
+    Third cell of some rows is already "1" in the template.
+    """
+    import docx
+    template_document = docx.Document()
+    # [(row_count, [row_index of "total" row])] of each table
+    table_layouts = [(23, [1, 4, 7, 18]), (16, [2, 6]), (18, [2, 10]), (20, [2, 6, 10, 14, 17]), (14, [3, 10]),
+                     (18, [2, 5, 8, 10, 13])]
+    total_index = 1
+    for (table_index, (row_count, total_row_indexes)) in enumerate(table_layouts):
+        table = template_document.add_table(rows=row_count, cols=6)
+        for row_index in range(row_count):
+            if row_index in total_row_indexes:
+                table.rows[row_index].cells[0].text = f"{total_index}."
+                total_index += 1
+            else:
+                table.rows[row_index].cells[0].text = f"item {table_index}-{row_index}"
+                if (table_index + row_index) % 7 == 0:
+                    table.rows[row_index].cells[2].text = "1"
+    template_path = str(tmp_path_factory.mktemp("template") / "CoE Template 2.docx")
+    template_document.save(template_path)
+    return template_path
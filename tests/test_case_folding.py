@@ -0,0 +1,95 @@
+import re
+import pytest
+from processor import case_folding
+from processor.case_folding import FoldedText, foldPageText, getCaseFoldedRegexSource, getOriginalText
+from processor.proximity import PageProximityIndex
+from processor.statement_info import setCaseFoldedMatching, statement_dict
+
+
+@pytest.mark.parametrize("regex_str, expected_source", [
+    # Escapes of classes and assertions keep their case
+    (r"\S+\D\W\B\bGift\s", r"\S+\D\W\B\bgift\s"),
+    (r"Gift\.\(Policy\)", r"gift\.\(policy\)"),
+    # Chars given by code become lower case chars
+    (r"\x41B\U00000043", r"abc"),
+    (r"\N{LATIN CAPITAL LETTER A}ct", r"act"),
+    (r"\101ct \0 \1", r"act \0 \1"),
+    (r"\x2e", r"\x2e"),
+    # Group names are kept
+    (r"(?P<Name>Gift)(?P=Name)(?(Name)A|B)", r"(?P<Name>gift)(?P=Name)(?(Name)a|b)"),
+    # Sets
+    (r"[Gg]ift", r"[gg]ift"),
+    (r"[A-Z]{2}", r"[a-z]{2}"),
+    (r"[^A-Z0-9_]", r"[^a-z0-9_]"),
+    (r"[\x41-\x5a]", r"[a-z]"),
+    (r"[À-Ö]", r"[à-ö]"),
+    (r"[]A]", r"[]a]"),
+    (r"[\]A-C]", r"[\]a-c]"),
+    (r"[A-]", r"[a-]"),
+    (r"[\w\-A]", r"[\w\-a]"),
+    # Ranges crossing edge of upper case letters are kept, lower case of their letters is added
+    (r"[A-z]", r"[A-z]"),
+    (r"[0-Z]", r"[0-Za-z]"),
+    (r"[?-C]", r"[?-Ca-c]"),
+])
+def test_case_folded_regex_source(regex_str, expected_source):
+    assert getCaseFoldedRegexSource(regex_str) == expected_source
+
+
+@pytest.mark.parametrize("regex_str", [
+    r"[A-z]+", r"[0-Z]+", r"[?-C]+", r"[^A-Z ]+", r"[]A-C]+", r"\x41\N{LATIN SMALL LETTER B}\103"
+])
+def test_case_folded_regex_same_hits(regex_str):
+    text = "Ab_c [x] ABC abc ?@ 09 Zz ^` ÀÉ"
+    folded_regex = re.compile(getCaseFoldedRegexSource(regex_str))
+    regex = re.compile(regex_str, re.IGNORECASE)
+    assert [hit.span() for hit in folded_regex.finditer(foldPageText(text))] \
+        == [hit.span() for hit in regex.finditer(text)]
+
+
+def test_rules_same_hits_as_ignorecase(synthetic_page_texts):
+    def getHitSpans() -> list[list[tuple[int, int]]]:
+        page_texts = [page_text for page_texts in synthetic_page_texts for page_text in page_texts]
+        if case_folding.is_case_folded_matching:
+            page_texts = [foldPageText(page_text) for page_text in page_texts]
+        return [
+            [hit.span() for hit in regex.finditer(page_text)]
+            for statement_info in statement_dict.values() for regex in statement_info.check_rule.compileAll()
+            for page_text in page_texts
+        ]
+
+    is_case_folded_matching = case_folding.is_case_folded_matching
+    try:
+        setCaseFoldedMatching(False)
+        ignorecase_hit_spans = getHitSpans()
+        setCaseFoldedMatching(True)
+        assert all(regex.flags & re.IGNORECASE == 0 for regex in statement_dict["harass"].check_rule.compileAll())
+        assert getHitSpans() == ignorecase_hit_spans
+    finally:
+        setCaseFoldedMatching(is_case_folded_matching)
+    assert any(len(hit_spans) > 0 for hit_spans in ignorecase_hit_spans)
+
+
+def test_folded_text_keeps_original_aligned():
+    original_texts = ("End of İstanbul PAGE", "Gift from İZMİR office, ǅemal and ΣΟΦΙΑ", "Next PAGE")
+    folded_texts = [foldPageText(text) for text in original_texts]
+    for (folded_text, original_text) in zip(folded_texts, original_texts):
+        assert getOriginalText(folded_text) == original_text and getOriginalText(original_text) == original_text
+        # Each char is lowered at its own position, "İ" (longer in lower case) is kept
+        assert len(folded_text) == len(original_text)
+        assert all(
+            folded_char == (original_char.lower() if len(original_char.lower()) == 1 else original_char)
+            for (folded_char, original_char) in zip(folded_text, original_text)
+        )
+
+    # Snippet at position of a hit is the hit in original casing
+    hit_snippets = [original_texts[1][hit.start():hit.end()] for hit in re.finditer(r"gift|İzmİr|ǆemal|σοφια", folded_texts[1])]
+    assert hit_snippets == ["Gift", "İZMİR", "ǅemal", "ΣΟΦΙΑ"]
+
+    # Text around page made by proximity index is aligned too
+    around_n_char = 9
+    proximity_index = PageProximityIndex(*folded_texts, around_n_char=around_n_char)
+    assert isinstance(proximity_index.text, FoldedText)
+    assert proximity_index.text.original_text \
+        == original_texts[0][-around_n_char:] + original_texts[1] + original_texts[2][0:around_n_char]
+    assert proximity_index.text == foldPageText(proximity_index.text.original_text)
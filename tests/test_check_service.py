@@ -0,0 +1,37 @@
+import asyncio
+import os
+import threading
+from processor import check_service
+from processor.check_service import CheckService
+
+
+def test_uploaded_pdf_is_written_outside_event_loop(monkeypatch):
+    writing_threads = []
+    writeTempPDF = check_service.writeTempPDF
+
+    def recordWritingThread(body: bytes) -> str:
+        writing_threads.append(threading.current_thread())
+        return writeTempPDF(body)
+
+    monkeypatch.setattr(check_service, "writeTempPDF", recordWritingThread)
+    checked_files = []
+
+    async def checkInWorker(pdf_path: str, only_rules: list[str] | None) -> tuple[int, dict]:
+        with open(pdf_path, "rb") as pdf_file:
+            checked_files.append((pdf_path, pdf_file.read(), only_rules))
+        return 200, {"pdf_path": pdf_path, "result": dict()}
+
+    async def postPDF() -> tuple[int, dict]:
+        check_service_instance = CheckService(workers=1)
+        check_service_instance.worker_semaphore = asyncio.Semaphore(1)
+        check_service_instance.checkInWorker = checkInWorker
+        return await check_service_instance.handleRequest(
+            "POST", "/check?only_rules=honesty", {"content-type": "application/pdf"}, b"%PDF-1.4 uploaded"
+        )
+
+    assert asyncio.run(postPDF()) == (200, {"pdf_path": None, "result": dict()})
+    assert len(writing_threads) == 1 and writing_threads[0] is not threading.main_thread()
+    temp_pdf_path, content, only_rules = checked_files[0]
+    assert content == b"%PDF-1.4 uploaded" and only_rules == ["honesty"]
+    # Temp file is removed after checking
+    assert not os.path.exists(temp_pdf_path)
@@ -0,0 +1,65 @@
+import re
+import fitz
+from processor.case_folding import FoldedText, foldPageText
+from processor.checker import checkDocument, getTextAroundCrossPage
+from processor.reader import DocumentText, ReaderType
+
+
+def test_page_spans_and_lookup():
+    page_texts = ["first page", "", "third page text"]
+    document_text = DocumentText(page_texts)
+
+    assert len(document_text) == 3
+    assert [document_text.getPageText(page_index) for page_index in range(3)] == page_texts
+    assert document_text.getPageText(-1) == "" and document_text.getPageText(3) == ""
+    # Separator after a page belongs to that page
+    assert document_text.getPageIndex(0) == 0
+    assert document_text.getPageIndex(len("first page")) == 0
+    assert document_text.getPageIndex(len("first page") + 1) == 1
+    assert document_text.getPageIndex(len("first page") + 2) == 2
+    assert [page_text for (_, _, page_text, _) in document_text.iterPageAndNearby()] == page_texts
+
+
+def test_search_does_not_cross_page_boundary():
+    document_text = DocumentText(["we keep records up to", "date at all times", "always up to date"])
+    regex = re.compile(r"up\s+to\s+date")
+
+    # Separator is matched by \s, only searches bounded to a page keep hits in one page
+    assert regex.search(document_text.text).start() < document_text.page_starts[1]
+    assert document_text.searchInPage(regex, 0) == None
+    assert document_text.searchInPage(regex, 1) == None
+    hits = [(page_index, match_result.group()) for (page_index, match_result) in document_text.finditerInPages(regex)]
+    assert hits == [(2, "up to date")]
+    assert document_text.searchInPage(regex, 2).start() == document_text.page_starts[2] + len("always ")
+
+
+def test_text_around_crosses_page_boundary():
+    page_texts = ["Previous Page End", "Hit at start", "Next Page Start"]
+    document_text = DocumentText(page_texts)
+    document_text.text = foldPageText(document_text.text)
+    assert isinstance(document_text.getPageText(1), FoldedText)
+    assert document_text.getPageText(1).original_text == "Hit at start"
+
+    # Same chars as joining pieces of pages, but pages are separated by space
+    around_text = document_text.getTextAroundAtPage(1, 0, 3, around_n_char=8, use_colour=False)
+    assert around_text == "age End Hit at star"
+    assert getTextAroundCrossPage(*page_texts[1::-1], page_texts[2], 0, 3, around_n_char=8, use_colour=False) \
+        == "Page EndHit at star"
+    around_text = document_text.getTextAroundAtPage(1, 7, 12, around_n_char=6, use_colour=False)
+    assert around_text == "it at start Next "
+
+
+def test_check_document_with_document_text(tmp_path):
+    pdf_path = str(tmp_path / "document.pdf")
+    pdf_document = fitz.open()
+    for page_text in [
+        "Employees must not accept any gift of more than nominal value, and must disclose to your manager",
+        "conflict of interest. Report a concern to the hotline, anonymous reports are accepted",
+        "without retaliation. Insider trading of stock and securities is prohibited."
+    ]:
+        pdf_document.new_page().insert_textbox(fitz.Rect(50, 50, 550, 800), page_text)
+    pdf_document.save(pdf_path)
+    pdf_document.close()
+
+    assert checkDocument(pdf_path, reader_type=ReaderType.type_pymupdf, use_document_text=True) \
+        == checkDocument(pdf_path, reader_type=ReaderType.type_pymupdf)
@@ -0,0 +1,76 @@
+import random
+import numpy
+import openpyxl
+import pandas
+from processor import outputer
+from processor.hit_matrix import HitMatrix
+from processor.statement_info import statement_dict
+from processor.totals_sink import writeTotalsToExcel
+
+
+def getTotalsByTemplate(result_dict: dict[str, bool | None], template_path: str) -> dict[str, int]:
+    """
+    Totals of one document as written to its Word report: sum cells added up by category
+    """
+    passed_positions = {statement_dict[rule_name].position for (rule_name, is_fulfilled) in result_dict.items()
+                        if is_fulfilled == True}
+    totals = {category_name: 0 for category_name in outputer.category_names}
+    for (total_index, score) in outputer.getWordReportTemplate(template_path).getSumValues(passed_positions).items():
+        totals[outputer.category_names[outputer.getCategoryIndexOfTotal(total_index)]] += score
+    return totals
+
+
+def test_totals_same_as_word_report(report_template_path, tmp_path):
+    document_names = [f"company {document_index}" for document_index in range(12)]
+    outputer.openHitMatrix(document_names, report_template_path)
+    hit_matrix = outputer.hit_matrix
+    random_generator = random.Random(0)
+    result_dicts = dict()
+    # Last 2 documents have no result
+    for document_index in range(10):
+        result_dicts[document_names[document_index]] = {
+            rule_name: random_generator.choice([True, False, None]) for rule_name in statement_dict.keys()
+            if document_index == 0 or random_generator.random() < 0.8
+        }
+        outputer.recordDocumentHits(document_index, result_dicts[document_names[document_index]])
+    # Result recorded again replaces the previous one
+    outputer.recordDocumentHits(3, {rule_name: True for rule_name in statement_dict.keys()})
+    result_dicts[document_names[3]] = {rule_name: True for rule_name in statement_dict.keys()}
+
+    assert hit_matrix.getTotalsInformation() == {
+        document_name: getTotalsByTemplate(result_dict, report_template_path)
+        for (document_name, result_dict) in result_dicts.items()
+    }
+    assert (hit_matrix.getCategoryTotals()[10:] == 0).all()
+    expected_pass_rates = [
+        numpy.mean([result_dict.get(rule_name) == True for result_dict in result_dicts.values()])
+        for rule_name in statement_dict.keys()
+    ]
+    assert numpy.allclose(hit_matrix.getPassRates(), expected_pass_rates)
+
+    # Same matrix after saving
+    outputer.saveHitMatrix(str(tmp_path / "Hits.npz"))
+    loaded_hit_matrix = HitMatrix.load(str(tmp_path / "Hits.npz"))
+    assert (loaded_hit_matrix.hits == hit_matrix.hits).all()
+    assert loaded_hit_matrix.getTotalsInformation() == hit_matrix.getTotalsInformation()
+    outputer.hit_matrix = None
+
+
+def test_totals_excel_same_as_pandas_layout(tmp_path):
+    totals_information = {
+        "beta": {"mandatory": 3, "strongly_suggested": 1, "desirable": 0},
+        "alpha": {"mandatory": 5, "strongly_suggested": 2, "desirable": 4}
+    }
+    pandas.DataFrame(totals_information).transpose().rename(
+        columns={"mandatory": "Mandatory", "strongly_suggested": "Strongly Suggested", "desirable": "Desirable"}
+    ).to_excel(str(tmp_path / "expected.xlsx"))
+    writeTotalsToExcel(str(tmp_path / "Totals.xlsx"), totals_information, company_order=["beta", "missing", "alpha"])
+
+    def getCells(xlsx_path: str) -> list:
+        worksheet = openpyxl.load_workbook(xlsx_path).active
+        return [worksheet.title] + [
+            [(cell.value, cell.font.b, cell.border.left.style, cell.alignment.horizontal) for cell in row]
+            for row in worksheet.iter_rows()
+        ]
+
+    assert getCells(str(tmp_path / "Totals.xlsx")) == getCells(str(tmp_path / "expected.xlsx"))
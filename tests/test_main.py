@@ -0,0 +1,131 @@
+import os
+import shutil
+import sqlite3
+import sys
+import fitz
+import pytest
+import main
+from processor.outputer import getRecordedTotals
+from processor.statement_info import statement_dict
+
+
+page_texts_of_companies = {
+    "alpha": [
+        "Employees must not accept any gift of more than nominal value, and must disclose to your manager",
+        "conflict of interest. Report a concern to the hotline, anonymous reports are accepted",
+        "without retaliation. Insider trading of stock and securities is prohibited."
+    ],
+    "beta": [
+        "We do not tolerate harassment based on race, religion, national origin or sex.",
+        "Political contribution of company resources is prohibited. Waiver of this code must be disclosed."
+    ]
+}
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch, report_template_path):
+    """
+    Folder main.py runs in: template, ./pdf/ with alpha, beta and gamma (same content as alpha).
+    return {"checked": [(pdf_paths, only_rules_of_documents)] of each run}
+    """
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(report_template_path, "./CoE Template 2.docx")
+    os.makedirs("./pdf")
+    for (company_name, page_texts) in page_texts_of_companies.items():
+        pdf_document = fitz.open()
+        for page_text in page_texts:
+            pdf_document.new_page().insert_textbox(fitz.Rect(50, 50, 550, 800), page_text)
+        pdf_document.save(f"./pdf/{company_name}.pdf")
+        pdf_document.close()
+    shutil.copy("./pdf/alpha.pdf", "./pdf/gamma.pdf")
+
+    checked_runs = []
+    checkDocumentsInBatch = main.checkDocumentsInBatch
+
+    def recordCheckedDocuments(pdf_paths, reader_type, **options):
+        checked_runs.append(([os.path.basename(pdf_path) for pdf_path in pdf_paths], options["only_rules_of_documents"]))
+        yield from checkDocumentsInBatch(pdf_paths, reader_type, **options)
+
+    monkeypatch.setattr(main, "checkDocumentsInBatch", recordCheckedDocuments)
+    return {"checked": checked_runs}
+
+
+def runMain(monkeypatch, *arguments: str) -> None:
+    monkeypatch.setattr(sys, "argv", ["main.py", "--quiet", "--no-text-store", *arguments])
+    main.main()
+
+
+def countTotalsCSVRows() -> int:
+    with open("./result/Totals.csv", "r", encoding="utf-8") as csv_file:
+        return len(csv_file.read().splitlines()) - 1
+
+
+def getOutputStatuses() -> dict[str, str]:
+    with sqlite3.connect("./cache/manifest.sqlite3") as connection:
+        return {
+            os.path.basename(pdf_path): status
+            for (pdf_path, status) in connection.execute("SELECT pdf_path, status FROM document_output")
+        }
+
+
+def test_skip_unchanged_and_resume(workspace, monkeypatch):
+    runMain(monkeypatch)
+    # Same content under another name is checked once
+    assert workspace["checked"][-1] == (["alpha.pdf", "beta.pdf"], [None, None])
+    assert getOutputStatuses() == {"alpha.pdf": "done", "beta.pdf": "done", "gamma.pdf": "done"}
+    totals_information = getRecordedTotals()
+    assert sorted(totals_information.keys()) == ["alpha", "beta", "gamma"] and countTotalsCSVRows() == 3
+
+    # Nothing changed, nothing checked, Totals.csv keeps one row of each company
+    runMain(monkeypatch)
+    assert workspace["checked"][-1] == ([], [])
+    assert getRecordedTotals() == totals_information and countTotalsCSVRows() == 3
+
+    # Stopped after rules of beta were saved, before its Word file was written
+    os.remove("./result/beta.docx")
+    runMain(monkeypatch)
+    assert workspace["checked"][-1] == ([], [])
+    assert os.path.exists("./result/beta.docx")
+
+    # Stopped while checking beta: marked pending, rules not saved
+    with sqlite3.connect("./cache/manifest.sqlite3") as connection:
+        connection.execute("UPDATE document_output SET status = 'pending' WHERE pdf_path LIKE '%beta.pdf'")
+        connection.execute("DELETE FROM rule_result WHERE rule_name = ?", (list(statement_dict.keys())[3],))
+    runMain(monkeypatch)
+    assert workspace["checked"][-1] == (["alpha.pdf", "beta.pdf"], [[list(statement_dict.keys())[3]]] * 2)
+    assert getOutputStatuses() == {"alpha.pdf": "done", "beta.pdf": "done", "gamma.pdf": "done"}
+    assert getRecordedTotals() == totals_information
+
+
+def test_only_changed_rule_is_checked_and_merged(workspace, monkeypatch):
+    runMain(monkeypatch, "--no-manifest")
+    full_totals_information = getRecordedTotals()
+    runMain(monkeypatch)
+
+    # One rule changed: only it is checked again, merged with saved results of other rules
+    changed_rule_name = "fairness"
+    getRuleCheckFingerprints = main.getRuleCheckFingerprints
+    monkeypatch.setattr(
+        main, "getRuleCheckFingerprints",
+        lambda: getRuleCheckFingerprints() | {changed_rule_name: "changed"}
+    )
+    runMain(monkeypatch)
+    assert workspace["checked"][-1] == (["alpha.pdf", "beta.pdf"], [[changed_rule_name]] * 2)
+    assert getRecordedTotals() == full_totals_information
+
+
+def test_overrun_rule_result_is_not_saved(workspace, monkeypatch):
+    overrun_rule_name = "honesty"
+    recordCheckedDocuments = main.checkDocumentsInBatch
+
+    def overrunOneRule(pdf_paths, reader_type, **options):
+        for (check_index, pdf_path, result_dict, _) in recordCheckedDocuments(pdf_paths, reader_type, **options):
+            yield check_index, pdf_path, result_dict, [overrun_rule_name]
+
+    monkeypatch.setattr(main, "checkDocumentsInBatch", overrunOneRule)
+    runMain(monkeypatch)
+    monkeypatch.setattr(main, "checkDocumentsInBatch", recordCheckedDocuments)
+
+    # Rule stopped by regex time budget is checked again, other rules are reused
+    runMain(monkeypatch)
+    assert workspace["checked"][-1] == (["alpha.pdf", "beta.pdf"], [[overrun_rule_name]] * 2)
@@ -0,0 +1,31 @@
+import json
+import os
+from processor.profiler import CheckProfiler, getDocumentProfilePath, writeBatchProfile
+
+
+def writeProfile(profile_dir: str, pdf_path: str, rule_seconds: float) -> None:
+    check_profiler = CheckProfiler(pdf_path)
+    check_profiler.recordRule("rule", rule_seconds, 0)
+    check_profiler.writeJSON(profile_dir)
+
+
+def test_profile_path_is_keyed_on_full_path(tmp_path):
+    profile_dir = str(tmp_path / "profile")
+    assert getDocumentProfilePath(profile_dir, "./pdf/a/company.pdf") \
+        != getDocumentProfilePath(profile_dir, "./pdf/b/company.pdf")
+    assert getDocumentProfilePath(profile_dir, "./pdf/a/company.pdf") \
+        == getDocumentProfilePath(profile_dir, os.path.abspath("./pdf/a/company.pdf"))
+
+
+def test_batch_profile_has_only_given_documents(tmp_path):
+    profile_dir = str(tmp_path / "profile")
+    writeProfile(profile_dir, "./pdf/a/company.pdf", 1.0)
+    writeProfile(profile_dir, "./pdf/b/company.pdf", 2.0)
+    # Profile of a previous run, document not checked this time
+    writeProfile(profile_dir, "./pdf/old.pdf", 4.0)
+
+    batch_profile = writeBatchProfile(profile_dir, ["./pdf/a/company.pdf", "./pdf/b/company.pdf"], top_n=1)
+    assert batch_profile["documents"] == ["./pdf/a/company.pdf", "./pdf/b/company.pdf"]
+    assert batch_profile["rules"]["rule"]["total_seconds"] == 3.0
+    with open(os.path.join(profile_dir, "batch_profile.json"), "r", encoding="utf-8") as profile_file:
+        assert json.load(profile_file)["documents"] == batch_profile["documents"]
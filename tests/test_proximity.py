@@ -0,0 +1,97 @@
+import re
+from processor import case_folding
+from processor.case_folding import foldPageText
+from processor.checker import getTextAroundCrossPage, max_near_n_char
+from processor.proximity import PageProximityIndex, isContextFree
+from processor.statement_info import NearbyCharMatching, compileListOfRegex, statement_dict
+
+
+def searchSliceAround(regex: re.Pattern, previous_page_text: str, current_page_text: str, next_page_text: str,
+                      left_index: int, right_index: int, around_n_char: int) -> tuple[int, int] | None:
+    """
+    Old way: search the text around trigger, made by getTextAroundCrossPage.
+    return span in that text
+    """
+    text_nearby = getTextAroundCrossPage(
+        current_page_text, previous_page_text, next_page_text, left_index, right_index,
+        around_n_char=around_n_char, use_colour=False
+    )
+    search_result = regex.search(text_nearby)
+    return None if search_result == None else search_result.span()
+
+
+def assertSameAsSlice(proximity_index: PageProximityIndex, regex: re.Pattern, page_texts: tuple[str, str, str],
+                      left_index: int, right_index: int, around_n_char: int) -> None:
+    window_left, window_right = proximity_index.getWindow(left_index, right_index, around_n_char)
+    hit_range = proximity_index.findHitInWindow(regex, window_left, window_right)
+    expected_range = searchSliceAround(regex, *page_texts, left_index, right_index, around_n_char)
+    if expected_range == None:
+        assert hit_range == None, (regex.pattern, left_index)
+    else:
+        assert hit_range == (window_left + expected_range[0], window_left + expected_range[1]), (regex.pattern, left_index)
+
+
+def test_context_free():
+    assert isContextFree(re.compile(r"gift|present(?:ation)?"))
+    assert isContextFree(re.compile(r"(a)\1"))
+    assert not isContextFree(re.compile(r"\bgift"))
+    assert not isContextFree(re.compile(r"gift(?!s)"))
+    assert not isContextFree(re.compile(r"(?<=a)b"))
+    assert not isContextFree(re.compile(r"(?:x|^y)+"))
+
+
+def test_window_edges_same_as_slice():
+    previous_page_text, current_page_text, next_page_text = "the regift of", "xgift here gifts", "s and more"
+    page_texts = (previous_page_text, current_page_text, next_page_text)
+    for regex_str in [r"\bgift", r"gift\b", r"gift(?!s)", r"(?<!e)gift", r"^gift", r"gift$", r"gifts?", r"\w+"]:
+        regex = re.compile(regex_str)
+        for around_n_char in range(0, 8):
+            for (left_index, right_index) in [(1, 5), (11, 15), (11, 16)]:
+                # New index each time, searched in window first
+                proximity_index = PageProximityIndex(*page_texts, around_n_char=8)
+                assertSameAsSlice(proximity_index, regex, page_texts, left_index, right_index, around_n_char)
+                # All hits found first, then looked up by bisect
+                proximity_index = PageProximityIndex(*page_texts, around_n_char=8)
+                proximity_index.windowed_searched_len[regex] = len(proximity_index.text)
+                assertSameAsSlice(proximity_index, regex, page_texts, left_index, right_index, around_n_char)
+
+
+def test_dense_regex_is_searched_in_window():
+    text = "ab " * 1000
+    proximity_index = PageProximityIndex("", text, "", around_n_char=10)
+    regex = re.compile(r"a")
+    proximity_index.windowed_searched_len[regex] = len(text)
+    assert proximity_index.findHitInWindow(regex, 1, 5) == (3, 4)
+    assert regex in proximity_index.dense_regexs and regex not in proximity_index.hit_positions_cache
+
+
+def test_same_as_slice_on_synthetic_corpus(synthetic_page_texts):
+    rules = [
+        statement_info.check_rule for statement_info in statement_dict.values()
+        if type(statement_info.check_rule) == NearbyCharMatching
+    ]
+    # Broad regexs, so that windows often cut words and hits
+    broad_regexs = compileListOfRegex([r"\w+al\b", r"(?<=\s)in\w*", r"[a-z]{3}(?= )"], flags=re.NOFLAG)
+    checked_count = 0
+    for page_texts in synthetic_page_texts:
+        if case_folding.is_case_folded_matching:
+            page_texts = [foldPageText(page_text) for page_text in page_texts]
+        for page_index in range(len(page_texts)):
+            nearby_texts = (
+                page_texts[page_index - 1] if page_index > 0 else "", page_texts[page_index],
+                page_texts[page_index + 1] if page_index + 1 < len(page_texts) else ""
+            )
+            for is_bisect_first in [False, True]:
+                proximity_index = PageProximityIndex(*nearby_texts, around_n_char=max_near_n_char)
+                for check_rule in rules:
+                    for trigger_regex in check_rule.trigger_regexs:
+                        for trigger_result in trigger_regex.finditer(nearby_texts[1]):
+                            for nearby_regex in [*check_rule.search_nearby_regexs, *broad_regexs]:
+                                if is_bisect_first:
+                                    proximity_index.windowed_searched_len.setdefault(nearby_regex, len(proximity_index.text))
+                                assertSameAsSlice(
+                                    proximity_index, nearby_regex, nearby_texts,
+                                    *trigger_result.span(), check_rule.near_n_char
+                                )
+                                checked_count += 1
+    assert checked_count > 1000
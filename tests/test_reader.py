@@ -0,0 +1,85 @@
+import threading
+import time
+import fitz
+from processor.checker import checkDocumentWithEvidence
+from processor.reader import PDFFile, ReaderType, normalizePageText
+
+
+def makePDF(pdf_path: str, page_texts: list[str]) -> str:
+    pdf_document = fitz.open()
+    for page_text in page_texts:
+        pdf_document.new_page().insert_text((50, 72), page_text)
+    pdf_document.save(pdf_path)
+    pdf_document.close()
+    return pdf_path
+
+
+def test_prefetch_stops_when_reader_stops_early_and_page_fails(tmp_path):
+    pdf_path = makePDF(str(tmp_path / "document.pdf"), [f"page {page_index}" for page_index in range(6)])
+
+    def readFirstPageOnly() -> None:
+        pdf_file = PDFFile(pdf_path, ReaderType.type_pymupdf, prefetch_pages=1)
+        extractTextAtIndex = pdf_file._extractTextAtIndex
+
+        def failAfterPageTwo(index: int) -> str:
+            if index >= 3:
+                raise RuntimeError("broken page")
+            return extractTextAtIndex(index)
+
+        pdf_file._extractTextAtIndex = failAfterPageTwo
+        with pdf_file:
+            # Stream still referenced when PDFFile is closed, queue is full when the page fails
+            page_stream = pdf_file.iterPageAndNearby()
+            for _ in page_stream:
+                time.sleep(0.3)
+                break
+
+    reading_thread = threading.Thread(target=readFirstPageOnly, daemon=True)
+    reading_thread.start()
+    reading_thread.join(timeout=10)
+    assert not reading_thread.is_alive()
+
+
+def test_prefetch_gives_same_pages(tmp_path):
+    pdf_path = makePDF(str(tmp_path / "document.pdf"), [f"page {page_index}" for page_index in range(4)])
+    with PDFFile(pdf_path, ReaderType.type_pymupdf) as pdf_file:
+        pages = list(pdf_file.iterPageAndNearby())
+    with PDFFile(pdf_path, ReaderType.type_pymupdf, prefetch_pages=2) as pdf_file:
+        assert list(pdf_file.iterPageAndNearby()) == pages
+
+
+def test_normalized_text_maps_back_to_raw_text():
+    raw_text = "The eﬃcient compli-\n  ance  team\nworks"
+    page_text = normalizePageText(raw_text)
+    assert page_text == "The efficient compliance team works"
+    assert page_text.raw_text == raw_text
+
+    for word in ["The", "efficient", "compliance", "team", "works"]:
+        start = page_text.index(word)
+        raw_start, raw_end = page_text.offset_map.toRawSpan(start, start + len(word))
+        assert raw_text[raw_start:raw_end] == {"efficient": "eﬃcient", "compliance": "compli-\n  ance"}.get(word, word)
+    # Any char made from a ligature maps into it
+    assert [page_text.offset_map.toRawPosition(page_text.index("ffi") + offset) for offset in range(3)] == [5, 5, 5]
+
+
+def test_evidence_has_raw_text_of_hit(tmp_path):
+    pdf_path = makePDF(str(tmp_path / "document.pdf"), [
+        "Employees must not accept any gift of more than nominal",
+        "value. Report a concern to the hotline without retaliation."
+    ])
+    check_options = {"reader_type": ReaderType.type_pymupdf, "skip_content_pages": False}
+    result_dict, evidence_dict = checkDocumentWithEvidence(pdf_path, **check_options)
+    assert len(evidence_dict) > 0
+    with PDFFile(pdf_path, ReaderType.type_pymupdf) as pdf_file:
+        raw_texts = [page_text.raw_text for (_, _, page_text, _) in pdf_file.iterPageAndNearby()]
+    for match_info_dict in evidence_dict.values():
+        raw_start, raw_end = match_info_dict["trigger_raw_span"]
+        assert raw_texts[match_info_dict["trigger_at_page"]][raw_start:raw_end] in match_info_dict["trigger_raw_text"]
+        assert raw_end > raw_start
+    # Same raw text when pages are sliced from text of whole document
+    raw_keys = ["trigger_raw_span", "trigger_raw_text", "nearby_raw_span", "nearby_raw_text"]
+    _, document_text_evidence_dict = checkDocumentWithEvidence(pdf_path, use_document_text=True, **check_options)
+    assert {
+        rule_name: [match_info_dict[key] for key in raw_keys]
+        for (rule_name, match_info_dict) in document_text_evidence_dict.items()
+    } == {rule_name: [match_info_dict[key] for key in raw_keys] for (rule_name, match_info_dict) in evidence_dict.items()}
@@ -0,0 +1,94 @@
+import random
+import re
+import docx
+from processor import outputer
+from processor.report_template import WordReportTemplate, getSumTableRowPosition
+from processor.statement_info import statement_dict
+
+
+def calculateSumedNumber(doc) -> dict[int, int]:
+    """
+    Sums of the filled document, as calculated before the template was parsed once
+    return { index_of_total: total_value }
+    """
+    total_sum = 0
+    totals = dict()
+
+    def isReachingNextTotalRow(table_index, row_index) -> bool:
+        next_row_table_index, next_row_row_index = table_index, 0
+        if row_index == len(doc.tables[table_index].rows) - 1:
+            if table_index == len(doc.tables) - 1:
+                return True
+            next_row_table_index += 1
+        else:
+            next_row_row_index = row_index + 1
+        return re.compile(
+            "^\\d+\\.?$"
+        ).match(doc.tables[next_row_table_index].rows[next_row_row_index].cells[0].text.strip()) != None
+
+    current_total_index = 0
+    for table_index in range(len(doc.tables)):
+        for row_index in range(len(doc.tables[table_index].rows)):
+            if doc.tables[table_index].rows[row_index].cells[2].text.strip() == "1":
+                total_sum += 1
+            if isReachingNextTotalRow(table_index, row_index):
+                totals[current_total_index] = total_sum
+                current_total_index += 1
+                total_sum = 0
+    del totals[0]
+    return totals
+
+
+def writeResultToWordByDocx(word_file_path: str, result_dict: dict[str, bool | None], template_path: str) -> dict[int, int]:
+    """
+    Fill a copy of template cell by cell with python-docx, as before. return sums
+    """
+    doc = docx.Document(template_path)
+    for rule_name in result_dict.keys():
+        table_index, row_index = statement_dict[rule_name].position
+        is_rule_passed = result_dict[rule_name] == True
+        doc.tables[table_index].rows[row_index].cells[2 if is_rule_passed else 3].text = "1" if is_rule_passed else "0"
+    sumed_value_dict = calculateSumedNumber(doc)
+    sum_table_row_position = getSumTableRowPosition(doc)
+    for (sum_cell_index, sum_value) in sumed_value_dict.items():
+        table_index, row_index = sum_table_row_position[sum_cell_index]
+        doc.tables[table_index].rows[row_index].cells[5].text = str(sum_value)
+    doc.save(word_file_path)
+    return sumed_value_dict
+
+
+def getCellTexts(word_file_path: str) -> list[list[list[str]]]:
+    doc = docx.Document(word_file_path)
+    return [[[cell.text for cell in row.cells] for row in table.rows] for table in doc.tables]
+
+
+def test_sum_rows_and_groups(report_template_path):
+    word_report_template = WordReportTemplate(report_template_path)
+    assert sorted(word_report_template.sum_row_positions.keys()) == list(range(1, 21))
+    assert sorted(word_report_template.sum_groups.keys()) == list(range(1, 21))
+    # Rows of a total start at its own total row, and end before next total row
+    assert [row_position for (row_position, _) in word_report_template.sum_groups[2]] == [(0, 4), (0, 5), (0, 6)]
+    assert word_report_template.sum_groups[4][-1][0] == (1, 1)
+
+
+def test_same_sums_and_report_as_filling_by_docx(report_template_path, tmp_path, monkeypatch):
+    recorded_sums = []
+    monkeypatch.setattr(
+        outputer, "addDocumentFinalResultToRecord", lambda company_name, value_dict: recorded_sums.append(value_dict)
+    )
+    random_generator = random.Random(0)
+    for case_index in range(8):
+        result_dict = {
+            rule_name: random_generator.choice([True, False, None]) for rule_name in statement_dict.keys()
+            if case_index == 0 or random_generator.random() < 0.8
+        }
+        new_report_path, old_report_path = str(tmp_path / "new.docx"), str(tmp_path / "old.docx")
+        outputer.writeResultToWord(new_report_path, result_dict, "company", template_path=report_template_path)
+        expected_sums = writeResultToWordByDocx(old_report_path, result_dict, report_template_path)
+
+        assert recorded_sums[-1] == expected_sums
+        assert getCellTexts(new_report_path) == getCellTexts(old_report_path)
+
+    # Sums only depend on passed rows
+    word_report_template = WordReportTemplate(report_template_path)
+    assert word_report_template.getSumValues(set()) == calculateSumedNumber(docx.Document(report_template_path))
@@ -0,0 +1,63 @@
+import re
+import pytest
+from processor import case_folding
+from processor.case_folding import foldPageText
+from processor.statement_info import setCaseFoldedMatching, statement_dict
+from processor.token_index import PageTokenIndex, getRequiredLiterals
+
+
+@pytest.mark.parametrize("regex_str, expected_literals", [
+    (r"GIFT", [{"gift"}]),
+    (r"gift.{1,5}card", [{"gift"}, {"card"}]),
+    (r"gift-card", [{"gift"}, {"card"}]),
+    (r"(?:letter|note).{1,10}from", [{"letter", "note"}, {"from"}]),
+    # Optional groups and repeats that may match nothing give nothing
+    (r"(?:gift)?card", [{"card"}]),
+    (r"gi(?:ft)?", []),
+    (r"gifts?", [{"gift"}]),
+    (r"(?:gift)*card", [{"card"}]),
+    (r"(?:gift|present)+", [{"gift", "present"}]),
+    (r"(gift|presents?)\s+from", [{"gift", "present"}, {"from"}]),
+    # Branch with an empty (or too short) branch gives nothing
+    (r"(?:gift|)card", [{"card"}]),
+    (r"gift|", []),
+    (r"(?:a|gift)card", [{"card"}]),
+    # Lookarounds give nothing
+    (r"(?=gift)card", [{"card"}]),
+    (r"(?<!un)ethical", [{"ethical"}]),
+    (r"(?!gift)\w+", []),
+    # Sets end a literal, set of one char is a char
+    (r"[Gg]ift", [{"ift"}]),
+    (r"[G]ift", [{"gift"}]),
+    (r"(?:company|organi[sz]ation).{1,15}fund", [{"company", "organi"}, {"fund"}]),
+    # \b and \B match no char, literal goes on
+    (r"\bgift\b", [{"gift"}]),
+    (r"gi\bft", [{"gift"}]),
+    (r"gift\Bs", [{"gifts"}]),
+])
+def test_required_literals(regex_str, expected_literals):
+    for flags in [re.IGNORECASE | re.MULTILINE, re.NOFLAG]:
+        assert getRequiredLiterals(re.compile(regex_str, flags)) == tuple(map(frozenset, expected_literals))
+
+
+def test_rule_may_match_every_page_it_hits(synthetic_page_texts):
+    page_texts = [page_text for page_texts in synthetic_page_texts for page_text in page_texts]
+    is_case_folded_matching = case_folding.is_case_folded_matching
+    try:
+        for is_case_folded in [False, True]:
+            setCaseFoldedMatching(is_case_folded)
+            matched_texts = [foldPageText(page_text) for page_text in page_texts] if is_case_folded else page_texts
+            token_indexes = [PageTokenIndex(page_text) for page_text in matched_texts]
+            hit_count, skipped_count = 0, 0
+            for statement_info in statement_dict.values():
+                for regex in statement_info.check_rule.compileAll():
+                    for (page_text, token_index) in zip(matched_texts, token_indexes):
+                        if regex.search(page_text) != None:
+                            assert token_index.mayMatch(regex), regex.pattern
+                            hit_count += 1
+                        elif not token_index.mayMatch(regex):
+                            skipped_count += 1
+            # Pages without hit are often skipped without running regex
+            assert hit_count > 100 and skipped_count > 100
+    finally:
+        setCaseFoldedMatching(is_case_folded_matching)
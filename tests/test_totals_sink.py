@@ -0,0 +1,52 @@
+from processor.totals_sink import TotalsSink
+
+
+def makeTotals(mandatory: int, strongly_suggested: int = 0, desirable: int = 0) -> dict[str, int]:
+    return {"mandatory": mandatory, "strongly_suggested": strongly_suggested, "desirable": desirable}
+
+
+def readLines(csv_path: str) -> list[str]:
+    with open(csv_path, "r", encoding="utf-8") as csv_file:
+        return csv_file.read().splitlines()
+
+
+def test_append_and_last_row_wins(tmp_path):
+    csv_path = str(tmp_path / "result" / "Totals.csv")
+    totals_sink = TotalsSink(csv_path)
+    totals_sink.append("alpha", makeTotals(1, 2, 3))
+    totals_sink.append("beta", makeTotals(4))
+    totals_sink.append("alpha", makeTotals(5))
+    # Each row is on disk as soon as it is appended
+    assert readLines(csv_path) == [
+        "company,mandatory,strongly_suggested,desirable", "alpha,1,2,3", "beta,4,0,0", "alpha,5,0,0"
+    ]
+    assert totals_sink.readTotals() == {"alpha": makeTotals(5), "beta": makeTotals(4)}
+
+
+def test_line_cut_by_crash_is_skipped(tmp_path):
+    csv_path = str(tmp_path / "Totals.csv")
+    totals_sink = TotalsSink(csv_path)
+    totals_sink.append("alpha", makeTotals(1))
+    with open(csv_path, "a", encoding="utf-8") as csv_file:
+        csv_file.write("beta,2")
+    assert totals_sink.readTotals() == {"alpha": makeTotals(1)}
+
+
+def test_reopen_compacts_or_truncates(tmp_path):
+    csv_path = str(tmp_path / "Totals.csv")
+    totals_sink = TotalsSink(csv_path)
+    for mandatory in range(3):
+        totals_sink.append("alpha", makeTotals(mandatory))
+        totals_sink.append("beta", makeTotals(mandatory))
+    totals_sink.append("removed", makeTotals(9))
+
+    # Resumed run: one row of each company still checked
+    totals_sink = TotalsSink(csv_path, is_new_run=False, company_names=["beta", "alpha", "new"])
+    assert readLines(csv_path) == ["company,mandatory,strongly_suggested,desirable", "beta,2,0,0", "alpha,2,0,0"]
+    totals_sink.append("new", makeTotals(7))
+    assert totals_sink.readTotals() == {"beta": makeTotals(2), "alpha": makeTotals(2), "new": makeTotals(7)}
+
+    # Fresh run: nothing of previous runs
+    totals_sink = TotalsSink(csv_path, is_new_run=True)
+    assert readLines(csv_path) == ["company,mandatory,strongly_suggested,desirable"]
+    assert totals_sink.readTotals() == dict()
@@ -1,31 +1,126 @@
-import operator
+import atexit
+import json
 import os
+import re
 import time
-from functools import reduce
+
+
+class LazyText:
+    """
+    Text made only when it is really printed (or written to event sink). Example:
+    console.sublog(LazyText(lambda: page_text.replace("\\n", "  ")[0:60]))
+    """
+
+    def __init__(self, get_text) -> None:
+        self.get_text = get_text
+
+    def __str__(self) -> str:
+        return str(self.get_text())
 
 
 class console:
     # Helper class
 
+    # Log levels, lines below `print_level` are not printed
+    level_detail = 10  # sublog, things of each page and each match
+    level_info = 20    # info, ok
+    level_warn = 30
+    level_err = 40
+    level_names = {level_detail: "detail", level_info: "info", level_warn: "warn", level_err: "err"}
+
+    print_level = level_detail
+
+    # Events (logs, and `console.event`) written to a JSONL file, in batches
+    event_sink_path: str | None = None
+    event_sink_level = level_detail
+    event_buffer: list[str] = []
+    max_event_buffer_size = 256
+
+    # {colour_rgb: ansi_code}
+    colour_code_cache: dict[str, str] = dict()
+    ansi_code_regex = re.compile("\033\\[[0-9;]*m")
+
     def info(*args, colour_rgb="0094c8", sep="", end="\n") -> None:
-        print(console.__getColourANSICodeFromHexRGB(colour_rgb) + "[INFO] ", end="")
-        print(*args, "\033[39m", sep=sep, end=end)
+        console.log(console.level_info, "[INFO] ", args, colour_rgb, sep, end)
 
     def warn(*args, colour_rgb="fcc800", sep="", end="\n") -> None:
-        print(console.__getColourANSICodeFromHexRGB(colour_rgb) + "[WARN] ", end="")
-        print(*args, "\033[39m", sep=sep, end=end)
+        console.log(console.level_warn, "[WARN] ", args, colour_rgb, sep, end)
 
     def err(*args, colour_rgb="ba2636", sep="", end="\n") -> None:
-        print(console.__getColourANSICodeFromHexRGB(colour_rgb) + "[ERR!] ", end="")
-        print(*args, "\033[39m", sep=sep, end=end)
+        console.log(console.level_err, "[ERR!] ", args, colour_rgb, sep, end)
 
     def ok(*args, colour_rgb="67a70c", sep="", end="\n") -> None:
-        print(console.__getColourANSICodeFromHexRGB(colour_rgb) + "[ OK ] ", end="")
-        print(*args, "\033[39m", sep=sep, end=end)
+        console.log(console.level_info, "[ OK ] ", args, colour_rgb, sep, end)
 
     def sublog(*args, colour_rgb="000000", sep="", end="\n"):
-        print(console.__getColourANSICodeFromHexRGB(colour_rgb) + "       ", end="")
-        print(*args, "\033[39m", sep=sep, end=end)
+        console.log(console.level_detail, "       ", args, colour_rgb, sep, end)
+
+    def plain(*args, level=level_detail, sep="", end="\n") -> None:
+        """
+        Print without prefix and colour (example: a blank line), if `level` is enabled
+        """
+        if level >= console.print_level:
+            print(*args, sep=sep, end=end)
+
+    def log(level: int, prefix: str, args: tuple, colour_rgb: str, sep: str, end: str) -> None:
+        if level >= console.print_level:
+            print(console.__getColourANSICodeFromHexRGB(colour_rgb) + prefix, end="")
+            print(*args, "\033[39m", sep=sep, end=end)
+        if console.event_sink_path != None and level >= console.event_sink_level:
+            console.event("log", level=level, message=sep.join(str(arg) for arg in args))
+
+    def isEnabled(level: int) -> bool:
+        """
+        Whether logs of `level` are printed or written anywhere, to skip making text nobody reads
+        """
+        return level >= console.print_level or (console.event_sink_path != None and level >= console.event_sink_level)
+
+    def setPrintLevel(level: int) -> None:
+        console.print_level = level
+
+    def setQuiet() -> None:
+        """
+        Only print warnings and errors
+        """
+        console.print_level = console.level_warn
+
+    def openEventSink(event_sink_path: str, level: int = level_detail) -> None:
+        """
+        Append events as JSON lines to `event_sink_path`, written when buffer is full or `flushEvents` called
+        """
+        if os.path.dirname(event_sink_path) != "":
+            os.makedirs(os.path.dirname(event_sink_path), exist_ok=True)
+        # Events buffered by parent process (before forking) are not for this sink
+        console.event_buffer = []
+        if console.event_sink_path == None:
+            atexit.register(console.flushEvents)
+        console.event_sink_path = event_sink_path
+        console.event_sink_level = level
+
+    def event(event_name: str, level: int = level_info, **fields) -> None:
+        """
+        Write a structured event to event sink (not printed). Example: console.event("rule_found", rule_name="gift")
+        Text of fields is without colour.
+        """
+        if console.event_sink_path == None or level < console.event_sink_level:
+            return
+
+        event_dict = {"time": time.time(), "pid": os.getpid(), "level": console.level_names.get(level, level),
+                      "event": event_name}
+        for (field_name, value) in fields.items():
+            event_dict[field_name] = console.ansi_code_regex.sub("", str(value)) \
+                if isinstance(value, (str, LazyText)) else value
+        console.event_buffer.append(json.dumps(event_dict, ensure_ascii=False) + "\n")
+        if len(console.event_buffer) >= console.max_event_buffer_size:
+            console.flushEvents()
+
+    def flushEvents() -> None:
+        if console.event_sink_path == None or len(console.event_buffer) == 0:
+            return
+        # One write, so lines of processes appending to same file are not mixed
+        with open(console.event_sink_path, "a", encoding="utf-8") as event_sink_file:
+            event_sink_file.write("".join(console.event_buffer))
+        console.event_buffer = []
 
     def clear() -> None:
         print("\033c")
@@ -40,9 +135,9 @@ class console:
         return os.get_terminal_size().lines
 
     def __getColourANSICodeFromHexRGB(colour_rgb: str) -> str:
-        if colour_rgb[0] == "#":
-            colour_rgb = colour_rgb[1:]
+        if colour_rgb not in console.colour_code_cache:
+            hex_rgb = colour_rgb[1:] if colour_rgb[0] == "#" else colour_rgb
+            console.colour_code_cache[colour_rgb] = \
+                "\033[38;2" + "".join([";" + str(int(hex_rgb[i:i + 2], base=16)) for i in [0, 2, 4]]) + "m"
 
-        return "\033[38;2" + reduce(
-            operator.add, [";" + str(int(colour_rgb[i:i + 2], base=16)) for i in [0, 2, 4]]
-        ) + "m"
+        return console.colour_code_cache[colour_rgb]
@@ -1,3 +1,4 @@
+import hashlib
 import os
 from typing import Iterable
 
@@ -6,3 +7,14 @@ def getPDFFilePathGenerator(dir_path: str) -> Iterable[str]:
     for file in os.listdir(dir_path):
         if file.endswith(".pdf"):
             yield os.path.join(dir_path, file)
+
+
+def getFileContentHash(file_path: str) -> str:
+    """
+    SHA-256 of file content, in hex.
+    """
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()